@@ -0,0 +1,242 @@
+"""Reproducible performance benchmarks for xplat.
+
+Generates a synthetic directory tree, then times discovery, listing,
+planning, a dry run and a real rename, reporting ops/sec, peak RSS and
+the number of filesystem calls made through the os module. Each phase
+runs in a new process, as peak RSS is only ever the process's highest.
+
+Results are written as JSON, and can be compared against a saved
+baseline:
+
+    python benchmarks/run_benchmarks.py --files 20000 --output base.json
+    python benchmarks/run_benchmarks.py --files 20000 --baseline base.json
+"""
+
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Annotated, Any
+
+import typer
+
+from xplat.list import FileInfo, create_file_list, scan_entries
+from xplat.rename import execute_plan, plan_renames, rename_files, safe_stems
+
+# os functions counted as filesystem calls
+COUNTED_CALLS = ["stat", "lstat", "scandir", "listdir", "rename", "open", "unlink"]
+# in run order, the rename changes the tree so it comes last
+PHASES = ["discovery", "create_file_list", "file_info", "safe_stems", "plan", "dry_run", "rename"]
+# measures compared with a baseline, and whether a higher value is better
+COMPARED = [("ops_per_sec", "ops/s", True), ("peak_rss_kb", "rss", False), ("syscalls", "calls", False)]
+
+# name parts for each distribution
+WORDS = ["IMG", "Scan", "Holiday Photo", "report", "Final.Draft", "Über", "naïve café", "日本語", "data"]
+EXTENSIONS = [".jpg", ".JPG", ".txt", ".pdf", ".mp4", ".tar.gz", ""]
+
+
+def make_name(rng: random.Random, index: int, distribution: str) -> str:
+    """Create a synthetic file name for the given distribution"""
+    if distribution == "plain":
+        return f"file_{index:07d}.txt"
+    if distribution == "collisions":
+        # every other file collides with its neighbour after renaming
+        return f"File {index // 2:07d}.txt" if index % 2 else f"file.{index // 2:07d}.txt"
+    # mixed: unicode, spaces, dots and case
+    word = rng.choice(WORDS)
+    ext = rng.choice(EXTENSIONS)
+    return f"{word} {index:07d}{ext}"
+
+
+def generate_tree(root: Path, files: int, depth: int, fanout: int, distribution: str, seed: int) -> int:
+    """Create `files` empty files spread over a tree, return the count"""
+    rng = random.Random(seed)  # nosec B311 - reproducible test data, not security
+    dirs = [root]
+    level = [root]
+    for level_index in range(depth):
+        level = [parent / f"Sub Dir {level_index}.{n}" for parent in level for n in range(fanout)]
+        for directory in level:
+            directory.mkdir()
+        dirs.extend(level)
+    for index in range(files):
+        directory = dirs[index % len(dirs)]
+        directory.joinpath(make_name(rng, index, distribution)).touch()
+    return files
+
+
+class SyscallCounter:
+    """Count calls to filesystem functions of the os module"""
+
+    def __init__(self) -> None:
+        self.counts = dict.fromkeys(COUNTED_CALLS, 0)
+
+    def _wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        def counted(*args: Any, **kwargs: Any) -> Any:
+            self.counts[name] += 1
+            return func(*args, **kwargs)
+
+        return counted
+
+    @contextmanager
+    def counting(self) -> Iterator["SyscallCounter"]:
+        originals = {name: getattr(os, name) for name in COUNTED_CALLS}
+        for name, func in originals.items():
+            setattr(os, name, self._wrap(name, func))
+        try:
+            yield self
+        finally:
+            for name, func in originals.items():
+                setattr(os, name, func)
+
+
+def peak_rss_kb() -> int | None:
+    """Peak resident set size of this process in KB, None if unknown"""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def phase_workload(name: str, root: Path, recursive: bool) -> tuple[int, Callable[[], object]]:
+    """The number of operations of a phase, and the function to time"""
+    entries = list(scan_entries(root, recursive=recursive))
+    stems = [entry.path.stem for entry in entries]
+    workloads: dict[str, tuple[int, Callable[[], object]]] = {
+        "discovery": (len(entries), lambda: sum(1 for _ in scan_entries(root, recursive=recursive))),
+        "create_file_list": (len(create_file_list(root)), lambda: create_file_list(root)),
+        "file_info": (len(entries), lambda: FileInfo.from_paths(entries)),
+        "safe_stems": (len(entries), lambda: safe_stems(stems)),
+        "plan": (len(entries), lambda: plan_renames(entries)),
+        "dry_run": (len(entries), lambda: list(execute_plan(plan_renames(entries), dry_run=True))),
+        "rename": (len(entries), lambda: list(rename_files(entries))),
+    }
+    return workloads[name]
+
+
+def run_phase(name: str, root: Path, recursive: bool) -> dict:
+    """Time one phase, counting filesystem calls"""
+    ops, func = phase_workload(name, root, recursive)
+    counter = SyscallCounter()
+    with counter.counting():
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    return {
+        "phase": name,
+        "ops": ops,
+        "seconds": elapsed,
+        "ops_per_sec": ops / elapsed if elapsed else None,
+        "peak_rss_kb": peak_rss_kb(),
+        "syscalls": counter.counts,
+    }
+
+
+def run_isolated(name: str, root: Path, recursive: bool) -> dict:
+    """Run one phase in a new process, so its peak RSS is its own"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_phase, name, root, recursive).result()
+
+
+def run_benchmarks(root: Path, files: int, depth: int, fanout: int, distribution: str, seed: int) -> dict:
+    """Generate a tree under root and run every phase against it"""
+    generate_tree(root, files, depth, fanout, distribution, seed)
+    phases = [run_isolated(name, root, depth > 0) for name in PHASES]
+    return {
+        "params": {
+            "files": files,
+            "depth": depth,
+            "fanout": fanout,
+            "distribution": distribution,
+            "seed": seed,
+        },
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "phases": phases,
+    }
+
+
+def measure(phase: dict, key: str) -> float | None:
+    """A phase's value of a compared measure, the total of the syscalls"""
+    value = phase.get(key)
+    return sum(value.values()) if isinstance(value, dict) else value
+
+
+def compare_phase(phase: dict, base: dict, tolerance: float) -> tuple[str, list[str]]:
+    """Compare each measure of a phase with the baseline,
+    return the ratios to print and the measures that regressed
+    """
+    ratios = []
+    regressed = []
+    for key, label, higher_is_better in COMPARED:
+        value, base_value = measure(phase, key), measure(base, key)
+        if value is None or base_value is None:
+            continue
+        # a phase that made no calls before, and now does, regressed
+        ratio = value / base_value if base_value else 1.0 if not value else float("inf")
+        if (ratio < 1 - tolerance) if higher_is_better else (ratio > 1 + tolerance):
+            regressed.append(label)
+        ratios.append(f"{label} {ratio:6.2f}x")
+    return "  ".join(ratios), regressed
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print each phase against the baseline, return the regressions,
+    as phase and measure, e.g. plan calls
+    """
+    if baseline["params"] != results["params"]:
+        typer.echo(f"Baseline parameters differ: {baseline['params']}")
+    base_phases = {phase["phase"]: phase for phase in baseline["phases"]}
+    regressions: list[str] = []
+    for phase in results["phases"]:
+        base = base_phases.get(phase["phase"])
+        if base is None:
+            continue
+        ratios, regressed = compare_phase(phase, base, tolerance)
+        regressions.extend(f"{phase['phase']} {label}" for label in regressed)
+        marker = f"  REGRESSION: {', '.join(regressed)}" if regressed else ""
+        typer.echo(f"{phase['phase']:<18} {ratios}{marker}")
+    return regressions
+
+
+def main(
+    files: Annotated[int, typer.Option(help="Number of files to generate")] = 10000,
+    depth: Annotated[int, typer.Option(help="Levels of subdirectories")] = 0,
+    fanout: Annotated[int, typer.Option(help="Subdirectories per directory")] = 4,
+    distribution: Annotated[str, typer.Option(help="Names: plain, mixed or collisions")] = "mixed",
+    seed: Annotated[int, typer.Option(help="Random seed for the names")] = 1,
+    workdir: Annotated[Path | None, typer.Option(help="Directory for the synthetic tree")] = None,
+    output: Annotated[Path | None, typer.Option(help="Write results as JSON to this file")] = None,
+    baseline: Annotated[Path | None, typer.Option(help="Compare against saved JSON results")] = None,
+    tolerance: Annotated[float, typer.Option(help="Allowed slowdown, or growth in RSS or calls, before a regression")] = 0.10,
+) -> None:
+    """Benchmark scan, plan, rename and list on a synthetic tree."""
+    with tempfile.TemporaryDirectory(dir=workdir) as temp_dir:
+        results = run_benchmarks(Path(temp_dir), files, depth, fanout, distribution, seed)
+
+    for phase in results["phases"]:
+        typer.echo(
+            f"{phase['phase']:<18} {phase['ops_per_sec'] or 0:>12,.0f} ops/s"
+            f"  {phase['seconds']:8.3f} s  rss {phase['peak_rss_kb']} KB"
+            f"  calls {sum(phase['syscalls'].values())}"
+        )
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+    if baseline is not None:
+        typer.echo("")
+        if compare(results, json.loads(baseline.read_text()), tolerance):
+            raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,214 @@
+"""
+Scan directories with many filesystem calls in flight at once.
+
+On a network mount every listing and stat is a round trip of a few
+milliseconds, so a scan that makes them one after another spends its
+time waiting. Here the blocking calls run in a bounded thread pool,
+driven by asyncio: the listings of the next directories to be read and
+the stats of the next files are started ahead, up to `concurrency`
+calls at a time, while the results are handed back in the same order as
+scan_entries() returns them.
+"""
+
+import asyncio
+import os
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from xplat.list import FileFilter, ScanEntry
+
+# blocking filesystem calls in flight at once, unless another is asked for
+DEFAULT_CONCURRENCY = 32
+
+
+@dataclass(slots=True, frozen=True)
+class ListedEntry:
+    """A directory entry, its type resolved when it was listed"""
+
+    name: str
+    path: str
+    is_file: bool  # follows symlinks, like Path.is_file()
+    is_dir: bool  # doesn't follow symlinks
+    is_symlink: bool
+
+
+class LocalFileSystem:
+    """The blocking calls a scan makes, run in the thread pool"""
+
+    def scandir(self, dir_path: str) -> list[ListedEntry]:
+        """List a directory, resolving the type of each entry"""
+        with os.scandir(dir_path) as it:
+            return [
+                ListedEntry(entry.name, entry.path, entry.is_file(), entry.is_dir(follow_symlinks=False), entry.is_symlink())
+                for entry in it
+            ]
+
+    def stat(self, file_path: str) -> os.stat_result:
+        return os.stat(file_path)  # noqa: PTH116
+
+
+def _list_dir(
+    fs: LocalFileSystem, dir_path: str, recursive: bool, skip: frozenset[Path]
+) -> tuple[list[ListedEntry], list[str]]:
+    """The files of a directory, and the subdirectories to descend into"""
+    files = []
+    subdirs = []
+    for entry in fs.scandir(dir_path):
+        if entry.is_file:
+            files.append(entry)
+        elif recursive and entry.is_dir and (not skip or Path(entry.path).resolve() not in skip):
+            subdirs.append(entry.path)
+    return files, subdirs
+
+
+def _try_stat(fs: LocalFileSystem, file_path: str) -> os.stat_result | OSError:
+    try:
+        return fs.stat(file_path)
+    except OSError as e:
+        return e
+
+
+async def _listed_files(
+    executor: ThreadPoolExecutor,
+    fs: LocalFileSystem,
+    dir_path: str,
+    recursive: bool,
+    skip: frozenset[Path],
+    prefetch: int,
+) -> AsyncIterator[ListedEntry]:
+    """Yield the files of a tree depth first, listing up to `prefetch`
+    of the next directories ahead"""
+    loop = asyncio.get_running_loop()
+    # directories still to read, the next on top, with their listing once started
+    stack: list[tuple[str, asyncio.Future | None]] = [(dir_path, None)]
+    started = 0
+    while stack:
+        # only the top of the stack is looked at, started listings stay near it
+        for position in range(len(stack) - 1, -1, -1):
+            if started >= prefetch:
+                break
+            path, listing = stack[position]
+            if listing is None:
+                stack[position] = (path, loop.run_in_executor(executor, _list_dir, fs, path, recursive, skip))
+                started += 1
+        path, listing = stack.pop()
+        if listing is None:
+            # the started listings are all further down
+            listing = loop.run_in_executor(executor, _list_dir, fs, path, recursive, skip)
+        else:
+            started -= 1
+        files, subdirs = await listing
+        for entry in files:
+            yield entry
+        stack.extend((subdir, None) for subdir in reversed(subdirs))
+
+
+def _scan_entry(entry: ListedEntry, stat_result: os.stat_result | OSError | None, strict: bool) -> ScanEntry:
+    """ScanEntry for a listed file; a failed stat is raised if strict"""
+    if isinstance(stat_result, OSError):
+        if strict:
+            raise stat_result
+        stat_result = None
+    return ScanEntry(Path(entry.path), entry.is_symlink, stat_result)
+
+
+async def scan_entries_async(
+    dir_path: Path,
+    recursive: bool = False,
+    skip_dirs: Iterable[Path] = (),
+    file_filter: FileFilter | None = None,
+    stat: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    fs: LocalFileSystem | None = None,
+) -> AsyncGenerator[ScanEntry, None]:
+    """Yield the files in a directory, with up to `concurrency` listings
+    and stats in flight at once.
+
+    The files and their order are the same as from scan_entries(). A
+    stat result is kept only for the size and time filters, or for
+    every file if stat is True; a file that can't be stat'ed for a
+    filter raises OSError, like scan_entries(), but otherwise it is
+    yielded without a stat result.
+
+    Args:
+        dir_path: Directory to scan
+        recursive: If True, descend into subdirectories (not symlinks)
+        skip_dirs: Directories to leave out
+        file_filter: Optional FileFilter
+        stat: If True, stat every file
+        concurrency: Blocking calls in flight at once
+        fs: Source of the blocking calls, default the local filesystem
+
+    Yields:
+        ScanEntry for each file, a directory's files before its subdirectories
+    """
+    fs = fs if fs is not None else LocalFileSystem()
+    skip = frozenset(skip_dir.resolve() for skip_dir in skip_dirs)
+    strict = file_filter is not None and file_filter.needs_stat
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    # files in listing order, with their stat once started
+    window: deque[tuple[ListedEntry, asyncio.Future | None]] = deque()
+
+    async def settled() -> ScanEntry | None:
+        """The first file of the window, None if the filter leaves it out"""
+        entry, stat_future = window.popleft()
+        stat_result = None if stat_future is None else await stat_future
+        scan_entry = _scan_entry(entry, stat_result, strict)
+        if strict and not file_filter.match_stat(scan_entry.stat_result):  # type: ignore[union-attr, arg-type]
+            return None
+        return scan_entry
+
+    try:
+        async for entry in _listed_files(executor, fs, os.fspath(dir_path), recursive, skip, concurrency):
+            if file_filter is not None and not file_filter.match_name(entry.name):
+                continue
+            stat_future = loop.run_in_executor(executor, _try_stat, fs, entry.path) if stat or strict else None
+            window.append((entry, stat_future))
+            # hand on what is ready, wait only when the window is full
+            while window and (len(window) > concurrency or window[0][1] is None or window[0][1].done()):
+                if scan_entry := await settled():
+                    yield scan_entry
+        while window:
+            if scan_entry := await settled():
+                yield scan_entry
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def scan_entries_concurrent(
+    dir_path: Path,
+    recursive: bool = False,
+    skip_dirs: Iterable[Path] = (),
+    file_filter: FileFilter | None = None,
+    stat: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    fs: LocalFileSystem | None = None,
+) -> Iterator[ScanEntry]:
+    """Yield the files in a directory from scan_entries_async(), for
+    callers that aren't async.
+
+    The event loop runs only while the next file is awaited, but the
+    calls already started keep running in the pool in between.
+    """
+    entries = scan_entries_async(dir_path, recursive, skip_dirs, file_filter, stat, concurrency, fs)
+
+    async def next_entry() -> ScanEntry:
+        return await anext(entries)
+
+    async def close() -> None:
+        await entries.aclose()
+
+    with asyncio.Runner() as runner:
+        try:
+            while True:
+                try:
+                    scan_entry = runner.run(next_entry())
+                except StopAsyncIteration:
+                    return
+                yield scan_entry
+        finally:
+            runner.run(close())
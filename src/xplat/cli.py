@@ -5,29 +5,136 @@ Only CLI code should be in this module, input and output for the user.
 TODO: add logging, verbosity
 """
 
+import csv
+import io
+import json
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime
 from pathlib import Path
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
 import typer
 
 from xplat import constants
-from xplat.info import create_platform_report
-from xplat.list import FileInfo, check_file, create_file_list, validate_extension
-from xplat.rename import rename_file
+from xplat.options import POLL_INTERVAL, SETTLE_TIME, CollisionStrategy, OutputFormat, SortKey, TransferMode
+
+# the modules of the subcommands are imported when they run
+if TYPE_CHECKING:
+    from xplat.dupes import DupeStats, DuplicateGroup
+    from xplat.index import DirectoryIndex
+    from xplat.journal import RenameJournal
+    from xplat.list import FileFilter, FileInfo, FileInfoCache, ScanEntry
+    from xplat.manifest import ManifestStats
+    from xplat.metrics import RunMetrics
+    from xplat.profiling import ProfileReport, ProfileSession
+    from xplat.rename import RenamePlan
+    from xplat.usage import Usage
 
 # numeric constants
 PROGRAM_NAME = constants.PROGRAM_NAME
-VERSION = constants.VERSION
 APP_HELP = constants.APP_HELP
 NO_ERROR = constants.NO_ERROR
 NO_FILE = constants.NO_FILE
 BAD_REQUEST = constants.BAD_REQUEST
+# files shown per page by the interactive list
+PAGE_SIZE = 20
+# JSON Lines records buffered between writes
+JSONL_FLUSH_RECORDS = 4096
+# functions and allocations in the --profile and --trace-malloc summaries
+PROFILE_TOP = 10
+
+# filter options shared by list and rename
+IncludeOption = Annotated[
+    list[str] | None, typer.Option("--include", help="Only files whose name matches this glob, may be repeated")
+]
+ExcludeOption = Annotated[
+    list[str] | None, typer.Option("--exclude", help="Leave out files whose name matches this glob, may be repeated")
+]
+MinSizeOption = Annotated[str | None, typer.Option("--min-size", help="Only files at least this size, e.g. 10K or 5MB")]
+MaxSizeOption = Annotated[str | None, typer.Option("--max-size", help="Only files at most this size, e.g. 10K or 5MB")]
+NewerOption = Annotated[
+    str | None, typer.Option("--newer", help="Only files modified since an ISO date, or within an age like 12h or 7d")
+]
+OlderOption = Annotated[
+    str | None, typer.Option("--older", help="Only files modified before an ISO date, or longer ago than an age like 30d")
+]
+ConcurrencyOption = Annotated[
+    int | None,
+    typer.Option("--concurrency", min=1, help="Listings and stats in flight at once, for network mounts"),
+]
+# run metrics, shared by info, list and rename
+MetricsOption = Annotated[
+    Path | None,
+    typer.Option("--metrics", help="Write counts and phase times to this file, in Prometheus format if it ends in .prom"),
+]
+
+
+class JsonLinesWriter:
+    """
+    Write JSON records one per line, buffered
+    and flushed in large chunks
+    """
+
+    def __init__(self, flush_records: int = JSONL_FLUSH_RECORDS) -> None:
+        self.flush_records = flush_records
+        self._lines: list[str] = []
+
+    def write(self, record: dict) -> None:
+        """Add a record, writing the buffer when it is full"""
+        self._lines.append(json.dumps(record))
+        if len(self._lines) >= self.flush_records:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records"""
+        if self._lines:
+            typer.echo("\n".join(self._lines))
+            self._lines.clear()
+
+
+class CsvWriter:
+    """
+    Write records as CSV rows after a header,
+    buffered and flushed in large chunks
+    """
+
+    def __init__(self, fields: list[str], flush_records: int = JSONL_FLUSH_RECORDS) -> None:
+        self.flush_records = flush_records
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fields, lineterminator="\n")
+        self._writer.writeheader()
+        self._count = 0
+
+    def write(self, record: dict) -> None:
+        """Add a record, writing the buffer when it is full"""
+        self._writer.writerow(record)
+        self._count += 1
+        if self._count >= self.flush_records:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows"""
+        if self._buffer.tell():
+            typer.echo(self._buffer.getvalue(), nl=False)
+            self._buffer.seek(0)
+            self._buffer.truncate()
+            self._count = 0
+
+
+def __getattr__(name: str) -> str:
+    """Resolve VERSION on first use, like constants does"""
+    if name == "VERSION":
+        return constants.VERSION
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
 
 
 def version_callback(is_version_requested: bool) -> None:
     """Display the version number and exit"""
     if is_version_requested:
-        typer.echo(f"{PROGRAM_NAME} version: {VERSION}")
+        typer.echo(f"{PROGRAM_NAME} version: {constants.VERSION}")
         raise typer.Exit(code=NO_ERROR)
 
 
@@ -42,11 +149,15 @@ def print_error(msg: str) -> None:
     )
 
 
-def print_header(ext: str | None) -> None:
+def print_header(ext: str | list[str] | None) -> None:
     """
-    Print a header for the file list
+    Print a header for the file list, with one or more extensions
     """
-    list_label = f"Listing files with extension '.{ext}':" if ext is not None else "Listing all files (no directories):"
+    exts = [ext] if isinstance(ext, str) else ext or []
+    if exts:
+        list_label = f"Listing files with extension {', '.join(f"'.{ext}'" for ext in exts)}:"
+    else:
+        list_label = "Listing all files (no directories):"
 
     label_border = "-" * len(list_label)
     typer.echo(label_border)
@@ -78,7 +189,26 @@ def print_files(files: list) -> int:
     return file_count
 
 
-def print_file_data(file_info: FileInfo) -> None:
+def print_file_page(files: list, start: int = 0, page_size: int = PAGE_SIZE) -> int:
+    """
+    Print one page of a list of files, numbered from start,
+    return the number of files found
+    """
+    file_count = len(files)
+    for file_number in range(start + 1, min(start + page_size, file_count) + 1):
+        typer.secho(f"{file_number}) {Path(files[file_number - 1]).name}", fg=typer.colors.GREEN)
+
+    # report the page shown, and the number of files found.
+    file_report = f"Total files found = {file_count}"
+    typer.echo("-" * len(file_report))
+    if file_count > page_size:
+        typer.echo(f"Showing {start + 1}-{min(start + page_size, file_count)}, 'n'/'p' for next/previous page")
+    typer.secho(file_report, fg=typer.colors.BRIGHT_YELLOW)
+
+    return file_count
+
+
+def print_file_data(file_info: "FileInfo") -> None:
     """
     Print file properties in indented table format
     """
@@ -89,24 +219,31 @@ def print_file_data(file_info: FileInfo) -> None:
     typer.echo(f"  Accessed: {file_info.accessed}")
 
 
-def print_file_info(file_name: Path) -> None:
+def print_file_info(file_name: Path, cache: "FileInfoCache | None" = None) -> None:
     """
-    Display file information for a file
+    Display file information for a file,
+    from the cache if it has been shown before
     """
+    from xplat.list import FileInfo, check_file
+
+    if cache is not None and file_name in cache:
+        print_file_data(cache.get(file_name))
+        return
     check_file_result = check_file(file_name)
     if check_file_result[0]:
-        print_file_data(FileInfo(file_name))
+        print_file_data(cache.get(file_name) if cache is not None else FileInfo(file_name))
     else:
         print_error(check_file_result[1])
 
 
-def print_selected_info(files: list, selected: str) -> str:
+def print_selected_info(files: list, selected: str, cache: "FileInfoCache | None" = None) -> str:
     """
     Display file information for a selected file.
 
     Args:
         files (list): list of files to display
         selected (str): selected file number
+        cache (FileInfoCache): optional cache of file information
 
     Returns:
         str: prompt to display, depending on input
@@ -124,7 +261,7 @@ def print_selected_info(files: list, selected: str) -> str:
         message += f"Please enter a number between 1 and {len(files)}.\n"
         return message
 
-    print_file_info(files[file_index])
+    print_file_info(files[file_index], cache)
 
     # prompt to continue
     user_input = typer.prompt("Enter 'q' to quit, 'c' to continue")
@@ -135,82 +272,344 @@ def print_selected_info(files: list, selected: str) -> str:
     return "Select another file to examine.\n"
 
 
-def review_files(directory: Path, extension: str | None = None) -> None:
+def file_record(file_name: Path, file_info: "FileInfo | None" = None) -> dict:
     """
-    Displays a list of files and prompts for file selection
+    Describe a file as a JSON-ready record,
+    with size and ISO timestamps if file_info is given
     """
-    files = create_file_list(directory, extension)
+    record: dict = {"name": file_name.name, "path": str(file_name)}
+    if file_info is not None:
+        record["size"] = file_info.size_bytes
+        record["created"] = datetime.fromtimestamp(file_info.ctime).isoformat()
+        record["modified"] = datetime.fromtimestamp(file_info.mtime).isoformat()
+        record["accessed"] = datetime.fromtimestamp(file_info.atime).isoformat()
+    return record
+
+
+def open_index(index_path: Path | None) -> "DirectoryIndex | None":
+    """
+    Open a directory index if a path is given,
+    sqlite3 is only imported then
+    """
+    if index_path is None:
+        return None
+    from xplat.index import DirectoryIndex
+
+    return DirectoryIndex(index_path)
+
+
+def build_filter(
+    exts: list[str] | None = None,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    min_size: str | None = None,
+    max_size: str | None = None,
+    newer: str | None = None,
+    older: str | None = None,
+) -> "FileFilter | None":
+    """
+    Compile the filter options of a command, None if none are given.
+    Extensions may be repeated, or separated by commas.
+
+    Raises:
+        ValueError: If an extension, size or time is invalid
+    """
+    exts = [ext for value in exts or [] for ext in value.split(",") if ext]
+    if not any([exts, include, exclude, min_size, max_size, newer, older]):
+        return None
+    from xplat.list import FileFilter, parse_size, parse_time
+
+    return FileFilter(
+        exts,
+        include or (),
+        exclude or (),
+        min_size=None if min_size is None else parse_size(min_size),
+        max_size=None if max_size is None else parse_size(max_size),
+        newer=None if newer is None else parse_time(newer),
+        older=None if older is None else parse_time(older),
+    )
+
+
+def stream_files(files: "Iterable[Path | ScanEntry]", fmt: str, long: bool = False) -> int:
+    """
+    Print one record per file as soon as it is found,
+    as JSON Lines, CSV or text. Long records stat each file once.
+    Return the number of files.
+    """
+    from xplat.list import FileInfo, ScanEntry
+
+    fields = ["name", "path"] + (["size", "created", "modified", "accessed"] if long else [])
+    writer = JsonLinesWriter() if fmt == "json" else CsvWriter(fields) if fmt == "csv" else None
+
+    file_count = 0
+    for file in files:
+        file_name = file.path if isinstance(file, ScanEntry) else file
+        file_info = None
+        if long:
+            try:
+                file_info = FileInfo.from_entry(file) if isinstance(file, ScanEntry) else FileInfo(file_name)
+            except OSError as e:
+                # removed since it was listed
+                typer.echo(f"Skipped: {e}", err=True)
+                continue
+        file_count += 1
+        if writer is not None:
+            writer.write(file_record(file_name, file_info))
+        elif file_info is not None:
+            typer.echo(f"{file_info.size:>10}  {file_info.modified}  {file_name.name}")
+        else:
+            typer.echo(file_name.name)
+    if writer is not None:
+        writer.flush()
+    return file_count
+
+
+def review_files(
+    directory: Path,
+    extension: str | None = None,
+    page_size: int = PAGE_SIZE,
+    index: "DirectoryIndex | None" = None,
+    file_filter: "FileFilter | None" = None,
+    sort_key: SortKey = SortKey.NAME,
+    reverse: bool = False,
+    top: int | None = None,
+    concurrency: int | None = None,
+    metrics: "RunMetrics | None" = None,
+) -> None:
+    """
+    Displays a page of files around the cursor and prompts for file selection.
+    The sorted list is built once; file information is cached.
+    Building it is counted and timed in metrics, if given.
+    """
+    from xplat.list import FileInfoCache, create_file_list
+    from xplat.metrics import Phase, RunMetrics
+
+    metrics = metrics if metrics is not None else RunMetrics("list")
+    with metrics.phase(Phase.DISCOVERY):
+        files = create_file_list(directory, extension, index, file_filter, sort_key, reverse, top, concurrency)
+    metrics.files_scanned += len(files)
+    # every extension listed, from the argument and the filter
+    exts = [*(file_filter.exts if file_filter is not None else ()), *([extension] if extension else [])]
+    cache = FileInfoCache()
+    last_page = max(len(files) - 1, 0) // page_size * page_size
+    start = 0
     basic_prompt = "Enter a number to show file info, or 'q' to quit"
     full_prompt = basic_prompt
 
     # repeat until the user quits
     while True:
-        print_header(extension)
-        print_files(files)
+        print_header(exts)
+        print_file_page(files, start, page_size)
 
         file_selector = typer.prompt(full_prompt)
 
         if file_selector == "q":
             break
+        if file_selector in ("n", "p"):
+            step = page_size if file_selector == "n" else -page_size
+            start = min(max(start + step, 0), last_page)
+            full_prompt = basic_prompt
+            continue
 
-        full_prompt = print_selected_info(files, file_selector) + basic_prompt
+        full_prompt = print_selected_info(files, file_selector, cache) + basic_prompt
+        # move the window to the selected file
+        if file_selector.isdigit() and 0 < int(file_selector) <= len(files):
+            start = (int(file_selector) - 1) // page_size * page_size
 
 
-def rename_file_with_output(
-    file_name: Path,
-    output_dir: Path | None = None,
-    dry_run: bool = False,
-    label: str = "",
-) -> None:
+def print_rename(file_name: Path, result: Path | OSError, label: str = "") -> None:
     """
-    Renames a file with the given name to a new name
-    and outputs both names.
+    Output the original and new names of a renamed file,
+    or the reason it was skipped.
     """
     typer.echo(label)
     typer.secho(f"Original: {file_name}", fg=typer.colors.CYAN)
     typer.echo("  to:")
-    new_path = rename_file(file_name, output_dir, dry_run)
-    typer.secho(f"     New: {new_path}", fg=typer.colors.BRIGHT_CYAN)
+    if isinstance(result, OSError):
+        print_error(f"Skipped: {result}")
+    else:
+        typer.secho(f"     New: {result}", fg=typer.colors.BRIGHT_CYAN)
+        typer.echo("")
+
+
+def rename_record(file_name: Path, result: Path | OSError, dry_run: bool = False) -> dict:
+    """
+    Describe the result of a rename as a JSON-ready record
+    """
+    if isinstance(result, OSError):
+        return {"source": str(file_name), "target": None, "status": "skipped", "error": str(result)}
+    status = "planned" if dry_run else "renamed"
+    return {"source": str(file_name), "target": str(result), "status": status, "error": None}
+
+
+def print_collisions(plan: "RenamePlan") -> None:
+    """
+    Report all the name collisions found by the planner
+    """
+    collisions = plan.collisions
+    if not collisions:
+        return
+    typer.secho(f"Found {len(collisions)} name collisions:", fg=typer.colors.YELLOW)
+    for planned in collisions:
+        if planned.skip_reason is None:
+            typer.echo(f"  {planned.orig_path.name}: renamed to {planned.new_path}")
+        else:
+            typer.echo(f"  {planned.orig_path.name}: {planned.skip_reason}")
     typer.echo("")
 
 
+def reported_plans(plans: "Iterable[RenamePlan]", pretty: bool, metrics: "RunMetrics") -> "Iterator[RenamePlan]":
+    """
+    Count the files each plan renames, and report
+    its collisions before they are renamed
+    """
+    for plan in plans:
+        metrics.files_planned += sum(planned.skip_reason is None for planned in plan.renames)
+        if pretty:
+            print_collisions(plan)
+        yield plan
+
+
 def rename_list(
-    files: list,
+    files: "Iterable[Path | ScanEntry]",
     output_dir: Path | None = None,
     dryrun: bool = False,
+    jobs: int = 1,
+    on_collision: CollisionStrategy | None = None,
+    journal: "RenameJournal | None" = None,
+    mode: TransferMode = TransferMode.RENAME,
+    output: OutputFormat = OutputFormat.PRETTY,
+    metrics: "RunMetrics | None" = None,
 ) -> int:
     """
-    Rename files in list, optionally to output directory
+    Rename files in list, optionally to output directory,
+    using up to `jobs` worker threads.
+    With a collision strategy, plan each source directory
+    and report its collisions before renaming its files.
+    Completed renames are recorded in the journal, if given.
+    The mode chooses between rename, copy or move,
+    the output format how each file is reported.
+    Files are counted and each phase timed in metrics, if given.
     """
+    from xplat.metrics import Phase, RunMetrics
+    from xplat.rename import execute_plans, plan_batches, rename_files
+
+    metrics = metrics if metrics is not None else RunMetrics("rename")
+    files = metrics.scanned(files)
     convert_count = 0
+    pretty = output is OutputFormat.PRETTY
 
-    if dryrun:
-        typer.secho("DRY RUN - No files will be changed", fg=typer.colors.YELLOW)
-        typer.echo("")
-        start_label = "Proposed rename:"
-    else:
-        start_label = "Converting file name:"
+    # time not spent finding, planning or renaming files is reporting them
+    with metrics.phase(Phase.OUTPUT):
+        if dryrun and pretty:
+            typer.secho("DRY RUN - No files will be changed", fg=typer.colors.YELLOW)
+            typer.echo("")
+            start_label = "Proposed rename:"
+        else:
+            start_label = "Converting file name:"
 
-    skip_count = 0
-    for _, current_name in enumerate(files, start=1):
-        try:
-            rename_file_with_output(current_name, output_dir, dryrun, start_label)
-        except (FileExistsError, OSError) as e:
-            print_error(f"Skipped: {e}")
-            skip_count += 1
+        if on_collision is not None:
+            plans = reported_plans(
+                metrics.timed(plan_batches(files, output_dir, on_collision), Phase.PLANNING), pretty, metrics
+            )
+            results = execute_plans(plans, output_dir, dryrun, jobs, journal, mode, metrics)
+        else:
+            results = rename_files(files, output_dir, dryrun, jobs, journal, mode, metrics)
 
-    convert_count = len(files) - skip_count
+        skip_count = 0
+        writer = JsonLinesWriter() if output is OutputFormat.JSONL else None
+        for current_name, result in metrics.timed(results, Phase.EXECUTION):
+            if isinstance(result, OSError):
+                skip_count += 1
+                metrics.skip(result)
+                if output is OutputFormat.QUIET:
+                    typer.echo(f"Skipped: {result}", err=True)
+            else:
+                convert_count += 1
+            if pretty:
+                print_rename(current_name, result, start_label)
+            elif writer is not None:
+                writer.write(rename_record(current_name, result, dryrun))
+        if writer is not None:
+            writer.flush()
+        if on_collision is None:
+            # planned as they were renamed
+            metrics.files_planned += convert_count
+
+        if output is OutputFormat.SUMMARY:
+            counts = f"Found {convert_count} files to rename" if dryrun else f"Renamed {convert_count} files"
+            typer.echo(f"{counts}, skipped {skip_count}")
+        if dryrun and pretty:
+            typer.echo("")
+            typer.secho(f"Found {convert_count} files to rename", fg=typer.colors.GREEN)
+            if output_dir:
+                typer.echo(f"Files would be renamed and saved to: {output_dir}")
+            else:
+                typer.echo("Files would be renamed in place")
+
+    return convert_count
+
+
+def watch_list(
+    source_dir: Path,
+    output_dir: Path | None = None,
+    recursive: bool = False,
+    file_filter: "FileFilter | None" = None,
+    settle: float = SETTLE_TIME,
+    interval: float = POLL_INTERVAL,
+    dryrun: bool = False,
+    jobs: int = 1,
+    on_collision: CollisionStrategy | None = None,
+    journal: "RenameJournal | None" = None,
+    mode: TransferMode = TransferMode.RENAME,
+    output: OutputFormat = OutputFormat.PRETTY,
+    metrics: "RunMetrics | None" = None,
+) -> int:
+    """
+    Rename files as they arrive in a directory, in batches,
+    until interrupted, return the number of files converted.
+    Waiting for files is timed as discovery in metrics, if given.
+    """
+    from xplat.metrics import Phase, RunMetrics
+    from xplat.watch import watch_batches
+
+    metrics = metrics if metrics is not None else RunMetrics("rename")
+    convert_count = 0
+    typer.echo(f"Watching {source_dir} for new files, press Ctrl+C to stop.", err=True)
+    skip_dirs = [output_dir] if output_dir is not None else []
+    batches = watch_batches(source_dir, recursive, skip_dirs, file_filter, output_dir, settle, interval)
+    try:
+        for batch in metrics.timed(batches, Phase.DISCOVERY):
+            convert_count += rename_list(batch, output_dir, dryrun, jobs, on_collision, journal, mode, output, metrics)
+    except KeyboardInterrupt:
+        typer.echo(f"Stopped watching, {convert_count} files converted.", err=True)
+    return convert_count
+
+
+def rollback_list(journal_path: Path, dryrun: bool = False) -> int:
+    """
+    Undo the renames recorded in a journal,
+    return the number of files restored
+    """
+    from xplat.journal import rollback
 
     if dryrun:
+        typer.secho("DRY RUN - No files will be changed", fg=typer.colors.YELLOW)
         typer.echo("")
-        typer.secho(f"Found {convert_count} files to rename", fg=typer.colors.GREEN)
-        if output_dir:
-            typer.echo(f"Files would be renamed and saved to: {output_dir}")
-        else:
-            typer.echo("Files would be renamed in place")
-        return convert_count
 
-    return convert_count
+    restore_count = 0
+    for new_path, orig_path, error in rollback(journal_path, dryrun):
+        if error is not None:
+            print_error(f"Not restored: {error}")
+            continue
+        restore_count += 1
+        typer.secho(f"Restored: {new_path}", fg=typer.colors.CYAN)
+        typer.secho(f"      to: {orig_path}", fg=typer.colors.BRIGHT_CYAN)
+
+    typer.echo("")
+    summary = f"Found {restore_count} files to restore" if dryrun else f"Restored {restore_count} files"
+    typer.secho(summary, fg=typer.colors.GREEN)
+    return restore_count
 
 
 # CLI interface
@@ -225,8 +624,192 @@ app = typer.Typer(
 )
 
 
+def print_throughput(stats: "ManifestStats", seconds: float) -> None:
+    """
+    Report the files and bytes hashed, and the rate, on stderr
+    """
+    from xplat.list import format_bytes
+
+    rate = stats.size_bytes / seconds / 1_000_000 if seconds else 0.0
+    typer.echo(
+        f"Hashed {stats.files} files, {format_bytes(stats.size_bytes)} in {seconds:.2f} s ({rate:,.1f} MB/s)",
+        err=True,
+    )
+
+
+def create_manifest(files: Iterable[Path], base_dir: Path, output: Path | None, jobs: int | None) -> int:
+    """
+    Write a checksum manifest for files, to a file or stdout,
+    return the number of files that couldn't be read
+    """
+    from xplat.manifest import ManifestStats, write_manifest
+
+    stats = ManifestStats()
+    start = time.perf_counter()
+    manifest = output.open("w", encoding="utf-8", errors="surrogateescape") if output is not None else sys.stdout
+    try:
+        for file_path, digest in write_manifest(files, base_dir, manifest, jobs, stats):
+            if isinstance(digest, OSError):
+                typer.echo(f"{file_path}: {digest.strerror or digest}", err=True)
+    finally:
+        if output is not None:
+            manifest.close()
+    print_throughput(stats, time.perf_counter() - start)
+    return stats.unreadable
+
+
+def verify_manifest(manifest_path: Path, base_dir: Path | None, jobs: int | None) -> int:
+    """
+    Check files against a manifest, printing a line for each like sha256sum,
+    return the number of files that failed
+    """
+    from xplat.manifest import ManifestStats, check_manifest
+
+    stats = ManifestStats()
+    start = time.perf_counter()
+    for name, result in check_manifest(manifest_path, base_dir, jobs, stats):
+        if result is True:
+            typer.echo(f"{name}: OK")
+        elif result is False:
+            typer.secho(f"{name}: FAILED", fg=typer.colors.RED)
+        else:
+            typer.secho(f"{name}: FAILED open or read", fg=typer.colors.RED)
+    print_throughput(stats, time.perf_counter() - start)
+    if stats.bad_lines:
+        typer.echo(f"WARNING: {stats.bad_lines} lines are improperly formatted", err=True)
+    if stats.unreadable:
+        typer.echo(f"WARNING: {stats.unreadable} listed files could not be read", err=True)
+    if stats.failed:
+        typer.echo(f"WARNING: {stats.failed} computed checksums did NOT match", err=True)
+    return stats.failed + stats.unreadable
+
+
+def print_duplicates(groups: "list[DuplicateGroup]", stats: "DupeStats") -> None:
+    """
+    Print each group of duplicate files, then a summary of the work done
+    """
+    from xplat.list import format_bytes
+
+    for group in groups:
+        typer.secho(
+            f"{len(group.paths)} files of {format_bytes(group.size)}, {group.digest[:16]}",
+            fg=typer.colors.BRIGHT_YELLOW,
+        )
+        for path in group.paths:
+            typer.secho(f"  {path}", fg=typer.colors.GREEN)
+    wasted = sum(group.wasted_bytes for group in groups)
+    summary = f"Found {len(groups)} groups of duplicates, {format_bytes(wasted)} could be freed"
+    typer.echo("-" * len(summary))
+    typer.echo(summary)
+    typer.echo(f"Listed {stats.files} files: {stats.same_size} shared a size, {stats.full_hashed} were hashed in full")
+    for error in stats.errors:
+        print_error(f"Skipped: {error}")
+
+
+def usage_record(name: str | None, usage: "Usage") -> dict:
+    """
+    Create a JSON-ready record of the disk usage of a directory,
+    without a name for the total
+    """
+    from xplat.list import format_bytes
+
+    record: dict = {} if name is None else {"name": name}
+    return record | {
+        "files": usage.files,
+        "bytes": usage.size_bytes,
+        "size": format_bytes(usage.size_bytes),
+        "extensions": dict(usage.extensions.most_common()),
+        "errors": usage.errors,
+    }
+
+
+def print_usage_row(name: str, usage: "Usage", width: int, extensions: int) -> None:
+    """
+    Print a row of the disk usage table
+    """
+    from xplat.list import format_bytes
+
+    common = ", ".join(f"{ext or '(none)'} {count:,}" for ext, count in usage.extensions.most_common(extensions))
+    typer.echo(f"{name:<{width}}  {usage.files:>12,}  {format_bytes(usage.size_bytes):>10}  {common}")
+
+
+def print_usage_table(report: "dict[str, Usage]", extensions: int = 5) -> None:
+    """
+    Print disk usage by directory, largest first, then the total
+    """
+    from xplat.usage import total_usage
+
+    total = total_usage(report)
+    rows = sorted(report.items(), key=lambda item: (-item[1].size_bytes, item[0]))
+    width = max(len("Directory"), *(len(name) for name in report))
+    typer.secho(f"{'Directory':<{width}}  {'Files':>12}  {'Size':>10}  Extensions", fg=typer.colors.BRIGHT_YELLOW)
+    for name, usage in rows:
+        print_usage_row(name, usage, width, extensions)
+    # after the loop, a subdirectory may be named Total
+    typer.echo("-" * (width + 38))
+    print_usage_row("Total", total, width, extensions)
+    if total.errors:
+        print_error(f"{total.errors} directories could not be read.")
+
+
+def save_metrics(metrics: "RunMetrics", metrics_path: Path | None) -> None:
+    """
+    Finish timing a run, and write its metrics if a file is given.
+    A file that can't be written is reported, the run still succeeds.
+    """
+    metrics.finish()
+    if metrics_path is None:
+        return
+    from xplat.metrics import write_metrics
+
+    try:
+        write_metrics(metrics, metrics_path)
+    except OSError as e:
+        # on stderr, stdout may be JSON
+        typer.secho(f"Can't write metrics to {metrics_path}: {e}", fg=typer.colors.RED, err=True)
+
+
+def print_profile_report(report: "ProfileReport") -> None:
+    """
+    Print the hottest functions and largest allocations
+    of a profiled command on stderr
+    """
+    from xplat.list import format_bytes
+
+    if report.hot_functions:
+        typer.secho("Hot functions (self time):", fg=typer.colors.BRIGHT_YELLOW, err=True)
+        for function in report.hot_functions:
+            typer.echo(
+                f"{function.self_seconds * 1000:>10.1f} ms  {function.cumulative_seconds * 1000:>10.1f} ms cum"
+                f"  {function.calls:>9,} calls  {function.name}",
+                err=True,
+            )
+    if report.peak_bytes is not None:
+        typer.secho(
+            f"Allocations still held (peak {format_bytes(report.peak_bytes)}):", fg=typer.colors.BRIGHT_YELLOW, err=True
+        )
+        for allocation in report.allocations:
+            typer.echo(
+                f"{format_bytes(allocation.size_bytes):>12}  {allocation.count:>9,} blocks  {allocation.location}", err=True
+            )
+
+
+def finish_profile(session: "ProfileSession") -> None:
+    """
+    Stop profiling a command and print the summary.
+    Results that can't be saved are reported, and fail the run.
+    """
+    report = session.stop()
+    print_profile_report(report)
+    for error in report.errors:
+        print_error(f"Can't save profile results: {error}")
+    if report.errors:
+        raise typer.Exit(1)
+
+
 @app.callback()
 def main(
+    ctx: typer.Context,
     version: Annotated[
         bool | None,
         typer.Option(
@@ -236,46 +819,370 @@ def main(
             help="Print the version number.",
         ),
     ] = None,
+    profile: Annotated[
+        Path | None, typer.Option("--profile", help="Profile the command, save cProfile stats to this file")
+    ] = None,
+    trace_malloc: Annotated[
+        Path | None, typer.Option("--trace-malloc", help="Trace memory allocations, save a tracemalloc snapshot to this file")
+    ] = None,
+    profile_top: Annotated[
+        int, typer.Option("--profile-top", min=1, help="Functions and allocations shown after profiling")
+    ] = PROFILE_TOP,
 ) -> None:
-    """Empty function required for version callback"""
-    pass
+    """Options for every command, and the version callback"""
+    # nothing is imported or started unless asked for
+    if profile is not None or trace_malloc is not None:
+        from xplat.profiling import ProfileSession
+
+        session = ProfileSession(profile, trace_malloc, profile_top)
+        session.start()
+        # after the command, even if it fails
+        ctx.call_on_close(lambda: finish_profile(session))
 
 
 @app.command()
-def info() -> None:
+def info(
+    as_json: Annotated[bool, typer.Option("--json", help="Print the report as JSON")] = False,
+    as_kv: Annotated[bool, typer.Option("--kv", help="Print the report as key=value lines")] = False,
+    refresh: Annotated[bool, typer.Option("--refresh", help="Rebuild the cached report")] = False,
+    probe_dir: Annotated[
+        Path | None,
+        typer.Option("--probe", help="Measure CPUs, memory and this directory's latency, and recommend settings"),
+    ] = None,
+    metrics_path: MetricsOption = None,
+) -> None:
     """Display platform information."""
-    typer.echo(create_platform_report())
+    from xplat.info import ReportFormat, platform_report, render_report
+    from xplat.metrics import Phase, RunMetrics
+
+    if as_json and as_kv:
+        raise typer.BadParameter("Use either --json or --kv, not both.", param_hint="'--json' / '--kv'")
+    fmt = ReportFormat.JSON if as_json else ReportFormat.KEY_VALUE if as_kv else ReportFormat.TEXT
+    metrics = RunMetrics("info")
+    try:
+        with metrics.phase(Phase.DISCOVERY):
+            report = platform_report(refresh)
+        if probe_dir is not None:
+            from xplat.probe import probe, probe_sections
+
+            if not probe_dir.is_dir():
+                print_error(f"'{probe_dir}' is not a directory.")
+                raise typer.Exit(code=NO_FILE)
+            try:
+                with metrics.phase(Phase.DISCOVERY):
+                    result = probe(probe_dir)
+            except OSError as e:
+                print_error(f"Can't probe {probe_dir}: {e}")
+                raise typer.Exit(1) from e
+            report.sections.extend(probe_sections(result, probe_dir))
+        with metrics.phase(Phase.OUTPUT):
+            typer.echo(render_report(report, fmt))
+    finally:
+        save_metrics(metrics, metrics_path)
+
+
+@app.command()
+def du(
+    path: Annotated[Path | None, typer.Argument(help="Directory to summarize")] = None,
+    jobs: Annotated[
+        int | None, typer.Option("--jobs", "-j", min=1, help="Processes scanning subdirectories, default one per CPU")
+    ] = None,
+    as_json: Annotated[bool, typer.Option("--json", help="Print the report as JSON")] = False,
+    extensions: Annotated[int, typer.Option("--extensions", min=0, help="Most common extensions shown per directory")] = 5,
+) -> None:
+    """
+    Summarize files and bytes by subdirectory
+    """
+    if path is None:
+        path = Path.cwd()
+    if not path.is_dir():
+        print_error(f"'{path}' is not a directory.")
+        raise typer.Exit(code=NO_FILE)
+    from xplat.usage import disk_usage, total_usage
+
+    try:
+        report = disk_usage(path, jobs)
+    except OSError as e:
+        print_error(f"Can't read {path}: {e.strerror or e}")
+        raise typer.Exit(code=NO_FILE) from e
+    if as_json:
+        records = [usage_record(name, usage) for name, usage in report.items()]
+        total = usage_record(None, total_usage(report))
+        typer.echo(json.dumps({"root": str(path), "directories": records, "total": total}, indent=2))
+    else:
+        print_usage_table(report, extensions)
+
+
+@app.command()
+def checksum(
+    path: Annotated[
+        Path | None, typer.Argument(help="Directory to hash, or that the names in a manifest are relative to")
+    ] = None,
+    check: Annotated[Path | None, typer.Option("--check", "-c", help="Verify the files listed in a manifest")] = None,
+    output: Annotated[Path | None, typer.Option("--output", "-o", help="Write the manifest to this file")] = None,
+    recursive: Annotated[bool, typer.Option("--recursive", "-r", help="Include files in all subdirectories")] = False,
+    ext: Annotated[
+        list[str] | None, typer.Option("--ext", "-x", help="File extension filter, may be repeated or comma-separated")
+    ] = None,
+    include: IncludeOption = None,
+    exclude: ExcludeOption = None,
+    min_size: MinSizeOption = None,
+    max_size: MaxSizeOption = None,
+    newer: NewerOption = None,
+    older: OlderOption = None,
+    jobs: Annotated[
+        int | None, typer.Option("--jobs", "-j", min=1, help="Number of files to hash in parallel, default one per CPU")
+    ] = None,
+    index_path: Annotated[
+        Path | None, typer.Option("--index", help="Reuse listings of unchanged directories kept in this file")
+    ] = None,
+) -> None:
+    """
+    Write or verify a sha256sum-compatible checksum manifest
+    """
+    if check is not None:
+        if not check.is_file():
+            print_error(f"Manifest {check} does not exist.")
+            raise typer.Exit(code=NO_FILE)
+        if verify_manifest(check, path, jobs):
+            raise typer.Exit(1)
+        return
+
+    if path is None:
+        path = Path.cwd()
+    if not path.is_dir():
+        print_error(f"'{path}' is not a directory.")
+        raise typer.Exit(code=NO_FILE)
+    try:
+        file_filter = build_filter(ext, include, exclude, min_size, max_size, newer, older)
+    except ValueError as e:
+        print_error(str(e))
+        raise typer.Exit(BAD_REQUEST) from e
+
+    from xplat.list import scan_entries, sort_entries
+
+    index = open_index(index_path)
+    try:
+        entries = scan_entries(path, recursive=recursive, index=index, file_filter=file_filter)
+        # leave the manifest itself out, in name order for a stable manifest
+        files = (
+            entry.path
+            for entry in sort_entries(entries)
+            if output is None or entry.path.name != output.name or not entry.path.samefile(output)
+        )
+        if create_manifest(files, path, output, jobs):
+            raise typer.Exit(1)
+    finally:
+        if index is not None:
+            index.close()
+
+
+@app.command()
+def dupes(
+    path: Annotated[Path | None, typer.Argument(help="Directory to search")] = None,
+    recursive: Annotated[bool, typer.Option("--recursive", "-r", help="Include files in all subdirectories")] = False,
+    ext: Annotated[
+        list[str] | None, typer.Option("--ext", "-x", help="File extension filter, may be repeated or comma-separated")
+    ] = None,
+    include: IncludeOption = None,
+    exclude: ExcludeOption = None,
+    min_size: MinSizeOption = None,
+    max_size: MaxSizeOption = None,
+    newer: NewerOption = None,
+    older: OlderOption = None,
+    jobs: Annotated[int | None, typer.Option("--jobs", "-j", min=1, help="Number of files to hash in parallel")] = None,
+    as_json: Annotated[bool, typer.Option("--json", help="Print one JSON record per group of duplicates")] = False,
+) -> None:
+    """
+    Find files with the same contents
+    """
+    if path is None:
+        path = Path.cwd()
+    if not path.is_dir():
+        print_error(f"'{path}' is not a directory.")
+        raise typer.Exit(code=NO_FILE)
+    try:
+        file_filter = build_filter(ext, include, exclude, min_size, max_size, newer, older)
+    except ValueError as e:
+        print_error(str(e))
+        raise typer.Exit(BAD_REQUEST) from e
+
+    from xplat.dupes import DupeStats, find_duplicates
+    from xplat.list import scan_entries
+
+    stats = DupeStats()
+    groups = find_duplicates(scan_entries(path, recursive=recursive, file_filter=file_filter), jobs, stats=stats)
+    if as_json:
+        writer = JsonLinesWriter()
+        for group in groups:
+            writer.write({"size": group.size, "digest": group.digest, "paths": [str(path) for path in group.paths]})
+        writer.flush()
+    else:
+        print_duplicates(groups, stats)
 
 
 @app.command(name="list")
 def list_files(
     path: Annotated[Path | None, typer.Argument(help="Path to file or directory")] = None,
-    ext: Annotated[str | None, typer.Option("--ext", "-x", help="File extension filter")] = None,
+    ext: Annotated[
+        list[str] | None, typer.Option("--ext", "-x", help="File extension filter, may be repeated or comma-separated")
+    ] = None,
+    include: IncludeOption = None,
+    exclude: ExcludeOption = None,
+    min_size: MinSizeOption = None,
+    max_size: MaxSizeOption = None,
+    newer: NewerOption = None,
+    older: OlderOption = None,
+    as_json: Annotated[bool, typer.Option("--json", help="Print one JSON record per file, no prompt")] = False,
+    as_csv: Annotated[bool, typer.Option("--csv", help="Print one CSV row per file, no prompt")] = False,
+    long: Annotated[bool, typer.Option("--long", "-l", help="Include size and timestamps, no prompt")] = False,
+    sort: Annotated[
+        SortKey | None, typer.Option("--sort", help="Sort by name, size (largest first) or mtime (newest first)")
+    ] = None,
+    top: Annotated[int | None, typer.Option("--top", min=1, help="Only the first N files in sort order")] = None,
+    reverse: Annotated[bool, typer.Option("--reverse", help="Reverse the sort order")] = False,
+    index_path: Annotated[
+        Path | None, typer.Option("--index", help="Reuse listings of unchanged directories kept in this file")
+    ] = None,
+    concurrency: ConcurrencyOption = None,
+    metrics_path: MetricsOption = None,
 ) -> None:
     """
     List files in a directory, or info for a file
     """
     error_code = NO_FILE
+    if as_json and as_csv:
+        raise typer.BadParameter("Use either --json or --csv, not both.", param_hint="'--json' / '--csv'")
+    if index_path is not None and concurrency is not None:
+        raise typer.BadParameter("Use either --index or --concurrency, not both.", param_hint="'--concurrency'")
+    fmt = "json" if as_json else "csv" if as_csv else "text"
     if path is None:
         path = Path.cwd()
-    if path.is_file():
-        # list file information for a single file
-        print_file_info(path)
-    elif path.is_dir():
-        review_files(path, ext)
-    else:
-        raise typer.Exit(code=error_code)
+    from xplat.list import scan_entries, sort_entries
+    from xplat.metrics import Phase, RunMetrics
+
+    metrics = RunMetrics("list")
+    try:
+        if path.is_file():
+            # list file information for a single file
+            with metrics.phase(Phase.OUTPUT):
+                if as_json or as_csv or long:
+                    stream_files(metrics.scanned([path]), fmt, long=True)
+                else:
+                    metrics.files_scanned += 1
+                    print_file_info(path)
+        elif path.is_dir():
+            try:
+                file_filter = build_filter(ext, include, exclude, min_size, max_size, newer, older)
+            except ValueError as e:
+                print_error(str(e))
+                raise typer.Exit(BAD_REQUEST) from e
+            index = open_index(index_path)
+            try:
+                sort_key = sort or SortKey.NAME
+                if as_json or as_csv or long:
+                    # directory order, unless a sort is asked for
+                    entries: Iterable[ScanEntry] = metrics.scanned(
+                        scan_entries(
+                            path,
+                            index=index,
+                            file_filter=file_filter,
+                            stat=long or sort_key is not SortKey.NAME,
+                            concurrency=concurrency,
+                        )
+                    )
+                    if sort is not None or top is not None or reverse:
+                        entries = metrics.timed(sort_entries(entries, sort_key, reverse, top), Phase.PLANNING)
+                    with metrics.phase(Phase.OUTPUT):
+                        stream_files(entries, fmt, long)
+                else:
+                    review_files(
+                        path,
+                        index=index,
+                        file_filter=file_filter,
+                        sort_key=sort_key,
+                        reverse=reverse,
+                        top=top,
+                        concurrency=concurrency,
+                        metrics=metrics,
+                    )
+            finally:
+                if index is not None:
+                    index.close()
+        else:
+            raise typer.Exit(code=error_code)
+    finally:
+        save_metrics(metrics, metrics_path)
 
 
 @app.command()
 def rename(
-    source_dir: Annotated[Path, typer.Option("--source-dir", "-s", help="Source directory")],
+    source_dir: Annotated[Path | None, typer.Option("--source-dir", "-s", help="Source directory")] = None,
     output_dir: Annotated[Path | None, typer.Option("--output-dir", "-o", help="Output directory")] = None,
-    ext: Annotated[str | None, typer.Option("--ext", "-e", help="File extension filter")] = None,
+    ext: Annotated[
+        list[str] | None, typer.Option("--ext", "-e", help="File extension filter, may be repeated or comma-separated")
+    ] = None,
+    include: IncludeOption = None,
+    exclude: ExcludeOption = None,
+    min_size: MinSizeOption = None,
+    max_size: MaxSizeOption = None,
+    newer: NewerOption = None,
+    older: OlderOption = None,
     dry_run: Annotated[bool, typer.Option("--dry-run", "-n", help="Preview changes without modifying")] = False,
     interactive: Annotated[bool, typer.Option("--interactive", "-i", help="Interactive confirmation mode")] = False,
+    jobs: Annotated[int, typer.Option("--jobs", "-j", min=1, help="Number of files to rename in parallel")] = 1,
+    recursive: Annotated[bool, typer.Option("--recursive", "-r", help="Include files in all subdirectories")] = False,
+    on_collision: Annotated[
+        CollisionStrategy,
+        typer.Option("--on-collision", help="Skip files whose new name is taken, or add a numeric suffix"),
+    ] = CollisionStrategy.SKIP,
+    journal: Annotated[
+        Path | None, typer.Option("--journal", help="Record completed renames in this file, for --rollback")
+    ] = None,
+    rollback_journal: Annotated[
+        Path | None, typer.Option("--rollback", help="Undo the renames recorded in a journal, then exit")
+    ] = None,
+    copy: Annotated[bool, typer.Option("--copy", help="Copy files to their new names, keep the originals")] = False,
+    move: Annotated[bool, typer.Option("--move", help="Move files, copying them across filesystems")] = False,
+    output: Annotated[
+        OutputFormat, typer.Option("--output", help="Report each file, only errors, only counts, or JSON Lines")
+    ] = OutputFormat.PRETTY,
+    index_path: Annotated[
+        Path | None, typer.Option("--index", help="Reuse listings of unchanged directories kept in this file")
+    ] = None,
+    watch: Annotated[bool, typer.Option("--watch", help="Keep running, and rename new files once they stop changing")] = False,
+    settle: Annotated[
+        float, typer.Option("--settle", min=0, help="Seconds a new file must stop changing for, with --watch")
+    ] = SETTLE_TIME,
+    interval: Annotated[
+        float, typer.Option("--interval", min=0.01, help="Seconds between polls, where inotify isn't available")
+    ] = POLL_INTERVAL,
+    concurrency: ConcurrencyOption = None,
+    metrics_path: MetricsOption = None,
 ) -> None:
     """Convert file names for cross-platform compatibility"""
+    # undo a previous run, no source directory needed
+    if rollback_journal is not None:
+        if not rollback_journal.is_file():
+            typer.secho(f"Journal {rollback_journal} does not exist.", fg=typer.colors.RED)
+            raise typer.Exit(1)
+        try:
+            rollback_list(rollback_journal, dry_run)
+        except ValueError as e:
+            typer.secho(str(e), fg=typer.colors.RED)
+            raise typer.Exit(BAD_REQUEST) from e
+        return
+
+    if source_dir is None:
+        raise typer.BadParameter("Missing option, required unless --rollback is given.", param_hint="'--source-dir'")
+    if copy and move:
+        raise typer.BadParameter("Use either --copy or --move, not both.", param_hint="'--copy' / '--move'")
+    if watch and interactive:
+        raise typer.BadParameter("Use either --watch or --interactive, not both.", param_hint="'--watch'")
+    if index_path is not None and concurrency is not None:
+        raise typer.BadParameter("Use either --index or --concurrency, not both.", param_hint="'--concurrency'")
+    mode = TransferMode.COPY if copy else TransferMode.MOVE if move else TransferMode.RENAME
+
     # check source dir exists
     if not source_dir.exists():
         typer.secho(
@@ -292,47 +1199,76 @@ def rename(
         )
         raise typer.Exit(1)
 
-    # validate extension if specified
-    if ext is not None:
-        try:
-            ext = validate_extension(ext)
-        except ValueError as e:
-            typer.secho(str(e), fg=typer.colors.RED)
-            raise typer.Exit(1) from e
-
-    # get list of files
-    files = []
-    files_found = 0
-    for item in source_dir.iterdir():
-        if item.is_file():
-            if ext is not None:
-                if item.suffix == f".{ext}":
-                    files.append(item)
-                    files_found += 1
+    # validate extensions and other filters if specified
+    try:
+        file_filter = build_filter(ext, include, exclude, min_size, max_size, newer, older)
+    except ValueError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(1) from e
+
+    from xplat.journal import RenameJournal
+    from xplat.list import scan_entries
+    from xplat.metrics import RunMetrics
+
+    # stream files from the source tree, leaving out the output directory
+    metrics = RunMetrics("rename")
+    index = open_index(index_path)
+    files: Iterable[ScanEntry] = scan_entries(
+        source_dir,
+        recursive=recursive,
+        skip_dirs=[output_dir] if output_dir is not None else [],
+        index=index,
+        file_filter=file_filter,
+        concurrency=concurrency,
+    )
+
+    try:
+        # Only show file listing if in interactive mode or dry run
+        if interactive and not dry_run:
+            # the listing and confirmation need the whole batch
+            files = list(files)
+            files_found = len(files)
+            # display list of files
+            for count, file in enumerate(files, start=1):
+                typer.echo(f"{count}) {file.path.name}")
+            # display summary
+            typer.echo("----------------------")
+            typer.echo(f"Total files found = {files_found}")
+
+            # confirm rename
+            if output_dir is not None:
+                typer.echo("Selected files will be renamed and saved to:")
+                typer.echo(f"{output_dir}")
+                file_types = ", ".join(file_filter.exts) if file_filter is not None and file_filter.exts else None
+                if not typer.confirm(f"Rename {files_found} files of type '{file_types}'?"):
+                    raise typer.Abort()
             else:
-                files.append(item)
-                files_found += 1
-
-    # Only show file listing if in interactive mode or dry run
-    if interactive and not dry_run:
-        # display list of files
-        for count, file in enumerate(files, start=1):
-            typer.echo(f"{count}) {file.name}")
-        # display summary
-        typer.echo("----------------------")
-        typer.echo(f"Total files found = {files_found}")
-
-        # confirm rename
-        if output_dir is not None:
-            typer.echo("Selected files will be renamed and saved to:")
-            typer.echo(f"{output_dir}")
-            if not typer.confirm(f"Rename {files_found} files of type '{ext}'?"):
-                raise typer.Abort()
-        else:
-            if not typer.confirm("No output directory specified. Rename files?"):
-                raise typer.Abort()
+                if not typer.confirm("No output directory specified. Rename files?"):
+                    raise typer.Abort()
 
-    rename_list(files, output_dir, dry_run)
+        rename_journal = RenameJournal(journal) if journal is not None and not dry_run else None
+        try:
+            if watch:
+                watch_list(
+                    source_dir, output_dir, recursive, file_filter, settle, interval,
+                    dry_run, jobs, on_collision, rename_journal, mode, output, metrics,
+                )  # fmt: skip
+            else:
+                rename_list(files, output_dir, dry_run, jobs, on_collision, rename_journal, mode, output, metrics)
+        finally:
+            if rename_journal is not None:
+                rename_journal.close()
+                if rename_journal.unconfirmed:
+                    typer.secho(
+                        f"{rename_journal.unconfirmed} completed renames couldn't be recorded in {journal},"
+                        " --rollback still undoes them",
+                        fg=typer.colors.YELLOW,
+                        err=True,
+                    )
+    finally:
+        if index is not None:
+            index.close()
+        save_metrics(metrics, metrics_path)
 
 
 if __name__ == "__main__":
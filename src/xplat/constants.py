@@ -4,11 +4,13 @@ Uses errno values: https://docs.python.org/3/library/errno.html
 """
 
 import errno
-from importlib.metadata import PackageNotFoundError, version
 
 
 def _get_version() -> str:
     """Get package version from installed metadata, with fallback."""
+    # importlib.metadata is slow to import, so only when asked for
+    from importlib.metadata import PackageNotFoundError, version
+
     try:
         return version("xplat")
     except PackageNotFoundError:
@@ -17,10 +19,18 @@ def _get_version() -> str:
 
 PROGRAM_NAME = "xplat"
 APP_HELP = "Cross-platform tools for batch file management and conversion"
-VERSION = _get_version()
 
 NO_ERROR = 0
 MISSING_COMMAND = 2  # defined by typer
 NO_FILE = errno.ENOENT  # no such file or directory
 NO_DATA = errno.ENODATA  # no data available
 BAD_REQUEST = errno.EBADMSG  # not a data message
+
+
+def __getattr__(name: str) -> str:
+    """Resolve VERSION on first use, then keep it"""
+    if name == "VERSION":
+        globals()["VERSION"] = _get_version()
+        return globals()["VERSION"]
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -0,0 +1,129 @@
+"""
+Find files with the same contents.
+
+Files are compared in stages, each ruling out most of what is left
+before a more expensive one runs:
+
+1. group by size, from the stat results of the listing
+2. hash the first and last block of files that share a size
+3. hash the whole file, for files that share a partial hash
+
+Files of up to two blocks are fully hashed in the second stage, and are
+not read again.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+from xplat.hashing import DEFAULT_ALGORITHM, PARTIAL_BLOCK, hash_file, partial_hash
+from xplat.list import ScanEntry
+
+
+@dataclass(slots=True)
+class DuplicateGroup:
+    """Files with the same contents"""
+
+    size: int
+    digest: str
+    paths: list[Path]
+
+    @property
+    def wasted_bytes(self) -> int:
+        """Bytes used by every copy but one"""
+        return self.size * (len(self.paths) - 1)
+
+
+@dataclass(slots=True)
+class DupeStats:
+    """How many files each stage left to compare"""
+
+    files: int = 0  # files listed
+    same_size: int = 0  # partially hashed
+    full_hashed: int = 0  # hashed in full
+    errors: list[OSError] = field(default_factory=list)
+
+
+def _groups(keys: Mapping[Path, Hashable]) -> list[list[Path]]:
+    """Paths that share a key, in groups of two or more"""
+    groups: dict[Hashable, list[Path]] = defaultdict(list)
+    for path, key in keys.items():
+        groups[key].append(path)
+    return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def _hash_all(
+    executor: ThreadPoolExecutor, hasher: Callable[[Path], str], paths: list[Path], stats: DupeStats
+) -> dict[Path, str]:
+    """Hash files in the pool, leaving out those that can't be read"""
+
+    def safe_hash(path: Path) -> str | OSError:
+        try:
+            return hasher(path)
+        except OSError as e:
+            return e
+
+    digests = {}
+    for path, digest in zip(paths, executor.map(safe_hash, paths), strict=True):
+        if isinstance(digest, OSError):
+            stats.errors.append(digest)
+        else:
+            digests[path] = digest
+    return digests
+
+
+def find_duplicates(
+    entries: Iterable[ScanEntry],
+    jobs: int | None = None,
+    algorithm: str = DEFAULT_ALGORITHM,
+    block: int = PARTIAL_BLOCK,
+    stats: DupeStats | None = None,
+) -> list[DuplicateGroup]:
+    """Find files with the same contents.
+
+    Empty files are left out, and hard links to the same file are
+    listed once.
+
+    Args:
+        entries: Files from scan_entries()
+        jobs: Threads hashing files, default from ThreadPoolExecutor
+        algorithm: hashlib algorithm for the digests
+        block: Bytes hashed from each end of a file in the partial stage
+        stats: Optional DupeStats, filled in with the work done
+
+    Returns:
+        Groups of duplicates, most wasted bytes first
+    """
+    stats = stats if stats is not None else DupeStats()
+    sizes: dict[Path, int] = {}
+    inodes = set()
+    for entry in entries:
+        stats.files += 1
+        try:
+            stat_result = entry.stat_result or entry.path.stat()
+        except OSError as e:
+            stats.errors.append(e)
+            continue
+        inode = (stat_result.st_dev, stat_result.st_ino)
+        if stat_result.st_size and inode not in inodes:
+            inodes.add(inode)
+            sizes[entry.path] = stat_result.st_size
+
+    candidates = [path for group in _groups(sizes) for path in group]
+    stats.same_size = len(candidates)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        partials = _hash_all(executor, partial(partial_hash, block=block, algorithm=algorithm), candidates, stats)
+        keys = {path: (sizes[path], digest) for path, digest in partials.items()}
+        # a partial hash of a small file covers all of it
+        to_hash = [path for group in _groups(keys) if sizes[group[0]] > 2 * block for path in group]
+        stats.full_hashed = len(to_hash)
+        digests = _hash_all(executor, partial(hash_file, algorithm=algorithm), to_hash, stats)
+    keys.update((path, (sizes[path], digest)) for path, digest in digests.items())
+    for path in set(to_hash) - digests.keys():
+        del keys[path]
+
+    groups = [DuplicateGroup(*keys[paths[0]], paths) for paths in _groups(keys)]
+    return sorted(groups, key=lambda group: (-group.wasted_bytes, group.paths[0]))
@@ -0,0 +1,98 @@
+"""
+Hash file contents.
+
+Large files are hashed through mmap, so the data is hashed straight
+from the page cache without being copied into Python buffers; small
+files, where mapping costs more than it saves, are read in one large
+read. hashlib releases the GIL while it works, so a thread pool hashes
+several files at once.
+"""
+
+import hashlib
+import mmap
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import batched
+from pathlib import Path
+
+# hash used unless another is asked for
+DEFAULT_ALGORITHM = "sha256"
+# bytes read from each end of a file for a partial hash
+PARTIAL_BLOCK = 64 * 1024
+# files this size or larger are mapped, smaller ones are read
+MMAP_THRESHOLD = 1 << 20
+# files hashed per worker in each batch, bounds memory for huge listings
+HASH_BATCH_PER_JOB = 64
+
+
+def file_digest(file_path: Path, algorithm: str = DEFAULT_ALGORITHM) -> tuple[str, int]:
+    """Return the hex digest of a file's contents, and the bytes hashed"""
+    digest = hashlib.new(algorithm)
+    hashed = 0
+    with file_path.open("rb") as file:
+        if os.fstat(file.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                digest.update(mapped)
+                hashed = len(mapped)
+        else:
+            # usually one read, unless the file grew
+            while chunk := file.read(MMAP_THRESHOLD):
+                digest.update(chunk)
+                hashed += len(chunk)
+    return digest.hexdigest(), hashed
+
+
+def hash_file(file_path: Path, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """Return the hex digest of a file's contents"""
+    return file_digest(file_path, algorithm)[0]
+
+
+def _safe_digest(file_path: Path, algorithm: str) -> tuple[Path, str | OSError, int]:
+    try:
+        return file_path, *file_digest(file_path, algorithm)
+    except OSError as e:
+        return file_path, e, 0
+
+
+def hash_files(
+    file_paths: Iterable[Path], jobs: int | None = None, algorithm: str = DEFAULT_ALGORITHM
+) -> Iterator[tuple[Path, str | OSError, int]]:
+    """Hash files in a pool of threads.
+
+    Files are taken in batches, so only a few per thread are in flight
+    however many there are.
+
+    Args:
+        file_paths: Files to hash
+        jobs: Number of files to hash at once, default one per CPU
+        algorithm: hashlib algorithm
+
+    Yields:
+        Tuple of each path, its hex digest or the OSError that prevented
+        it, and the bytes hashed, in the order of file_paths
+    """
+    jobs = jobs or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for batch in batched(file_paths, jobs * HASH_BATCH_PER_JOB):
+            yield from executor.map(partial(_safe_digest, algorithm=algorithm), batch)
+
+
+def partial_hash(file_path: Path, block: int = PARTIAL_BLOCK, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """Return the hex digest of the first and last block of a file.
+
+    For a file of up to two blocks, this is the same as hash_file().
+    """
+    digest = hashlib.new(algorithm)
+    with file_path.open("rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size <= 2 * block:
+            digest.update(file.read())
+        else:
+            digest.update(file.read(block))
+            file.seek(size - block)
+            digest.update(file.read(block))
+    return digest.hexdigest()
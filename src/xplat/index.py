@@ -0,0 +1,174 @@
+"""
+Persistent index of directory listings, so repeated runs over the same
+large directories don't list and stat every file again.
+
+Each directory's entries are stored with their stat results, keyed by
+the directory's absolute path and validated by its own mtime: adding,
+removing or renaming a file changes the directory's mtime, and only
+then is the directory listed again. Files whose name and inode haven't
+changed keep their stored stat results.
+
+Writing to a file does not change its directory's mtime, so sizes and
+timestamps served from the index can be older than the file's contents.
+The list of names is always current.
+
+Paths and names are stored as os.fsencode() bytes, since on POSIX a
+file name may be any bytes, not only valid UTF-8.
+"""
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import TracebackType
+
+from xplat.list import stat_from_row, stat_to_row
+
+# bump when the tables change, older indexes are rebuilt
+INDEX_VERSION = 2
+# a directory modified this recently may change again within the same
+# mtime tick, so its listing is stored but not trusted on the next run
+RACY_WINDOW_NS = 2_000_000_000
+
+# entry kinds, stored as bit flags
+_FILE = 1  # a file, following symlinks
+_DIR = 2  # a directory, following symlinks
+_SYMLINK = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path BLOB PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    dir BLOB NOT NULL,
+    name BLOB NOT NULL,
+    kind INTEGER NOT NULL,
+    mode INTEGER, ino INTEGER, dev INTEGER, nlink INTEGER, uid INTEGER, gid INTEGER,
+    size INTEGER, atime_ns INTEGER, mtime_ns INTEGER, ctime_ns INTEGER,
+    PRIMARY KEY (dir, name)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class IndexedEntry:
+    """A directory entry served from the index, used like os.DirEntry"""
+
+    name: str
+    path: str
+    kind: int
+    stat_result: os.stat_result | None = field(default=None, compare=False, repr=False)
+
+    def is_file(self) -> bool:
+        return bool(self.kind & _FILE)
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        if not follow_symlinks and self.is_symlink():
+            return False
+        return bool(self.kind & _DIR)
+
+    def is_symlink(self) -> bool:
+        return bool(self.kind & _SYMLINK)
+
+
+class DirectoryIndex:
+    """On-disk index of directory listings, stored in SQLite"""
+
+    def __init__(self, index_path: Path) -> None:
+        self.index_path = index_path
+        self._conn = sqlite3.connect(index_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self._conn.executescript(
+                f"DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS entries; PRAGMA user_version = {INDEX_VERSION};"
+            )
+        self._conn.executescript(_SCHEMA)
+        # directories served from the index, and listed again, this session
+        self.hits = 0
+        self.misses = 0
+
+    def listing(self, directory: str | Path) -> list[IndexedEntry]:
+        """Return the entries of a directory, from the index if it hasn't changed.
+
+        Raises:
+            OSError: If the directory can't be read, as os.scandir() would
+        """
+        key = os.fsencode(Path(directory).absolute())
+        mtime_ns = Path(directory).stat().st_mtime_ns
+        row = self._conn.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (key,)).fetchone()
+        stored = self._stored_entries(directory, key)
+        if row is not None and row[0] == mtime_ns:
+            self.hits += 1
+            return list(stored.values())
+        self.misses += 1
+        return self._relist(directory, key, mtime_ns, stored)
+
+    def _stored_entries(self, directory: str | Path, key: bytes) -> dict[str, IndexedEntry]:
+        rows = self._conn.execute(
+            "SELECT name, kind, mode, ino, dev, nlink, uid, gid, size, atime_ns, mtime_ns, ctime_ns"
+            " FROM entries WHERE dir = ?",
+            (key,),
+        )
+        stored = {}
+        for raw_name, kind, *stat_row in rows:
+            name = os.fsdecode(raw_name)
+            stored[name] = IndexedEntry(name, str(Path(directory, name)), kind, stat_from_row(stat_row))
+        return stored
+
+    def _relist(self, directory: str | Path, key: bytes, mtime_ns: int, stored: dict[str, IndexedEntry]) -> list[IndexedEntry]:
+        """List a changed directory, stat only new or replaced files"""
+        entries = []
+        with os.scandir(directory) as it:
+            for dir_entry in it:
+                kind = _FILE * dir_entry.is_file() | _DIR * dir_entry.is_dir() | _SYMLINK * dir_entry.is_symlink()
+                old = stored.get(dir_entry.name)
+                stat_result = None
+                if kind & _FILE:
+                    if old is not None and old.stat_result is not None and old.stat_result.st_ino == dir_entry.inode():
+                        stat_result = old.stat_result
+                    else:
+                        stat_result = dir_entry.stat()
+                entries.append(IndexedEntry(dir_entry.name, str(Path(directory, dir_entry.name)), kind, stat_result))
+
+        # forget subdirectories that are gone
+        names = {entry.name for entry in entries}
+        for old in stored.values():
+            if old.is_dir(follow_symlinks=False) and old.name not in names:
+                self._forget(os.fsencode(Path(os.fsdecode(key), old.name)))
+
+        # a racily clean directory is listed again next time
+        racy = mtime_ns >= time.time_ns() - RACY_WINDOW_NS
+        self._conn.execute("DELETE FROM entries WHERE dir = ?", (key,))
+        self._conn.executemany(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((key, os.fsencode(entry.name), entry.kind, *stat_to_row(entry.stat_result)) for entry in entries),
+        )
+        self._conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (key, -1 if racy else mtime_ns))
+        return entries
+
+    def _forget(self, key: bytes) -> None:
+        """Remove a directory and everything below it from the index"""
+        sep = os.fsencode(os.sep)
+        below = key.rstrip(sep) + sep
+        params = (key, len(below), below)
+        self._conn.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", params)
+        self._conn.execute("DELETE FROM entries WHERE dir = ? OR substr(dir, 1, ?) = ?", params)
+
+    def close(self) -> None:
+        """Save the listings made this session and close the index"""
+        self._conn.commit()
+        self._conn.close()
+
+    def __enter__(self) -> "DirectoryIndex":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
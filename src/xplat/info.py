@@ -1,12 +1,63 @@
 """
 Get information about the current platform, like system, OS, python.
+
+Some of the platform module's calls are slow: on Linux libc_ver() reads
+the interpreter binary, and elsewhere some calls run subprocesses. The
+report is built once as a PlatformReport and cached on disk, keyed by
+the interpreter, its build and the kernel, then rendered as text, JSON
+or key=value lines.
 """
 
+import json
+import os
 import platform
+import sys
+from dataclasses import asdict, dataclass, field
+from enum import StrEnum
+from pathlib import Path
 
 NOT_FOUND = "(not found)"
 STD_COLUMN = 14
 WIDE_COLUMN = 28
+# bump when the report's contents change, to ignore older caches
+REPORT_CACHE_VERSION = 2
+
+
+class ReportFormat(StrEnum):
+    """How a platform report is rendered"""
+
+    TEXT = "text"
+    JSON = "json"
+    KEY_VALUE = "kv"
+
+
+@dataclass(slots=True)
+class ReportSection:
+    """A titled group of labelled values"""
+
+    title: str
+    rows: list[tuple[str, str]] = field(default_factory=list)
+    tab_stop: int = WIDE_COLUMN
+    mark_empty: bool = True  # empty values shown as NOT_FOUND in text
+
+
+@dataclass(slots=True)
+class PlatformReport:
+    """Platform information, built once and rendered in any format"""
+
+    summary: str  # platform.platform()
+    sections: list[ReportSection] = field(default_factory=list)
+    unidentified: str | None = None  # system name, if not a known OS
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlatformReport":
+        sections = [
+            ReportSection(
+                section["title"], [tuple(row) for row in section["rows"]], section["tab_stop"], section["mark_empty"]
+            )
+            for section in data["sections"]
+        ]
+        return cls(data["summary"], sections, data["unidentified"])
 
 
 def add_header(label: str, tab_stop: int = WIDE_COLUMN, indent: int = 2, char: str = "-") -> str:
@@ -21,82 +72,172 @@ def add_row(label: str, value: str, tab_stop: int = STD_COLUMN) -> str:
     return f"{label}: {padding} {value}\n"
 
 
-def add_list(two_column_list: list, tab_stop: int = WIDE_COLUMN) -> str:
-    """add a list of two-column rows at specified tab stop"""
-    new_rows = ""
-    for label, property in two_column_list:
-        # check for empty strings
-        value = property or NOT_FOUND
-        new_rows += add_row(label, value, tab_stop)
-    return new_rows
+def add_list(two_column_list: list, tab_stop: int = WIDE_COLUMN, mark_empty: bool = True) -> str:
+    """add a list of two-column rows at specified tab stop,
+    empty values shown as NOT_FOUND if mark_empty"""
+    # check for empty strings
+    return "".join(add_row(label, value or NOT_FOUND if mark_empty else value, tab_stop) for label, value in two_column_list)
 
 
-# create platform report
-def create_platform_report() -> str:
-    """
-    Create a report of platform information as a string for console output.
-    """
+def _key(label: str) -> str:
+    """Machine-readable key for a label, e.g. python_version"""
+    return label.lower().replace(" ", "_")
 
-    platform_rpt = add_header("Platform")
 
-    # use platform summary
-    platform_summary = platform.platform()
-    platform_rpt += f"{platform_summary}\n"
+def build_platform_report() -> PlatformReport:
+    """
+    Collect platform information, calling the platform module.
+    """
+    report = PlatformReport(platform.platform())
 
-    # get uname data (system, node, release, version, machine)
-    platform_rpt += add_header("System")
-    # returns named tuple uname
+    # uname data (system, node, release, version, machine), title-case the name
     sys_info = platform.uname()
-    # tuple of the named tuple labels
-    sys_labels = sys_info._fields
-    # zip the two tuples together, title-case the name
-    for label, value in zip(sys_labels, sys_info, strict=False):
-        platform_rpt += add_row(label.title(), value)
-
-    # get python executable info
-    platform_rpt += add_header("Python")
+    sys_rows = [(label.title(), value) for label, value in zip(sys_info._fields, sys_info, strict=False)]
+    # empty values shown as they are, like the Linux and macOS rows
+    report.sections.append(ReportSection("System", sys_rows, STD_COLUMN, mark_empty=False))
 
+    # python executable info
     python_info = [
-        ["Python Branch", platform.python_branch()],
-        ["Python Compiler", platform.python_compiler()],
-        ["Python Implementation", platform.python_implementation()],
-        ["Python Revision", platform.python_revision()],
-        ["Python Version", platform.python_version()],
+        ("Python Branch", platform.python_branch()),
+        ("Python Compiler", platform.python_compiler()),
+        ("Python Implementation", platform.python_implementation()),
+        ("Python Revision", platform.python_revision()),
+        ("Python Version", platform.python_version()),
     ]
+    report.sections.append(ReportSection("Python", python_info))
 
-    platform_rpt += add_list(python_info)
-
-    # execute platform-specific code
+    # platform-specific information
     sys_name = platform.system()
     # impossible to test this code on all platforms
     if sys_name == "Linux":  # pragma: no cover
-        platform_rpt += add_header("Linux")
         # libc_ver is a 2-element tuple
         libc_info = platform.libc_ver()
-        platform_rpt += add_row("libc Library", libc_info[0], tab_stop=WIDE_COLUMN)
-        platform_rpt += add_row("libc Version", libc_info[1], tab_stop=WIDE_COLUMN)
+        libc_rows = [("libc Library", libc_info[0]), ("libc Version", libc_info[1])]
+        report.sections.append(ReportSection("Linux", libc_rows, mark_empty=False))
     elif sys_name == "Darwin":  # pragma: no cover
-        platform_rpt += add_header("macOS")
-        mac_ver = platform.mac_ver()
-        platform_rpt += add_row("macOS Version", mac_ver[0], tab_stop=WIDE_COLUMN)
+        report.sections.append(ReportSection("macOS", [("macOS Version", platform.mac_ver()[0])], mark_empty=False))
     elif sys_name == "Windows":  # pragma: no cover
-        platform_rpt += add_header("Windows")
         win_ver = platform.win32_ver()
         iot = "Yes" if platform.win32_is_iot() else "No"
         windows_info = [
-            ["Windows Edition", platform.win32_edition()],
-            ["Windows Release", win_ver[0]],
-            ["Windows Version", win_ver[1]],
-            ["Windows Service Pack", win_ver[2]],
-            ["Windows OS Type", win_ver[3]],
-            ["Windows IoT Edition", iot],
+            ("Windows Edition", platform.win32_edition()),
+            ("Windows Release", win_ver[0]),
+            ("Windows Version", win_ver[1]),
+            ("Windows Service Pack", win_ver[2]),
+            ("Windows OS Type", win_ver[3]),
+            ("Windows IoT Edition", iot),
         ]
-        platform_rpt += add_list(windows_info)
+        report.sections.append(ReportSection("Windows", windows_info))
     else:  # pragma: no cover
-        if sys_name == "":
-            sys_name = NOT_FOUND
-        platform_rpt += f"\nUnidentified system name: {sys_name}\n"
-    return platform_rpt
+        report.unidentified = sys_name or NOT_FOUND
+    return report
+
+
+def cache_dir() -> Path:
+    """Directory for xplat's cached data, following the XDG base directories"""
+    if sys.platform == "win32":  # pragma: no cover
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "xplat"
+
+
+def _cache_key() -> list:
+    """What the report depends on, all cheap to find: the interpreter,
+    its build, and the kernel it runs on"""
+    executable = Path(sys.executable)
+    try:
+        stat_result = executable.stat()
+        binary = [stat_result.st_size, stat_result.st_mtime_ns]
+    except OSError:
+        binary = []
+    kernel = list(os.uname()) if hasattr(os, "uname") else list(sys.getwindowsversion())  # type: ignore[attr-defined]
+    return [REPORT_CACHE_VERSION, str(executable), binary, sys.version, sys.implementation.name, kernel]
+
+
+def _cache_path() -> Path:
+    """Cache file for the running interpreter"""
+    # one file per interpreter, replaced when its build or the kernel changes
+    import hashlib
+
+    name = hashlib.blake2b(os.fsencode(sys.executable), digest_size=8).hexdigest()
+    return cache_dir() / f"platform-{name}.json"
+
+
+def platform_report(refresh: bool = False) -> PlatformReport:
+    """
+    Return the platform report from the cache, building
+    and caching it if it is missing, stale or refresh is True.
+    The cache is only a shortcut: if it can't be read or
+    written, the report is built as usual.
+    """
+    key = _cache_key()
+    cache_path = _cache_path()
+    if not refresh:
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached["key"] == key:
+                return PlatformReport.from_dict(cached["report"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    report = build_platform_report()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps({"key": key, "report": asdict(report)}), encoding="utf-8")
+        # atomic, so a concurrent run never reads half a file
+        temp_path.replace(cache_path)
+    except OSError:
+        pass
+    return report
+
+
+def render_text(report: PlatformReport) -> str:
+    """Render a report for console output"""
+    parts = [add_header("Platform"), f"{report.summary}\n"]
+    for section in report.sections:
+        parts.append(add_header(section.title))
+        parts.append(add_list(section.rows, section.tab_stop, section.mark_empty))
+    if report.unidentified is not None:  # pragma: no cover
+        parts.append(f"\nUnidentified system name: {report.unidentified}\n")
+    return "".join(parts)
+
+
+def report_record(report: PlatformReport) -> dict:
+    """A JSON-ready record of a report, keyed by section and label"""
+    record: dict = {"platform": report.summary}
+    for section in report.sections:
+        record[_key(section.title)] = {_key(label): value for label, value in section.rows}
+    if report.unidentified is not None:  # pragma: no cover
+        record["unidentified_system"] = report.unidentified
+    return record
+
+
+def render_key_value(report: PlatformReport) -> str:
+    """Render a report as key=value lines, e.g. python.python_version=3.12.1"""
+    lines = [f"platform={report.summary}"]
+    for section in report.sections:
+        lines.extend(f"{_key(section.title)}.{_key(label)}={value}" for label, value in section.rows)
+    if report.unidentified is not None:  # pragma: no cover
+        lines.append(f"unidentified_system={report.unidentified}")
+    return "\n".join(lines)
+
+
+def render_report(report: PlatformReport, fmt: ReportFormat = ReportFormat.TEXT) -> str:
+    """Render a report as text, JSON or key=value lines"""
+    if fmt is ReportFormat.JSON:
+        return json.dumps(report_record(report), indent=2)
+    if fmt is ReportFormat.KEY_VALUE:
+        return render_key_value(report)
+    return render_text(report)
+
+
+# create platform report
+def create_platform_report() -> str:
+    """
+    Create a report of platform information as a string for console output.
+    """
+    return render_text(build_platform_report())
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,195 @@
+"""
+Append-only journal of renames, so a batch that is killed partway
+through can be rolled back.
+
+Each line is a JSON record. A rename is recorded before it is made,
+marked pending, and again once it is done, so a rename whose second
+record is missing, because the process was killed or the journal
+couldn't be written, can still be undone. Every record is flushed to
+the operating system as it is written, so killing the process loses
+nothing; fsync is batched (group commit), so a power failure can lose
+at most the last `sync_every` records or `sync_interval` seconds.
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from types import TracebackType
+
+from xplat.options import TransferMode
+from xplat.transfer import move_file
+
+SYNC_EVERY = 256  # records between fsyncs
+SYNC_INTERVAL = 0.5  # seconds between fsyncs
+
+
+class RenameJournal:
+    """Writer for a rename journal, safe to share between threads"""
+
+    def __init__(self, journal_path: Path, sync_every: int = SYNC_EVERY, sync_interval: float = SYNC_INTERVAL) -> None:
+        self.journal_path = journal_path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = journal_path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        # completed renames whose record couldn't be written
+        self.unconfirmed = 0
+
+    def begin(self, orig_path: Path, new_path: Path, mode: TransferMode = TransferMode.RENAME) -> None:
+        """Append a rename about to be made, before making it"""
+        self._write(_record(orig_path, new_path, mode) | {"pending": True})
+
+    def complete(self, orig_path: Path, new_path: Path, mode: TransferMode = TransferMode.RENAME) -> None:
+        """Append a rename recorded by begin() once it is done.
+
+        The rename has happened either way, and the pending record is
+        enough to undo it, so an error is counted in unconfirmed, not raised.
+        """
+        try:
+            self._write(_record(orig_path, new_path, mode))
+        except OSError:
+            with self._lock:
+                self.unconfirmed += 1
+
+    def record(self, orig_path: Path, new_path: Path, mode: TransferMode = TransferMode.RENAME) -> None:
+        """Append a completed rename"""
+        self._write(_record(orig_path, new_path, mode))
+
+    def _write(self, record: dict) -> None:
+        """Append a record, fsync if a group is due"""
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """Sync any remaining records and close the journal"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._sync()
+            self._file.close()
+
+    def __enter__(self) -> "RenameJournal":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def _record(orig_path: Path, new_path: Path, mode: TransferMode) -> dict:
+    record = {"from": str(orig_path.absolute()), "to": str(new_path.absolute())}
+    if mode is not TransferMode.RENAME:
+        record["mode"] = mode.value
+    return record
+
+
+def read_journal(journal_path: Path) -> list[tuple[Path, Path, TransferMode, bool]]:
+    """Read the original and new paths, how the file got there, and
+    whether the rename was completed, recorded in a journal.
+
+    Renames are in the order they were begun, one for each time a file
+    was renamed, so a journal reused by several runs is undone in full.
+    A last line that was cut short by a crash is ignored.
+
+    Raises:
+        ValueError: If a line before the last isn't a JSON record
+    """
+    entries: list[tuple[Path, Path, TransferMode, bool]] = []
+    # index in entries of the latest rename begun and not completed, by paths and mode
+    pending: dict[tuple[Path, Path, TransferMode], int] = {}
+    corrupt_line = None
+    with journal_path.open(encoding="utf-8") as journal_file:
+        for line_number, line in enumerate(journal_file, start=1):
+            if corrupt_line is not None:
+                msg = f"Journal {journal_path} is corrupt at line {corrupt_line}"
+                raise ValueError(msg)
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                corrupt_line = line_number
+                continue
+            key = (Path(record["from"]), Path(record["to"]), TransferMode(record.get("mode", TransferMode.RENAME)))
+            if record.get("pending", False):
+                pending[key] = len(entries)
+                entries.append((*key, False))
+            elif key in pending:
+                # a completed record keeps the place of its pending one
+                entries[pending.pop(key)] = (*key, True)
+            else:
+                entries.append((*key, True))
+    return entries
+
+
+def _undo_error(orig_path: Path, new_path: Path, mode: TransferMode) -> OSError | None:
+    """Why a completed rename can't be undone, None if it can"""
+    if not new_path.is_file() or new_path.is_symlink():
+        return FileNotFoundError(f"Not a file: {new_path}")
+    if mode is TransferMode.COPY and not orig_path.is_file():
+        # keep the only remaining copy
+        return FileNotFoundError(f"Original of copy is missing: {orig_path}")
+    if mode is not TransferMode.COPY and orig_path.exists():
+        return FileExistsError(f"File already exists: {orig_path}")
+    return None
+
+
+def _was_made(orig_path: Path, new_path: Path, mode: TransferMode) -> bool:
+    """Whether a pending rename was made, or partly made"""
+    if not new_path.is_file() or new_path.is_symlink():
+        return False
+    # a rename is atomic, with both files there it never happened;
+    # a copy, or a move across filesystems, was made or cut short
+    return mode is not TransferMode.RENAME or not orig_path.exists()
+
+
+def rollback(journal_path: Path, dry_run: bool = False) -> Iterator[tuple[Path, Path, OSError | None]]:
+    """Undo the renames in a journal, most recent first.
+
+    Renamed and moved files are moved back, copies are removed.
+    Pending renames that were never made are left out; those that
+    were are undone, and a move cut short is undone like a copy.
+
+    Args:
+        journal_path: Journal written by RenameJournal
+        dry_run: If True, only check which renames can be undone
+
+    Yields:
+        Tuple of the renamed path, the original path it is restored to,
+        and the OSError that prevented it, if any
+    """
+    for orig_path, new_path, mode, complete in reversed(read_journal(journal_path)):
+        if not complete:
+            if not _was_made(orig_path, new_path, mode):
+                continue
+            if mode is TransferMode.MOVE and orig_path.exists():
+                # the copy was made, the original not yet removed
+                mode = TransferMode.COPY
+        error = _undo_error(orig_path, new_path, mode)
+        if error is None and not dry_run:
+            try:
+                if mode is TransferMode.COPY:
+                    new_path.unlink()
+                else:
+                    move_file(new_path, orig_path)
+            except OSError as e:
+                error = e
+        yield new_path, orig_path, error
@@ -1,8 +1,36 @@
 """File handling functions."""
 
-from dataclasses import dataclass
+import heapq
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import suppress
+from dataclasses import InitVar, dataclass, field, replace
 from datetime import datetime
+from fnmatch import translate
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+from xplat.options import SortKey
+
+if TYPE_CHECKING:
+    from xplat.index import DirectoryIndex, IndexedEntry
+
+# FileInfo kept by FileInfoCache, caps memory for huge listings
+FILE_INFO_CACHE_SIZE = 1024
+# size units accepted by parse_size, powers of 1024 like format_bytes
+SIZE_UNITS = {"": 0, "B": 0, "K": 1, "KB": 1, "M": 2, "MB": 2, "G": 3, "GB": 3, "T": 4, "TB": 4}
+# age units accepted by parse_time, in seconds
+AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+# entries sorted in memory before sort_entries spills a run to disk
+SORT_RUN_SIZE = 100_000
+# names match regardless of case where paths do, e.g. on Windows, like Path.glob
+FOLD_CASE = os.path.normcase("A") == "a"
 
 
 def format_bytes(num_bytes: float) -> str:
@@ -68,27 +96,428 @@ def validate_extension(ext: str) -> str:
     return ext
 
 
-def create_file_list(dir_path: Path, file_glob: str | None = None) -> list:
-    """Create a list of files in a directory, return the sorted list."""
-    if file_glob is None:
-        return sorted(dir_path.glob("*.*"))
-    ext = validate_extension(file_glob)
-    globber = f"*.{ext}"
-    return sorted(dir_path.glob(globber))
+def parse_size(size: str) -> int:
+    """Convert a size such as 512, 10K or 1.5MB to a number of bytes.
+
+    Raises:
+        ValueError: If the size isn't a number with an optional unit
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", size)
+    if match is None or match[2].upper() not in SIZE_UNITS:
+        msg = f"Invalid size: '{size}' (use a number of bytes, or a unit like 10K, 5MB or 1GB)"
+        raise ValueError(msg)
+    return int(float(match[1]) * 1024 ** SIZE_UNITS[match[2].upper()])
+
+
+def parse_time(value: str, now: float | None = None) -> float:
+    """Convert an ISO date or time, or an age such as 30m or 7d,
+    to a timestamp.
+
+    Raises:
+        ValueError: If the value is neither
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*", value)
+    if match is not None:
+        return (time.time() if now is None else now) - float(match[1]) * AGE_UNITS[match[2]]
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError as e:
+        msg = f"Invalid time: '{value}' (use an ISO date like 2024-01-31, or an age like 12h or 7d)"
+        raise ValueError(msg) from e
+
+
+def _glob_pattern(globs: Iterable[str], fold_case: bool) -> re.Pattern[str] | None:
+    """Compile file name globs into one pattern, case-insensitive if fold_case"""
+    globs = list(globs)
+    flags = re.IGNORECASE if fold_case else 0
+    return re.compile("|".join(translate(glob) for glob in globs), flags) if globs else None
+
+
+@dataclass(slots=True)
+class FileFilter:
+    """Compiled predicates for the files to list or rename.
+
+    Name predicates (extensions, include and exclude globs) are checked
+    first, without touching the disk; size and modification time are
+    checked only for the files that pass, with the stat result the
+    listing already has where possible. Names are matched regardless
+    of case where the platform's paths are, as Path.glob does.
+    """
+
+    exts: Iterable[str] = ()
+    include: Iterable[str] = ()
+    exclude: Iterable[str] = ()
+    min_size: int | None = None
+    max_size: int | None = None
+    newer: float | None = None  # modified at or after this timestamp
+    older: float | None = None  # modified before this timestamp
+    needs_stat: bool = field(init=False)
+    _fold_case: bool = field(init=False, repr=False)
+    _suffixes: frozenset[str] = field(init=False, repr=False)
+    _include: re.Pattern[str] | None = field(init=False, repr=False)
+    _exclude: re.Pattern[str] | None = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.exts = tuple(validate_extension(ext) for ext in self.exts)
+        self._fold_case = FOLD_CASE
+        self._suffixes = frozenset(f".{ext.lower() if FOLD_CASE else ext}" for ext in self.exts)
+        self._include = _glob_pattern(self.include, FOLD_CASE)
+        self._exclude = _glob_pattern(self.exclude, FOLD_CASE)
+        self.needs_stat = any(limit is not None for limit in (self.min_size, self.max_size, self.newer, self.older))
+
+    def match_name(self, name: str) -> bool:
+        """True if a file name passes the extension and glob filters"""
+        if self._suffixes:
+            # the suffix as Path.suffix finds it
+            dot = name.rfind(".")
+            if not 0 < dot < len(name) - 1:
+                return False
+            suffix = name[dot:].lower() if self._fold_case else name[dot:]
+            if suffix not in self._suffixes:
+                return False
+        if self._include is not None and self._include.match(name) is None:
+            return False
+        return self._exclude is None or self._exclude.match(name) is None
+
+    def match_stat(self, stat_result: os.stat_result) -> bool:
+        """True if a file's size and modification time are in range"""
+        size = stat_result.st_size
+        mtime = stat_result.st_mtime
+        return (
+            (self.min_size is None or size >= self.min_size)
+            and (self.max_size is None or size <= self.max_size)
+            and (self.newer is None or mtime >= self.newer)
+            and (self.older is None or mtime < self.older)
+        )
+
+
+def create_file_list(
+    dir_path: Path,
+    file_glob: str | None = None,
+    index: "DirectoryIndex | None" = None,
+    file_filter: FileFilter | None = None,
+    sort_key: SortKey = SortKey.NAME,
+    reverse: bool = False,
+    top: int | None = None,
+    concurrency: int | None = None,
+) -> list:
+    """Create a list of the files in a directory, with or without an
+    extension, return the list sorted by name, or by sort_key.
+    With an index, an unchanged directory isn't listed again;
+    with concurrency, files are stat'ed several at a time."""
+    entries = scan_entries(
+        dir_path,
+        file_glob,
+        index=index,
+        file_filter=file_filter,
+        stat=sort_key is not SortKey.NAME,
+        concurrency=concurrency,
+    )
+    return [entry.path for entry in sort_entries(entries, sort_key, reverse, top)]
+
+
+@dataclass(slots=True, frozen=True)
+class ScanEntry:
+    """A file found by scan_entries(), its type resolved from the listing"""
+
+    path: Path
+    is_symlink: bool = False
+    # stat result served from a DirectoryIndex, if any
+    stat_result: os.stat_result | None = field(default=None, compare=False, repr=False)
+
+
+def scan_entries(
+    dir_path: Path,
+    ext: str | None = None,
+    recursive: bool = False,
+    skip_dirs: Iterable[Path] = (),
+    index: "DirectoryIndex | None" = None,
+    file_filter: FileFilter | None = None,
+    stat: bool = False,
+    concurrency: int | None = None,
+) -> Iterator[ScanEntry]:
+    """Yield the files in a directory, optionally in all its subdirectories.
+
+    Uses os.scandir() so file types come from the directory listing
+    without a stat per entry; only symlinks are followed, to check they
+    point to a file. Each directory is read completely before its files
+    are yielded, so renaming them in place doesn't disturb the listing,
+    but the tree is never collected into one list.
+
+    Args:
+        dir_path: Directory to scan
+        ext: Optional extension filter, without the dot
+        recursive: If True, descend into subdirectories (not symlinks)
+        skip_dirs: Directories to leave out, e.g. an output directory
+            inside the source tree
+        index: Optional DirectoryIndex, to reuse the listings and stat
+            results of directories that haven't changed
+        file_filter: Optional FileFilter; a file is stat'ed only if it
+            passes the name filters and the filter needs its size or time
+        stat: If True, every entry carries its stat result
+        concurrency: Optional number of listings and stats in flight at
+            once, for high-latency filesystems, see scan_entries_async();
+            not used with an index
+
+    Yields:
+        ScanEntry for each file, a directory's files before its subdirectories
+    """
+    if ext is not None:
+        exts = [ext] if file_filter is None else [*file_filter.exts, ext]
+        file_filter = FileFilter(exts) if file_filter is None else replace(file_filter, exts=exts)
+    if concurrency is not None and concurrency > 1 and index is None:
+        from xplat.aioscan import scan_entries_concurrent
+
+        yield from scan_entries_concurrent(dir_path, recursive, skip_dirs, file_filter, stat, concurrency)
+        return
+    skip = {skip_dir.resolve() for skip_dir in skip_dirs}
+    pending = [os.fspath(dir_path)]
+    while pending:
+        entries: list[os.DirEntry[str]] | list[IndexedEntry]
+        if index is not None:
+            entries = index.listing(pending.pop())
+        else:
+            with os.scandir(pending.pop()) as it:
+                entries = list(it)
+        subdirs = []
+        for entry in entries:
+            # follows symlinks, like Path.is_file()
+            if entry.is_file():
+                if file_filter is None:
+                    yield _plain_entry(entry, stat)
+                elif file_filter.match_name(entry.name) and (scan_entry := _filtered_entry(entry, file_filter, stat)):
+                    yield scan_entry
+            elif recursive and entry.is_dir(follow_symlinks=False) and (not skip or Path(entry.path).resolve() not in skip):
+                subdirs.append(entry.path)
+        # depth first, in listing order
+        pending.extend(reversed(subdirs))
+
+
+def _plain_entry(entry: "os.DirEntry[str] | IndexedEntry", stat: bool) -> ScanEntry:
+    """ScanEntry for a file, stat'ed if asked for and not already"""
+    stat_result = getattr(entry, "stat_result", None)
+    if stat and stat_result is None:
+        # if removed since it was listed, left for the caller to report
+        with suppress(OSError):
+            stat_result = entry.stat()  # type: ignore[union-attr]
+    return ScanEntry(Path(entry.path), entry.is_symlink(), stat_result)
+
 
+def _filtered_entry(entry: "os.DirEntry[str] | IndexedEntry", file_filter: FileFilter, stat: bool = False) -> ScanEntry | None:
+    """ScanEntry for a file that passed the name filters, None if its
+    size or time is out of range"""
+    if not file_filter.needs_stat:
+        return _plain_entry(entry, stat)
+    stat_result = getattr(entry, "stat_result", None)
+    if stat_result is None:
+        # cached on the entry, and on Windows free from the listing
+        stat_result = entry.stat()  # type: ignore[union-attr]
+    if not file_filter.match_stat(stat_result):
+        return None
+    return ScanEntry(Path(entry.path), entry.is_symlink(), stat_result)
 
-@dataclass
+
+def scan_files(
+    dir_path: Path,
+    ext: str | None = None,
+    recursive: bool = False,
+    skip_dirs: Iterable[Path] = (),
+    index: "DirectoryIndex | None" = None,
+    file_filter: FileFilter | None = None,
+    concurrency: int | None = None,
+) -> Iterator[Path]:
+    """Yield the paths of the files in a directory, see scan_entries()"""
+    for entry in scan_entries(dir_path, ext, recursive, skip_dirs, index, file_filter, concurrency=concurrency):
+        yield entry.path
+
+
+@dataclass(slots=True)
 class FileInfo:
-    """Class to hold file information"""
+    """Class to hold file information.
+
+    Stats the file once, or takes an existing stat result, and keeps the
+    raw numbers; size and timestamps are formatted only when accessed.
+    """
 
     file_name: Path
-    size: str | None = None
-    created: str | None = None
-    modified: str | None = None
-    accessed: str | None = None
+    stat_result: InitVar[os.stat_result | None] = None
+    size_bytes: int = field(init=False)
+    ctime: float = field(init=False)
+    mtime: float = field(init=False)
+    atime: float = field(init=False)
 
-    def __post_init__(self) -> None:
-        self.size = format_bytes(self.file_name.stat().st_size)
-        self.created = format_timestamp(self.file_name.stat().st_ctime)
-        self.modified = format_timestamp(self.file_name.stat().st_mtime)
-        self.accessed = format_timestamp(self.file_name.stat().st_atime)
+    def __post_init__(self, stat_result: os.stat_result | None) -> None:
+        if stat_result is None:
+            stat_result = self.file_name.stat()
+        self.size_bytes = stat_result.st_size
+        self.ctime = stat_result.st_ctime
+        self.mtime = stat_result.st_mtime
+        self.atime = stat_result.st_atime
+
+    @classmethod
+    def from_entry(cls, entry: os.DirEntry[str] | ScanEntry) -> "FileInfo":
+        """Create from a directory entry, reusing its cached stat if any"""
+        if isinstance(entry, ScanEntry):
+            return cls(entry.path, entry.stat_result)
+        return cls(Path(entry.path), entry.stat())
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[Path | os.DirEntry[str] | ScanEntry]) -> list["FileInfo"]:
+        """Create for a whole listing, with one stat per file"""
+        return [cls(path) if isinstance(path, Path) else cls.from_entry(path) for path in paths]
+
+    @property
+    def size(self) -> str:
+        return format_bytes(self.size_bytes)
+
+    @property
+    def created(self) -> str:
+        return format_timestamp(self.ctime)
+
+    @property
+    def modified(self) -> str:
+        return format_timestamp(self.mtime)
+
+    @property
+    def accessed(self) -> str:
+        return format_timestamp(self.atime)
+
+
+def stat_to_row(stat_result: os.stat_result | None) -> tuple:
+    """Plain values of a stat result, to store or spill to disk"""
+    if stat_result is None:
+        return (None,) * 10
+    return (*stat_result[:7], stat_result.st_atime_ns, stat_result.st_mtime_ns, stat_result.st_ctime_ns)
+
+
+def stat_from_row(row: Iterable) -> os.stat_result | None:
+    """Rebuild a stat result from the values of stat_to_row()"""
+    row = tuple(row)
+    if row[0] is None:
+        return None
+    times_ns = row[7:10]
+    return os.stat_result(
+        (
+            *row[:7],
+            *(t // 1_000_000_000 for t in times_ns),
+            *(t / 1e9 for t in times_ns),
+            *times_ns,
+        )
+    )
+
+
+def _sort_key(key: SortKey, descending: bool) -> Callable[[ScanEntry], tuple]:
+    """Key function for stat'ed entries, ties ordered by path"""
+    if key is SortKey.NAME:
+        return lambda entry: (os.fspath(entry.path),)
+    sign = -1 if descending else 1
+    if key is SortKey.SIZE:
+        return lambda entry: (sign * entry.stat_result.st_size, os.fspath(entry.path))  # type: ignore[union-attr]
+    return lambda entry: (sign * entry.stat_result.st_mtime_ns, os.fspath(entry.path))  # type: ignore[union-attr]
+
+
+def _spill(run: list[tuple[list, ScanEntry]]) -> Iterator[tuple[list, ScanEntry]]:
+    """Write a sorted run to a temporary file, return a reader for it"""
+    # only large sorts spill, and tempfile is slow to import
+    import tempfile
+
+    run_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+    for sort_key, entry in run:
+        run_file.write(json.dumps([sort_key, os.fspath(entry.path), entry.is_symlink, stat_to_row(entry.stat_result)]))
+        run_file.write("\n")
+    run_file.seek(0)
+    return _read_run(run_file)
+
+
+def _read_run(run_file: IO[str]) -> Iterator[tuple[list, ScanEntry]]:
+    with run_file:
+        for line in run_file:
+            sort_key, path, is_symlink, stat_row = json.loads(line)
+            yield sort_key, ScanEntry(Path(path), is_symlink, stat_from_row(stat_row))
+
+
+def _stat_entries(entries: Iterable[ScanEntry]) -> Iterator[ScanEntry]:
+    """Entries with their stat results, leaving out files removed since they were listed"""
+    for entry in entries:
+        if entry.stat_result is None:
+            try:
+                entry = replace(entry, stat_result=entry.path.stat())
+            except OSError:
+                continue
+        yield entry
+
+
+def sort_entries(
+    entries: Iterable[ScanEntry],
+    key: SortKey = SortKey.NAME,
+    reverse: bool = False,
+    top: int | None = None,
+    run_size: int = SORT_RUN_SIZE,
+) -> Iterator[ScanEntry]:
+    """Sort a listing by name, size or modification time.
+
+    With top, only the first `top` entries are kept, in a bounded heap.
+    Otherwise entries are sorted in runs of `run_size`; when there is
+    more than one run, each is spilled to a temporary file and the runs
+    are merged, so memory stays bounded for any size of listing.
+
+    Args:
+        entries: Files from scan_entries()
+        key: Order by name (A to Z), size (largest first) or mtime (newest first)
+        reverse: Reverse the order
+        top: Optional number of entries to keep
+        run_size: Entries sorted in memory at a time
+
+    Yields:
+        ScanEntry in order, with its stat result when sorted by size or time;
+        files that can no longer be stat'ed are left out of those sorts
+    """
+    descending = reverse != (key is not SortKey.NAME)
+    if key is not SortKey.NAME:
+        entries = _stat_entries(entries)
+    sort_key = _sort_key(key, descending)
+    # names can't be negated, so a descending name sort is reversed instead
+    reverse_order = key is SortKey.NAME and descending
+    if top is not None:
+        select = heapq.nlargest if reverse_order else heapq.nsmallest
+        yield from select(top, entries, key=sort_key)
+        return
+
+    # keys are lists, to compare with the keys read back from JSON
+    runs: list[Iterator[tuple[list, ScanEntry]]] = []
+    it = iter(entries)
+    while run := sorted(
+        ((list(sort_key(entry)), entry) for entry in islice(it, run_size)), key=itemgetter(0), reverse=reverse_order
+    ):
+        if len(run) < run_size:
+            # the last run stays in memory
+            runs.append(iter(run))
+            break
+        runs.append(_spill(run))
+    for _, entry in heapq.merge(*runs, key=lambda record: record[0], reverse=reverse_order):
+        yield entry
+
+
+class FileInfoCache:
+    """Bounded, least recently used cache of FileInfo by path"""
+
+    def __init__(self, max_size: int = FILE_INFO_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._infos: OrderedDict[Path, FileInfo] = OrderedDict()
+
+    def __contains__(self, file_name: Path) -> bool:
+        return file_name in self._infos
+
+    def __len__(self) -> int:
+        return len(self._infos)
+
+    def get(self, file_name: Path) -> FileInfo:
+        """Return the cached FileInfo, stat the file only on a miss"""
+        file_info = self._infos.get(file_name)
+        if file_info is not None:
+            self._infos.move_to_end(file_name)
+            return file_info
+        file_info = self._infos[file_name] = FileInfo(file_name)
+        if len(self._infos) > self.max_size:
+            self._infos.popitem(last=False)
+        return file_info
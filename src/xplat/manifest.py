@@ -0,0 +1,138 @@
+"""
+Checksum manifests in the format of sha256sum.
+
+Each line is a SHA-256 hex digest, two spaces and a file name, so a
+manifest can be checked with `sha256sum -c` as well as with xplat. As
+in GNU coreutils, a name with a backslash or line break is escaped, and
+its line starts with a backslash.
+"""
+
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TextIO
+
+from xplat.hashing import hash_files
+
+MANIFEST_ALGORITHM = "sha256"
+# digest, text (" ") or binary ("*") mode, name
+_LINE = re.compile(r"([0-9a-fA-F]{64}) [ *](.+)")
+_ESCAPES = {"\\\\": "\\", "\\n": "\n", "\\r": "\r"}
+
+
+@dataclass(slots=True)
+class ManifestStats:
+    """Counts of the files written to, or checked against, a manifest"""
+
+    files: int = 0
+    size_bytes: int = 0  # bytes hashed
+    failed: int = 0  # checksums that didn't match
+    unreadable: int = 0
+    bad_lines: int = 0  # improperly formatted lines
+
+
+def format_line(digest: str, name: str) -> str:
+    """Format a manifest line, escaping the name if needed"""
+    if "\\" in name or "\n" in name or "\r" in name:
+        name = name.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+        return f"\\{digest}  {name}\n"
+    return f"{digest}  {name}\n"
+
+
+def parse_line(line: str) -> tuple[str, str]:
+    """Return the digest and file name of a manifest line.
+
+    Raises:
+        ValueError: If the line is improperly formatted
+    """
+    # written on Windows, or read from a CRLF file
+    line = line.removesuffix("\n").removesuffix("\r")
+    escaped = line.startswith("\\")
+    match = _LINE.fullmatch(line[1:] if escaped else line)
+    if match is None:
+        msg = f"Improperly formatted checksum line: {line!r}"
+        raise ValueError(msg)
+    digest, name = match.groups()
+    if escaped:
+        name = re.sub(r"\\[\\nr]", lambda escape: _ESCAPES[escape[0]], name)
+    return digest.lower(), name
+
+
+def write_manifest(
+    file_paths: Iterable[Path],
+    base_dir: Path,
+    manifest: TextIO,
+    jobs: int | None = None,
+    stats: ManifestStats | None = None,
+) -> Iterator[tuple[Path, str | OSError]]:
+    """Hash files in parallel and write a line for each to a manifest.
+
+    Names are written relative to base_dir, with forward slashes.
+
+    Yields:
+        Tuple of each path, and its digest or the OSError that prevented it
+    """
+    stats = stats if stats is not None else ManifestStats()
+    for file_path, digest, size in hash_files(file_paths, jobs, MANIFEST_ALGORITHM):
+        stats.files += 1
+        stats.size_bytes += size
+        if isinstance(digest, OSError):
+            stats.unreadable += 1
+        else:
+            manifest.write(format_line(digest, file_path.relative_to(base_dir).as_posix()))
+        yield file_path, digest
+
+
+def read_manifest(manifest_path: Path, stats: ManifestStats | None = None) -> Iterator[tuple[str, str]]:
+    """Yield the digest and name of each line of a manifest, counting
+    improperly formatted lines in stats"""
+    stats = stats if stats is not None else ManifestStats()
+    with manifest_path.open(encoding="utf-8", errors="surrogateescape") as manifest:
+        for line in manifest:
+            try:
+                yield parse_line(line)
+            except ValueError:
+                stats.bad_lines += 1
+
+
+def check_manifest(
+    manifest_path: Path,
+    base_dir: Path | None = None,
+    jobs: int | None = None,
+    stats: ManifestStats | None = None,
+) -> Iterator[tuple[str, bool | OSError]]:
+    """Hash the files listed in a manifest in parallel and compare them.
+
+    Args:
+        manifest_path: Manifest in the format of sha256sum
+        base_dir: Directory the names are relative to, default the
+            manifest's directory
+        jobs: Number of files to hash at once
+        stats: Optional ManifestStats, filled in as files are checked
+
+    Yields:
+        Tuple of each name, and True if its checksum matches, False if
+        not, or the OSError that prevented reading it
+    """
+    stats = stats if stats is not None else ManifestStats()
+    base_dir = manifest_path.parent if base_dir is None else base_dir
+    # lines read but not yet hashed, in manifest order
+    expected: deque[tuple[str, str]] = deque()
+
+    def listed_paths() -> Iterator[Path]:
+        for digest, name in read_manifest(manifest_path, stats):
+            expected.append((digest, name))
+            yield base_dir / name
+
+    for _, digest, size in hash_files(listed_paths(), jobs, MANIFEST_ALGORITHM):
+        expected_digest, name = expected.popleft()
+        stats.files += 1
+        stats.size_bytes += size
+        if isinstance(digest, OSError):
+            stats.unreadable += 1
+            yield name, digest
+        else:
+            stats.failed += digest != expected_digest
+            yield name, digest == expected_digest
@@ -0,0 +1,211 @@
+"""
+Count what a run did and time its phases, for graphing over time.
+
+Collecting costs a few integer additions and a pair of perf_counter()
+calls per file, so it is always on; the metrics are only written when
+asked for, as JSON or as a Prometheus textfile-collector file.
+
+Files are streamed from the scan through renaming and output, so the
+phases are interleaved: pulling the next file from the scan is timed as
+discovery, even while renaming. A phase's time leaves out the phases
+timed inside it, so the phases never add up to more than the run.
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# Prometheus textfile collectors only read files with this suffix
+PROMETHEUS_SUFFIX = ".prom"
+# skip reasons by error type, the first match wins
+_SKIP_REASONS: list[tuple[type[OSError], str]] = [
+    (FileExistsError, "exists"),
+    (FileNotFoundError, "not_found"),
+    (NotADirectoryError, "not_a_directory"),
+    (PermissionError, "permission"),
+]
+
+
+class Phase(StrEnum):
+    """Parts of a run, timed separately"""
+
+    DISCOVERY = "discovery"  # listing files
+    PLANNING = "planning"  # choosing new names, or sorting
+    EXECUTION = "execution"  # renaming
+    OUTPUT = "output"  # reporting each file
+
+
+# phase times are kept in a list, hashing an enum member costs more than timing
+_PHASES = list(Phase)
+
+
+class MetricsFormat(StrEnum):
+    """How metrics are written"""
+
+    JSON = "json"
+    PROMETHEUS = "prometheus"
+
+
+def skip_reason(error: OSError) -> str:
+    """Short name for why a file was skipped, e.g. exists"""
+    for error_type, reason in _SKIP_REASONS:
+        if isinstance(error, error_type):
+            return reason
+    return "error"
+
+
+@dataclass
+class RunMetrics:
+    """Counters and phase times of a command's run"""
+
+    command: str
+    files_scanned: int = 0
+    files_planned: int = 0  # given a new name
+    files_renamed: int = 0  # renamed, copied or moved
+    bytes_moved: int = 0  # copied, renames within a filesystem move none
+    skipped: dict[str, int] = field(default_factory=dict)  # by reason
+    started: float = field(default_factory=time.time)
+    run_seconds: float = 0.0  # set by finish()
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+    _seconds: list[float] = field(default_factory=lambda: [0.0] * len(_PHASES), repr=False)
+    # time in all the phases timed so far, to leave nested phases out of outer ones
+    _timed: float = field(default=0.0, repr=False)
+    # renames run in worker threads with --jobs
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def phase_seconds(self) -> dict[Phase, float]:
+        """Wall time of each phase, not counting the phases timed inside it"""
+        return dict(zip(_PHASES, self._seconds, strict=True))
+
+    @contextmanager
+    def phase(self, phase: Phase) -> Iterator[None]:
+        """Time a block as phase"""
+        index = _PHASES.index(phase)
+        timed_before = self._timed
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._seconds[index] += elapsed - (self._timed - timed_before)
+            self._timed = timed_before + elapsed
+
+    def timed(self, items: Iterable[T], phase: Phase) -> Iterator[T]:
+        """Yield items, timing the production of each one as phase"""
+        # the same as phase() per item, inlined, this runs for every file
+        index = _PHASES.index(phase)
+        seconds = self._seconds
+        clock = time.perf_counter
+        iterator = iter(items)
+        while True:
+            timed_before = self._timed
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = clock() - start
+                seconds[index] += elapsed - (self._timed - timed_before)
+                self._timed = timed_before + elapsed
+            yield item
+
+    def scanned(self, entries: Iterable[T]) -> Iterator[T]:
+        """Yield files from a scan, counting them and timing discovery"""
+        for entry in self.timed(entries, Phase.DISCOVERY):
+            self.files_scanned += 1
+            yield entry
+
+    def skip(self, error: OSError) -> None:
+        """Count a skipped file by the reason for it"""
+        reason = skip_reason(error)
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def transferred(self, copied: int) -> None:
+        """Count a renamed file and the bytes copied for it, from any thread"""
+        with self._lock:
+            self.files_renamed += 1
+            self.bytes_moved += copied
+
+    def finish(self) -> None:
+        """Stop timing the run"""
+        self.run_seconds = time.perf_counter() - self._start
+
+
+def metrics_record(metrics: RunMetrics) -> dict:
+    """A JSON-ready record of a run's metrics"""
+    return {
+        "command": metrics.command,
+        "started": metrics.started,
+        "run_seconds": metrics.run_seconds,
+        "files_scanned": metrics.files_scanned,
+        "files_planned": metrics.files_planned,
+        "files_renamed": metrics.files_renamed,
+        "files_skipped": sum(metrics.skipped.values()),
+        "skipped": dict(metrics.skipped),
+        "bytes_moved": metrics.bytes_moved,
+        "phase_seconds": {str(phase): seconds for phase, seconds in metrics.phase_seconds.items()},
+    }
+
+
+def _gauge(lines: list[str], name: str, help_text: str, samples: Sequence[tuple[str, float]]) -> None:
+    lines.append(f"# HELP xplat_{name} {help_text}")
+    lines.append(f"# TYPE xplat_{name} gauge")
+    lines.extend(f"xplat_{name}{{{labels}}} {value}" for labels, value in samples)
+
+
+def render_prometheus(metrics: RunMetrics) -> str:
+    """Render metrics in the Prometheus text format.
+
+    Each run replaces the file, so every value is a gauge of the
+    last run, labelled with the command.
+    """
+    command = f'command="{metrics.command}"'
+    lines: list[str] = []
+    _gauge(lines, "run_timestamp_seconds", "When the last run started.", [(command, metrics.started)])
+    _gauge(lines, "run_seconds", "Wall time of the last run.", [(command, metrics.run_seconds)])
+    _gauge(lines, "files_scanned", "Files found by the last run.", [(command, metrics.files_scanned)])
+    _gauge(lines, "files_planned", "Files given a new name by the last run.", [(command, metrics.files_planned)])
+    _gauge(lines, "files_renamed", "Files renamed, copied or moved by the last run.", [(command, metrics.files_renamed)])
+    skipped = [(f'{command},reason="{reason}"', count) for reason, count in sorted(metrics.skipped.items())]
+    _gauge(lines, "files_skipped", "Files skipped by the last run, by reason.", skipped)
+    _gauge(lines, "bytes_moved", "Bytes copied by the last run.", [(command, metrics.bytes_moved)])
+    phases = [(f'{command},phase="{phase}"', seconds) for phase, seconds in metrics.phase_seconds.items()]
+    _gauge(lines, "phase_seconds", "Wall time of each phase of the last run.", phases)
+    return "\n".join(lines) + "\n"
+
+
+def metrics_format(path: Path) -> MetricsFormat:
+    """Prometheus for a .prom file, JSON otherwise"""
+    return MetricsFormat.PROMETHEUS if path.suffix == PROMETHEUS_SUFFIX else MetricsFormat.JSON
+
+
+def write_metrics(metrics: RunMetrics, path: Path, fmt: MetricsFormat | None = None) -> None:
+    """Write metrics to a file, replacing it atomically so a collector
+    never reads half a file.
+
+    Raises:
+        OSError: If the file can't be written
+    """
+    fmt = fmt or metrics_format(path)
+    text = (
+        render_prometheus(metrics) if fmt is MetricsFormat.PROMETHEUS else json.dumps(metrics_record(metrics), indent=2) + "\n"
+    )
+    # next to the file, so the replace is a rename, not read as a .prom file
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        temp_path.write_text(text, encoding="utf-8")
+        temp_path.replace(path)
+    except OSError:
+        temp_path.unlink(missing_ok=True)
+        raise
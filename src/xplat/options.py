@@ -0,0 +1,46 @@
+"""
+Choices and defaults of the command-line options.
+
+typer reads these when the commands are defined, so they live apart
+from the modules that use them, which are only imported when a command
+runs.
+"""
+
+from enum import StrEnum
+
+# seconds a file's size and mtime must stay the same
+SETTLE_TIME = 1.0
+# seconds between polls, and the longest wait for an event
+POLL_INTERVAL = 1.0
+
+
+class SortKey(StrEnum):
+    """Order of a sorted listing"""
+
+    NAME = "name"  # A to Z
+    SIZE = "size"  # largest first
+    MTIME = "mtime"  # most recently modified first
+
+
+class CollisionStrategy(StrEnum):
+    """What to do with a file whose new name is already taken"""
+
+    SKIP = "skip"
+    SUFFIX = "suffix"
+
+
+class TransferMode(StrEnum):
+    """How rename_file puts a file at its new path"""
+
+    RENAME = "rename"  # rename only, fails across filesystems
+    COPY = "copy"  # copy, keep the original
+    MOVE = "move"  # rename, or copy and remove across filesystems
+
+
+class OutputFormat(StrEnum):
+    """How batch commands report each file"""
+
+    PRETTY = "pretty"  # colored, several lines per file
+    QUIET = "quiet"  # only errors, on stderr
+    SUMMARY = "summary"  # only the counts
+    JSONL = "jsonl"  # one JSON record per file
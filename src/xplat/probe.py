@@ -0,0 +1,292 @@
+"""
+Measure the host and a filesystem, to tune bulk renames and listings.
+
+The usable CPUs are the fewer of the CPU affinity and the cgroup CPU
+quota, which containers often set well below the CPUs the host has.
+Filesystem latency is measured by creating, stat'ing, renaming and
+removing a few files in a scratch directory. Renames and listings
+spend most of their time waiting on these calls, so the slower they
+are, the more of them it pays to keep in flight: a worker is worth
+adding while a call takes longer than the Python work around it.
+"""
+
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import suppress
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+from xplat.info import ReportSection
+from xplat.rename import RENAME_BATCH_PER_JOB
+
+# files created in the scratch directory
+PROBE_FILES = 100
+# Python work around each call by a worker, in seconds
+WORKER_OVERHEAD = 20e-6
+# upper bounds for the recommendations
+MAX_JOBS = 64
+MAX_CONCURRENCY = 128
+# files a rename job may have open at once, with --copy
+FILES_PER_JOB = 2
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+# names this process's cgroup, "0::<path>" on cgroup v2
+PROC_CGROUP = Path("/proc/self/cgroup")
+# cgroup v1 reports no memory limit as a huge number
+_NO_LIMIT = 1 << 60
+
+
+@dataclass(slots=True)
+class HostLimits:
+    """CPUs, memory and open files available to this process"""
+
+    cpu_count: int
+    affinity_cpus: int
+    quota_cpus: float | None = None  # from the cgroup, None if unlimited
+    memory_total: int | None = None
+    memory_available: int | None = None
+    memory_limit: int | None = None  # from the cgroup, None if unlimited
+    open_files: int | None = None  # soft limit, None if unlimited
+
+    @property
+    def usable_cpus(self) -> int:
+        if self.quota_cpus is None:
+            return self.affinity_cpus
+        return max(1, min(self.affinity_cpus, math.ceil(self.quota_cpus)))
+
+
+@dataclass(slots=True)
+class Latency:
+    """Median and 95th percentile time of a filesystem call, in seconds"""
+
+    median: float
+    p95: float
+
+    @classmethod
+    def from_samples(cls, samples: list[float]) -> "Latency":
+        samples = sorted(samples)
+        return cls(statistics.median(samples), samples[int(0.95 * (len(samples) - 1))])
+
+
+@dataclass(slots=True)
+class ProbeResult:
+    """Host limits and filesystem latency, with the settings they suggest"""
+
+    host: HostLimits
+    latency: dict[str, Latency] = field(default_factory=dict)  # by call: create, stat, rename, unlink
+
+    @property
+    def rename_jobs(self) -> int:
+        """Workers for rename --jobs"""
+        return _workers(self.latency["rename"].median, MAX_JOBS, self.host.open_files)
+
+    @property
+    def list_concurrency(self) -> int:
+        """Calls in flight for list --concurrency, 1 for a serial scan"""
+        return _workers(self.latency["stat"].median, MAX_CONCURRENCY, self.host.open_files)
+
+    @property
+    def rename_batch(self) -> int:
+        """Files renamed per batch with rename_jobs workers"""
+        return self.rename_jobs * RENAME_BATCH_PER_JOB if self.rename_jobs > 1 else 1
+
+
+def _workers(latency: float, limit: int, open_files: int | None) -> int:
+    """Calls worth keeping in flight, so the wait on each is covered by
+    the Python work on the others"""
+    if open_files is not None:
+        limit = min(limit, max(1, open_files // (4 * FILES_PER_JOB)))
+    return max(1, min(limit, math.ceil(latency / WORKER_OVERHEAD)))
+
+
+def _read_first(paths: list[Path]) -> str | None:
+    """Contents of the first of paths that can be read"""
+    for path in paths:
+        try:
+            return path.read_text(encoding="utf-8").strip()
+        except OSError:
+            continue
+    return None
+
+
+def _to_int(text: str | None) -> int | None:
+    """A number read from a cgroup file, None if it isn't one"""
+    if text is None:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def cgroup_dirs(cgroup_root: Path = CGROUP_ROOT, proc_cgroup: Path = PROC_CGROUP) -> list[Path]:
+    """This process's cgroup v2 directory and its ancestors, innermost first.
+
+    In a cgroup namespace the root is the process's own cgroup; without
+    one it is the whole hierarchy, and the process's cgroup is the
+    0::<path> entry of /proc/self/cgroup.
+    """
+    relative = ""
+    for line in (_read_first([proc_cgroup]) or "").splitlines():
+        if line.startswith("0::"):
+            relative = line[3:].strip("/")
+    cgroup_dir = cgroup_root / relative
+    # outside the namespace, or not mounted here
+    if ".." in Path(relative).parts or not cgroup_dir.is_dir():
+        cgroup_dir = cgroup_root
+    return [cgroup_dir, *(parent for parent in cgroup_dir.parents if parent.is_relative_to(cgroup_root))]
+
+
+def _cpu_max(cpu_max: str) -> float | None:
+    """CPUs allowed by a cgroup v2 cpu.max, such as max 100000 or 200000 100000"""
+    quota, _, period = cpu_max.partition(" ")
+    quota_us, period_us = _to_int(quota), _to_int(period)
+    if quota_us is None or period_us is None or quota_us <= 0 or period_us <= 0:
+        return None
+    return quota_us / period_us
+
+
+def cgroup_cpu_quota(cgroup_root: Path = CGROUP_ROOT, proc_cgroup: Path = PROC_CGROUP) -> float | None:
+    """CPUs allowed by the cgroup quota, None if there is none or it can't be read"""
+    # cgroup v2, the tightest quota of the cgroup and its ancestors
+    cpu_max = [text for path in cgroup_dirs(cgroup_root, proc_cgroup) if (text := _read_first([path / "cpu.max"]))]
+    if cpu_max:
+        return min((cpus for text in cpu_max if (cpus := _cpu_max(text)) is not None), default=None)
+    # cgroup v1: a quota of -1 is no limit
+    quota_us = _to_int(
+        _read_first([cgroup_root / "cpu" / "cpu.cfs_quota_us", cgroup_root / "cpu,cpuacct" / "cpu.cfs_quota_us"])
+    )
+    period_us = _to_int(
+        _read_first([cgroup_root / "cpu" / "cpu.cfs_period_us", cgroup_root / "cpu,cpuacct" / "cpu.cfs_period_us"])
+    )
+    if quota_us is None or period_us is None or quota_us <= 0 or period_us <= 0:
+        return None
+    return quota_us / period_us
+
+
+def cgroup_memory_limit(cgroup_root: Path = CGROUP_ROOT, proc_cgroup: Path = PROC_CGROUP) -> int | None:
+    """Bytes of memory allowed by the cgroup, None if unlimited or it can't be read"""
+    # cgroup v2, the tightest limit of the cgroup and its ancestors
+    limits = [_read_first([path / "memory.max"]) for path in cgroup_dirs(cgroup_root, proc_cgroup)]
+    if not any(limits):
+        limits = [_read_first([cgroup_root / "memory" / "memory.limit_in_bytes"])]
+    # "max" on cgroup v2, a huge number on v1
+    return min((limit for text in limits if (limit := _to_int(text)) is not None and limit < _NO_LIMIT), default=None)
+
+
+def _memory() -> tuple[int | None, int | None]:
+    """Total and available bytes of memory, where the OS reports them"""
+    total = None
+    available = None
+    # no sysconf on Windows
+    with suppress(AttributeError, ValueError, OSError):
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    meminfo = _read_first([Path("/proc/meminfo")])
+    for line in (meminfo or "").splitlines():
+        if line.startswith("MemAvailable:"):
+            # in kB
+            available = int(line.split()[1]) * 1024
+    return total, available
+
+
+def _open_files() -> int | None:
+    """Soft limit on open files, None if unlimited"""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        # Windows, where the C runtime's limit is rarely reached
+        return None
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return None if soft == resource.RLIM_INFINITY else soft
+
+
+def host_limits(cgroup_root: Path = CGROUP_ROOT) -> HostLimits:
+    """Find the CPUs, memory and open files available to this process"""
+    cpu_count = os.cpu_count() or 1
+    # not on macOS or Windows
+    affinity = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else cpu_count
+    total, available = _memory()
+    return HostLimits(
+        cpu_count,
+        affinity,
+        cgroup_cpu_quota(cgroup_root) if sys.platform.startswith("linux") else None,
+        total,
+        available,
+        cgroup_memory_limit(cgroup_root) if sys.platform.startswith("linux") else None,
+        _open_files(),
+    )
+
+
+def _timed(call: Callable[..., object], *args: object) -> float:
+    start = time.perf_counter()
+    call(*args)
+    return time.perf_counter() - start
+
+
+def measure_latency(dir_path: Path, files: int = PROBE_FILES) -> dict[str, Latency]:
+    """Time creating, stat'ing, renaming and removing files in a scratch
+    directory inside dir_path, which is removed afterwards.
+
+    Raises:
+        OSError: If the directory can't be written to
+    """
+    scratch = Path(tempfile.mkdtemp(prefix=".xplat-probe-", dir=dir_path))
+    samples: dict[str, list[float]] = {"create": [], "stat": [], "rename": [], "unlink": []}
+    try:
+        paths = [scratch / f"probe {index:04d}.tmp" for index in range(files)]
+        for path in paths:
+            samples["create"].append(_timed(partial(path.touch, exist_ok=False)))
+        for path in paths:
+            samples["stat"].append(_timed(path.stat))
+        renamed = [path.with_name(path.name.replace(" ", "_")) for path in paths]
+        for path, new_path in zip(paths, renamed, strict=True):
+            samples["rename"].append(_timed(path.rename, new_path))
+        for new_path in renamed:
+            samples["unlink"].append(_timed(new_path.unlink))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {call: Latency.from_samples(times) for call, times in samples.items()}
+
+
+def probe(dir_path: Path, files: int = PROBE_FILES) -> ProbeResult:
+    """Measure the host, and the filesystem of dir_path"""
+    return ProbeResult(host_limits(), measure_latency(dir_path, files))
+
+
+def _limit(limit: float | None) -> str:
+    return "unlimited" if limit is None else f"{limit:g}"
+
+
+def probe_sections(result: ProbeResult, dir_path: Path) -> list[ReportSection]:
+    """Report sections for a probe, to add to the platform report"""
+    host = result.host
+    host_rows = [
+        ("CPU Count", str(host.cpu_count)),
+        ("CPU Affinity", str(host.affinity_cpus)),
+        ("CPU Quota", _limit(host.quota_cpus)),
+        ("Usable CPUs", str(host.usable_cpus)),
+        ("Memory Total Bytes", str(host.memory_total or "")),
+        ("Memory Available Bytes", str(host.memory_available or "")),
+        ("Memory Limit Bytes", _limit(host.memory_limit)),
+        ("Open Files Limit", _limit(host.open_files)),
+    ]
+    latency_rows = [("Directory", str(dir_path))]
+    for call, latency in result.latency.items():
+        latency_rows.append((f"{call.title()} Median us", f"{latency.median * 1e6:.1f}"))
+        latency_rows.append((f"{call.title()} P95 us", f"{latency.p95 * 1e6:.1f}"))
+    recommended_rows = [
+        ("Rename Jobs", str(result.rename_jobs)),
+        ("Rename Batch", str(result.rename_batch)),
+        ("List Concurrency", str(result.list_concurrency)),
+    ]
+    return [
+        ReportSection("Host", host_rows),
+        ReportSection("Filesystem", latency_rows),
+        ReportSection("Recommended", recommended_rows),
+    ]
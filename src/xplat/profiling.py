@@ -0,0 +1,119 @@
+"""
+Profile a command's time with cProfile and its memory with tracemalloc.
+
+Both are started only when asked for, and this module is imported only
+then, so a command run without them pays nothing. The full results are
+saved for pstats, snakeviz or tracemalloc.Snapshot.load(), and the
+hottest functions and largest allocations are kept for a summary.
+"""
+
+import cProfile
+import pstats
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# frames kept per allocation, one is enough to group by line
+TRACE_FRAMES = 1
+# allocations made by the profilers themselves, left out of the summary
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+]
+
+
+@dataclass(slots=True)
+class HotFunction:
+    """Time spent in a function, from cProfile"""
+
+    name: str  # file:line(function)
+    calls: int
+    self_seconds: float  # not counting the functions it calls
+    cumulative_seconds: float
+
+
+@dataclass(slots=True)
+class Allocation:
+    """Memory still allocated by a line of code, from tracemalloc"""
+
+    location: str  # file:line
+    size_bytes: int
+    count: int  # memory blocks
+
+
+@dataclass(slots=True)
+class ProfileReport:
+    """Summary of a profiled run"""
+
+    hot_functions: list[HotFunction] = field(default_factory=list)
+    allocations: list[Allocation] = field(default_factory=list)
+    peak_bytes: int | None = None  # None if memory wasn't traced
+    # results that couldn't be saved, the summary is still complete
+    errors: list[OSError] = field(default_factory=list)
+
+
+def _function_name(filename: str, lineno: int, function: str) -> str:
+    # built-in functions have no file
+    return function if filename == "~" else f"{Path(filename).name}:{lineno}({function})"
+
+
+def hot_functions(profiler: cProfile.Profile, top: int) -> list[HotFunction]:
+    """The functions with the most time of their own, most first"""
+    stats = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    functions = [
+        HotFunction(_function_name(*key), calls, self_seconds, cumulative_seconds)
+        for key, (_, calls, self_seconds, cumulative_seconds, _) in stats.items()
+    ]
+    return sorted(functions, key=lambda function: function.self_seconds, reverse=True)[:top]
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, top: int) -> list[Allocation]:
+    """The lines of code holding the most memory, most first"""
+    return [
+        Allocation(f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}", stat.size, stat.count)
+        for stat in snapshot.filter_traces(_TRACE_FILTERS).statistics("lineno")[:top]
+    ]
+
+
+@dataclass(slots=True)
+class ProfileSession:
+    """cProfile and tracemalloc around a command, saving results to files"""
+
+    profile_path: Path | None
+    trace_path: Path | None
+    top: int
+    _profiler: cProfile.Profile | None = field(default=None, init=False, repr=False)
+
+    def start(self) -> None:
+        if self.trace_path is not None:
+            tracemalloc.start(TRACE_FRAMES)
+        if self.profile_path is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> ProfileReport:
+        """Stop profiling, save the results and return a summary,
+        with the errors saving them, if any"""
+        report = ProfileReport()
+        # the profiler first, so saving the snapshot isn't profiled
+        if self._profiler is not None and self.profile_path is not None:
+            self._profiler.disable()
+            try:
+                self._profiler.dump_stats(self.profile_path)
+            except OSError as e:
+                report.errors.append(e)
+            report.hot_functions = hot_functions(self._profiler, self.top)
+            self._profiler = None
+        if self.trace_path is not None and tracemalloc.is_tracing():
+            _, report.peak_bytes = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            try:
+                snapshot.dump(str(self.trace_path))
+            except OSError as e:
+                report.errors.append(e)
+            report.allocations = top_allocations(snapshot, self.top)
+        return report
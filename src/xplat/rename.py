@@ -21,9 +21,64 @@ or
 https://www.ietf.org/rfc/rfc1738.txt
 """
 
+import os
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from functools import cache, lru_cache, partial
+from itertools import batched, groupby
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+from xplat.journal import RenameJournal
+from xplat.list import ScanEntry
+from xplat.metrics import RunMetrics
+from xplat.options import CollisionStrategy, TransferMode
+from xplat.transfer import copy_file, move_file
 
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+# stems repeat a lot in real batches (IMG_0001, scan 001, ...)
+SAFE_STEM_CACHE_SIZE = 65536
+# files queued per worker thread before waiting for results
+RENAME_BATCH_PER_JOB = 64
+
+
+@cache
+def _stem_engine(delim: str) -> tuple[list[str | None], re.Pattern[str], re.Pattern[str]]:
+    """Compile the translation table and patterns for a delimiter.
+
+    Returns:
+        Tuple of (translation table, pattern of characters to drop,
+        pattern of repeated delimiters)
+    """
+    # map space and dot, and delete every other unsafe ASCII character,
+    # so names that are pure ASCII need no further filtering.
+    # A list is much faster than a dict for str.translate(), and code
+    # points past the end raise IndexError, which leaves them unchanged.
+    table: list[str | None] = [c if c.isalnum() or c == delim else None for c in map(chr, range(128))]
+    table[ord(" ")] = delim
+    table[ord(".")] = "_" if delim == "_" else None
+    escaped = re.escape(delim)
+    # \w is str.isalnum() plus underscore, so drop the underscore
+    # explicitly unless it is the delimiter
+    drop = re.compile(r"\W+") if delim == "_" else re.compile(rf"(?:[^\w{escaped}]|_)+")
+    collapse = re.compile(rf"(?:{escaped}){{2,}}")
+    return table, drop, collapse
+
+
+def _safe_stem_slow(name: str, delim: str) -> str:
+    """Reference transformation, used for delimiters the fast path can't handle."""
+    new_name = name.replace(" ", delim).lower()
+    new_name = new_name.replace(".", "_")
+    new_name = "".join(c for c in new_name if c.isalnum() or c == delim)
+    while delim + delim in new_name:
+        new_name = new_name.replace(delim + delim, delim)
+    return new_name
+
+
+@lru_cache(maxsize=SAFE_STEM_CACHE_SIZE)
 def safe_stem(name: str, delim: str = "_") -> str:
     """Transform a filename stem to be platform and web-friendly.
 
@@ -39,18 +94,35 @@ def safe_stem(name: str, delim: str = "_") -> str:
         - Only alphanumeric and delimiter chars
         - No double delimiters
     """
-    # Convert to lowercase and replace spaces
-    new_name = name.replace(" ", delim).lower()
-    # Replace dots with underscore (preserve delim if different)
-    new_name = new_name.replace(".", "_")
+    # the fast path lowercases before substituting, which is only
+    # equivalent for a single, lowercase, non-dot delimiter
+    if len(delim) != 1 or delim == "." or delim.lower() != delim:
+        return _safe_stem_slow(name, delim)
+    table, drop, collapse = _stem_engine(delim)
+    # Convert to lowercase, replace spaces and dots, drop unsafe ASCII
+    new_name = name.lower().translate(table)
     # Keep only alphanumeric and delimiter chars
-    new_name = "".join(c for c in new_name if c.isalnum() or c == delim)
-    # Remove double delimiters
-    while delim + delim in new_name:
-        new_name = new_name.replace(delim + delim, delim)
+    if not new_name.isascii():
+        new_name = drop.sub("", new_name)
+    # Remove double delimiters (escaped, the replacement is a template)
+    if delim + delim in new_name:
+        new_name = collapse.sub(delim.replace("\\", "\\\\"), new_name)
     return new_name
 
 
+def safe_stems(names: Iterable[str], delim: str = "_") -> list[str]:
+    """Transform a batch of filename stems, see safe_stem().
+
+    Args:
+        names: Original filename stems
+        delim: Delimiter to use (default: underscore)
+
+    Returns:
+        Transformed stems, in the same order as names
+    """
+    return [safe_stem(name, delim) for name in names]
+
+
 def make_safe_path(orig_path: Path, target_dir: Path | None = None) -> Path:
     """Create a new Path with safe filename in target directory.
 
@@ -67,13 +139,188 @@ def make_safe_path(orig_path: Path, target_dir: Path | None = None) -> Path:
     return target_dir.joinpath(new_name) if target_dir else orig_path.with_name(new_name)
 
 
-def rename_file(orig_path: Path, target_dir: Path | None = None, dry_run: bool = False) -> Path:
+def make_safe_paths(orig_paths: Iterable[Path], target_dir: Path | None = None) -> list[Path]:
+    """Create safe Paths for a batch of files, see make_safe_path().
+
+    Args:
+        orig_paths: Original file paths
+        target_dir: Optional target directory for new paths
+
+    Returns:
+        New Paths, in the same order as orig_paths
+    """
+    orig_paths = list(orig_paths)
+    stems = safe_stems(orig_path.stem for orig_path in orig_paths)
+    return [
+        target_dir.joinpath(stem + orig_path.suffix.lower())
+        if target_dir
+        else orig_path.with_name(stem + orig_path.suffix.lower())
+        for orig_path, stem in zip(orig_paths, stems, strict=True)
+    ]
+
+
+@dataclass(slots=True)
+class PlannedRename:
+    """A file to rename, with its target once planned"""
+
+    orig_path: Path
+    new_path: Path | None = None
+    # the other source or existing file that wanted the same name
+    collides_with: Path | None = None
+    skip_reason: str | None = None
+    # type information from the scan, saves validating orig_path again
+    entry: ScanEntry | None = None
+
+
+def _to_planned(source: Path | ScanEntry) -> PlannedRename:
+    """Wrap a path or scanned entry for planning and renaming"""
+    if isinstance(source, ScanEntry):
+        return PlannedRename(source.path, entry=source)
+    return PlannedRename(source)
+
+
+@dataclass
+class RenamePlan:
+    """The targets of a whole batch of renames"""
+
+    target_dir: Path | None
+    renames: list[PlannedRename] = field(default_factory=list)
+
+    @property
+    def collisions(self) -> list[PlannedRename]:
+        """Planned renames whose new name was already taken"""
+        return [planned for planned in self.renames if planned.collides_with is not None]
+
+
+def _suffixed_path(new_path: Path, taken: set[str], delim: str = "_") -> Path:
+    """Return new_path with the lowest numeric suffix that isn't taken"""
+    count = 1
+    while f"{new_path.stem}{delim}{count}{new_path.suffix}" in taken:
+        count += 1
+    return new_path.with_name(f"{new_path.stem}{delim}{count}{new_path.suffix}")
+
+
+def _plan_targets(
+    renames: list[PlannedRename],
+    target_dir: Path | None,
+    strategy: CollisionStrategy,
+    taken: dict[Path, set[str]],
+) -> None:
+    """Set the targets of renames, and find their collisions with each
+    other and with the names in taken, which are listed once per
+    directory and updated with the names claimed"""
+    new_paths = make_safe_paths((planned.orig_path for planned in renames), target_dir)
+    # targets claimed in this batch, for the source that claimed them
+    claimed: dict[Path, Path] = {}
+
+    for planned, new_path in zip(renames, new_paths, strict=True):
+        orig_path = planned.orig_path
+        planned.new_path = new_path
+        names = taken.get(new_path.parent)
+        if names is None:
+            try:
+                names = taken[new_path.parent] = set(os.listdir(new_path.parent))
+            except OSError:
+                names = taken[new_path.parent] = set()
+
+        if new_path == orig_path:
+            planned.skip_reason = f"Name is already safe: {orig_path}"
+            continue
+        if new_path in claimed:
+            planned.collides_with = claimed[new_path]
+            planned.skip_reason = f"Same new name as {claimed[new_path]}: {new_path}"
+        elif new_path.name in names:
+            # an existing file, or a target claimed by an earlier batch
+            planned.collides_with = new_path
+            planned.skip_reason = f"File already exists: {new_path}"
+
+        if planned.collides_with is not None and strategy is CollisionStrategy.SUFFIX:
+            new_path = planned.new_path = _suffixed_path(new_path, names)
+            planned.skip_reason = None
+        if planned.skip_reason is None:
+            claimed[new_path] = orig_path
+            names.add(new_path.name)
+
+
+def plan_renames(
+    orig_paths: Iterable[Path | ScanEntry],
+    target_dir: Path | None = None,
+    strategy: CollisionStrategy = CollisionStrategy.SKIP,
+) -> RenamePlan:
+    """Compute every target in a batch and find all collisions, in one pass.
+
+    Targets are indexed in a hash map, and each target directory is
+    listed once, instead of checking exists() for every file. Nothing
+    is renamed. The whole batch is held in memory, see plan_batches()
+    for a stream of files.
+
+    Args:
+        orig_paths: Paths to original files, or entries from scan_entries()
+        target_dir: Optional target directory for renamed files
+        strategy: Skip colliding files, or add a numeric suffix
+
+    Returns:
+        RenamePlan in input order; of files with the same new name,
+        the first in input order keeps it
+    """
+    plan = RenamePlan(target_dir, [_to_planned(source) for source in orig_paths])
+    _plan_targets(plan.renames, target_dir, strategy, {})
+    return plan
+
+
+def _source_dir(source: Path | ScanEntry) -> Path:
+    return (source.path if isinstance(source, ScanEntry) else source).parent
+
+
+def plan_batches(
+    orig_paths: Iterable[Path | ScanEntry],
+    target_dir: Path | None = None,
+    strategy: CollisionStrategy = CollisionStrategy.SKIP,
+) -> Iterator[RenamePlan]:
+    """Plan renames one source directory at a time, see plan_renames().
+
+    Names can only collide within a target directory, and scan_entries()
+    yields a directory's files together, so only one directory's files
+    are held at once. In place, each directory's names are dropped once
+    it is planned; with a target directory, its names are kept, with
+    the names claimed so far.
+
+    Yields:
+        RenamePlan for each run of files from the same directory
+    """
+    taken: dict[Path, set[str]] = {}
+    for _, sources in groupby(orig_paths, key=_source_dir):
+        plan = RenamePlan(target_dir, [_to_planned(source) for source in sources])
+        if target_dir is None:
+            # files are renamed within their own directory, done with the last one
+            taken.clear()
+        _plan_targets(plan.renames, target_dir, strategy, taken)
+        yield plan
+
+
+def rename_file(
+    orig_path: Path | ScanEntry,
+    target_dir: Path | None = None,
+    dry_run: bool = False,
+    *,
+    new_path: Path | None = None,
+    journal: RenameJournal | None = None,
+    mode: TransferMode = TransferMode.RENAME,
+    check_target: bool = True,
+    metrics: RunMetrics | None = None,
+) -> Path:
     """Rename file to be platform and web-friendly.
 
     Args:
-        orig_path: Path to original file
+        orig_path: Path to original file, or an entry from scan_entries()
+            whose type is already known
         target_dir: Optional target directory for renamed file
         dry_run: If True, only return the new path without performing rename
+        new_path: Optional planned new path, instead of make_safe_path()
+        journal: Optional journal to record the rename in, before and after it
+        mode: Rename, copy, or move across filesystems if needed
+        check_target: If False, the caller has already checked target_dir
+        metrics: Optional run metrics to count the rename and bytes copied in
 
     Returns:
         Path to renamed file (or would-be path if dry_run=True)
@@ -84,16 +331,23 @@ def rename_file(orig_path: Path, target_dir: Path | None = None, dry_run: bool =
         FileExistsError: If target path already exists (unless dry_run=True)
         OSError: If original path is a symlink
     """
-    # Validate inputs
-    if orig_path.is_symlink():
-        raise OSError(f"Refusing to operate on symlink: {orig_path}")
-    if not orig_path.is_file():
-        raise FileNotFoundError(f"Not a file: {orig_path}")
-    if target_dir and not target_dir.is_dir():
+    # Validate inputs, a scanned entry is known to be a file
+    if isinstance(orig_path, ScanEntry):
+        is_symlink = orig_path.is_symlink
+        orig_path = orig_path.path
+        if is_symlink:
+            raise OSError(f"Refusing to operate on symlink: {orig_path}")
+    else:
+        if orig_path.is_symlink():
+            raise OSError(f"Refusing to operate on symlink: {orig_path}")
+        if not orig_path.is_file():
+            raise FileNotFoundError(f"Not a file: {orig_path}")
+    if check_target and target_dir and not target_dir.is_dir():
         raise NotADirectoryError(f"Not a directory: {target_dir}")
 
     # Get new path
-    new_path = make_safe_path(orig_path, target_dir)
+    if new_path is None:
+        new_path = make_safe_path(orig_path, target_dir)
 
     # Check if target exists (skip if dry_run)
     if not dry_run and new_path.exists():
@@ -101,6 +355,160 @@ def rename_file(orig_path: Path, target_dir: Path | None = None, dry_run: bool =
 
     # Perform rename unless dry_run
     if not dry_run:
-        orig_path.rename(new_path)
+        if journal is not None:
+            # before the rename, so a run killed during it can still be undone
+            journal.begin(orig_path, new_path, mode)
+        copied = 0
+        if mode is TransferMode.COPY:
+            copied = copy_file(orig_path, new_path)
+        elif mode is TransferMode.MOVE:
+            copied = move_file(orig_path, new_path)
+        else:
+            orig_path.rename(new_path)
+        if journal is not None:
+            journal.complete(orig_path, new_path, mode)
+        if metrics is not None:
+            metrics.transferred(copied)
 
     return new_path
+
+
+def _rename_chain(chain: list[PlannedRename], rename: Callable[..., Path]) -> list[Path | OSError]:
+    """Rename files that share a target, in order, collecting errors."""
+    results: list[Path | OSError] = []
+    for planned in chain:
+        if planned.skip_reason is not None:
+            results.append(FileExistsError(planned.skip_reason))
+            continue
+        try:
+            results.append(rename(planned.entry or planned.orig_path, new_path=planned.new_path))
+        except OSError as e:
+            results.append(e)
+    return results
+
+
+def _rename_batch(
+    executor: "ThreadPoolExecutor",
+    batch: tuple[PlannedRename, ...],
+    target_dir: Path | None,
+    rename: Callable[..., Path],
+) -> Iterator[tuple[Path, Path | OSError]]:
+    """Rename a batch of files in the thread pool, yield results in input order."""
+    # files that map to the same target run serially in one chain,
+    # so the first one in input order wins, as in a serial loop
+    chains: dict[tuple[Path, str], list[int]] = {}
+    stems = safe_stems(planned.orig_path.stem for planned in batch)
+    for index, (planned, stem) in enumerate(zip(batch, stems, strict=True)):
+        if planned.new_path is not None:
+            key = (planned.new_path.parent, planned.new_path.name)
+        else:
+            key = (target_dir or planned.orig_path.parent, stem + planned.orig_path.suffix.lower())
+        chains.setdefault(key, []).append(index)
+
+    pending: dict[int, tuple[Future[list[Path | OSError]], int]] = {}
+    for chain in chains.values():
+        future = executor.submit(_rename_chain, [batch[index] for index in chain], rename)
+        for position, index in enumerate(chain):
+            pending[index] = (future, position)
+
+    for index, planned in enumerate(batch):
+        future, position = pending[index]
+        yield planned.orig_path, future.result()[position]
+
+
+def _run_renames(
+    renames: Iterable[PlannedRename], target_dir: Path | None, jobs: int, rename: Callable[..., Path]
+) -> Iterator[tuple[Path, Path | OSError]]:
+    """Rename files serially or in a thread pool, yield results in input order.
+
+    The target directory is checked once for the whole batch.
+    """
+    if target_dir and not target_dir.is_dir():
+        error = NotADirectoryError(f"Not a directory: {target_dir}")
+        for planned in renames:
+            yield planned.orig_path, error
+        return
+
+    if jobs <= 1:
+        for planned in renames:
+            yield planned.orig_path, _rename_chain([planned], rename)[0]
+        return
+
+    # concurrent.futures is slow to import, and only needed for jobs
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for batch in batched(renames, jobs * RENAME_BATCH_PER_JOB):
+            yield from _rename_batch(executor, batch, target_dir, rename)
+
+
+def rename_files(
+    orig_paths: Iterable[Path | ScanEntry],
+    target_dir: Path | None = None,
+    dry_run: bool = False,
+    jobs: int = 1,
+    journal: RenameJournal | None = None,
+    mode: TransferMode = TransferMode.RENAME,
+    metrics: RunMetrics | None = None,
+) -> Iterator[tuple[Path, Path | OSError]]:
+    """Rename many files, optionally in a pool of worker threads.
+
+    Renames are dominated by blocking filesystem calls, so threads
+    overlap the latency of network mounts, and copies run in parallel.
+
+    Args:
+        orig_paths: Paths to original files, or entries from scan_entries()
+        target_dir: Optional target directory for renamed files
+        dry_run: If True, only compute the new paths
+        jobs: Number of worker threads, 1 renames serially
+        journal: Optional journal to record completed renames in
+        mode: Rename, copy, or move across filesystems if needed
+        metrics: Optional run metrics to count renames and bytes copied in
+
+    Yields:
+        Tuple of original path and either the new path or the OSError
+        that prevented the rename, in input order
+    """
+    rename = partial(
+        rename_file, target_dir=target_dir, dry_run=dry_run, journal=journal, mode=mode, check_target=False, metrics=metrics
+    )
+    return _run_renames((_to_planned(source) for source in orig_paths), target_dir, jobs, rename)
+
+
+def execute_plan(
+    plan: RenamePlan,
+    dry_run: bool = False,
+    jobs: int = 1,
+    journal: RenameJournal | None = None,
+    mode: TransferMode = TransferMode.RENAME,
+    metrics: RunMetrics | None = None,
+) -> Iterator[tuple[Path, Path | OSError]]:
+    """Rename the files of a plan, see rename_files().
+
+    Files the plan skips are reported with a FileExistsError, without
+    touching the filesystem.
+    """
+    return execute_plans([plan], plan.target_dir, dry_run, jobs, journal, mode, metrics)
+
+
+def execute_plans(
+    plans: Iterable[RenamePlan],
+    target_dir: Path | None = None,
+    dry_run: bool = False,
+    jobs: int = 1,
+    journal: RenameJournal | None = None,
+    mode: TransferMode = TransferMode.RENAME,
+    metrics: RunMetrics | None = None,
+) -> Iterator[tuple[Path, Path | OSError]]:
+    """Rename the files of a stream of plans to target_dir, as they
+    are planned, see execute_plan() and plan_batches()."""
+    rename = partial(
+        rename_file,
+        target_dir=target_dir,
+        dry_run=dry_run,
+        journal=journal,
+        mode=mode,
+        check_target=False,
+        metrics=metrics,
+    )
+    return _run_renames((planned for plan in plans for planned in plan.renames), target_dir, jobs, rename)
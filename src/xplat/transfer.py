@@ -0,0 +1,124 @@
+"""
+Copy and move files across filesystems.
+
+Path.rename() fails with EXDEV when the target is on another mount.
+These functions copy the data in the kernel where the platform allows
+it (copy_file_range, then sendfile), so it never passes through Python
+buffers, and fall back to a chunked copy elsewhere.
+"""
+
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# bytes per zero-copy call, the kernel may copy less
+ZERO_COPY_CHUNK = 1 << 30
+# buffer size for the fallback copy
+BUFFER_SIZE = 1 << 20
+# errors that mean "this copy method isn't available here"
+_FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+}
+
+
+def _zero_copy(src_fd: int, dst_fd: int) -> int | None:
+    """Copy with copy_file_range or sendfile, None if neither works here"""
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while count := os.copy_file_range(src_fd, dst_fd, ZERO_COPY_CHUNK):
+                copied += count
+            return copied
+        except OSError as e:
+            if copied or e.errno not in _FALLBACK_ERRNOS:
+                raise
+    # only Linux can sendfile to a regular file
+    if sys.platform.startswith("linux"):
+        try:
+            while count := os.sendfile(dst_fd, src_fd, None, ZERO_COPY_CHUNK):
+                copied += count
+            return copied
+        except OSError as e:
+            if copied or e.errno not in _FALLBACK_ERRNOS:
+                raise
+    return None
+
+
+def _buffered_copy(src_fd: int, dst_fd: int) -> int:
+    """Copy in large chunks, where zero-copy isn't available"""
+    copied = 0
+    while chunk := os.read(src_fd, BUFFER_SIZE):
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(dst_fd, view) :]
+        copied += len(chunk)
+    return copied
+
+
+def copy_file(src: Path, dst: Path) -> int:
+    """Copy a file's data, permissions and timestamps to a new file.
+
+    Args:
+        src: File to copy
+        dst: New file, which must not exist
+
+    Returns:
+        Number of bytes copied
+
+    Raises:
+        FileExistsError: If dst already exists, it is never overwritten
+        OSError: If fewer or more bytes were copied than the file holds,
+            e.g. it changed during the copy; dst is removed
+    """
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+        dst_fd = os.open(dst, flags, 0o600)
+        try:
+            size = os.fstat(src_fd).st_size
+            copied = _zero_copy(src_fd, dst_fd)
+            if copied is not None and copied != size:
+                # some filesystems report 0 bytes copied by copy_file_range
+                # for files that aren't empty, copy again by reading them
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                os.ftruncate(dst_fd, 0)
+                copied = None
+            if copied is None:
+                copied = _buffered_copy(src_fd, dst_fd)
+            if copied != size:
+                raise OSError(errno.EIO, f"Copied {copied} of {size} bytes, the file may have changed", str(src))
+        except BaseException:
+            os.close(dst_fd)
+            dst.unlink()
+            raise
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src, dst)
+    return copied
+
+
+def move_file(src: Path, dst: Path) -> int:
+    """Move a file, copying it when the target is on another filesystem.
+    The original is only removed once all of it has been copied.
+
+    Returns:
+        Number of bytes copied, 0 if the file was renamed
+    """
+    try:
+        src.rename(dst)
+        return 0
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    copied = copy_file(src, dst)
+    src.unlink()
+    return copied
@@ -0,0 +1,109 @@
+"""
+Disk usage summaries for large directory trees.
+
+The tree is split into shards, one per top-level subdirectory, which
+are scanned in a pool of processes with os.scandir(). Each shard
+returns a partial Usage, and the partial results are merged into one
+report, so the parent never holds more than one aggregate per shard.
+
+Sizes are apparent sizes (st_size). Symlinks are neither followed nor
+counted, and a file with several hard links is counted once per name.
+"""
+
+import os
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# the files directly in the scanned directory, reported as one row
+ROOT_SHARD = "."
+
+
+def name_suffix(name: str) -> str:
+    """The extension of a file name, without the dot, as Path.suffix finds it"""
+    dot = name.rfind(".")
+    return name[dot + 1 :] if 0 < dot < len(name) - 1 else ""
+
+
+@dataclass(slots=True)
+class Usage:
+    """File count, bytes and extension histogram of part of a tree"""
+
+    files: int = 0
+    size_bytes: int = 0
+    extensions: Counter[str] = field(default_factory=Counter)
+    # directories that couldn't be read
+    errors: int = 0
+
+    def add_file(self, name: str, size: int) -> None:
+        self.files += 1
+        self.size_bytes += size
+        self.extensions[name_suffix(name)] += 1
+
+    def merge(self, other: "Usage") -> None:
+        """Add the counts of another partial result"""
+        self.files += other.files
+        self.size_bytes += other.size_bytes
+        self.extensions.update(other.extensions)
+        self.errors += other.errors
+
+
+def scan_usage(dir_path: str | Path, recursive: bool = True) -> Usage:
+    """Sum the files in a directory, and all its subdirectories if recursive"""
+    usage = Usage()
+    pending = [os.fspath(dir_path)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        usage.add_file(entry.name, entry.stat(follow_symlinks=False).st_size)
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+        except OSError:
+            usage.errors += 1
+    return usage
+
+
+def _shards(root: Path) -> Iterator[str]:
+    """The top-level subdirectories of root, which are scanned in parallel"""
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield entry.name
+
+
+def disk_usage(root: Path, jobs: int | None = None) -> dict[str, Usage]:
+    """Summarize a tree by top-level subdirectory.
+
+    Args:
+        root: Directory to summarize
+        jobs: Processes scanning subdirectories, default one per CPU;
+            with 1, everything is scanned in this process
+
+    Returns:
+        Usage for each subdirectory by name, and for the files directly
+        in root under ROOT_SHARD, in name order
+
+    Raises:
+        OSError: If root can't be read
+    """
+    shards = sorted(_shards(root))
+    report = {ROOT_SHARD: scan_usage(root, recursive=False)}
+    paths = [os.fspath(root / name) for name in shards]
+    if jobs == 1 or len(shards) <= 1:
+        report.update(zip(shards, map(scan_usage, paths), strict=True))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            report.update(zip(shards, executor.map(scan_usage, paths), strict=True))
+    return report
+
+
+def total_usage(report: dict[str, Usage]) -> Usage:
+    """Merge the partial results of a report"""
+    total = Usage()
+    for usage in report.values():
+        total.merge(usage)
+    return total
@@ -0,0 +1,278 @@
+"""
+Watch a directory for new or changed files.
+
+On Linux, inotify reports each file as it is written or moved in, so
+an idle directory costs nothing however many files it holds. Elsewhere
+the directories are polled by mtime: a directory is listed again only
+when its mtime changes, which happens when files are added, removed or
+renamed, so a quiet poll is one stat per directory.
+
+A file is handed on only once it has stopped changing: its size and
+mtime must stay the same for a settle time, so files still being
+uploaded or copied are left alone until they are complete.
+"""
+
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Protocol
+
+from xplat.list import FileFilter, scan_files
+from xplat.options import POLL_INTERVAL, SETTLE_TIME
+from xplat.rename import make_safe_path
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+# struct inotify_event: wd, mask, cookie, len, then the name
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+class Watcher(Protocol):
+    """Source of paths that may have changed"""
+
+    def changed(self, timeout: float) -> set[Path]:
+        """Wait up to timeout seconds, return files that may be new or changed"""
+        ...
+
+    def close(self) -> None: ...
+
+
+def _list_dirs(root: Path, recursive: bool, skip: set[Path]) -> list[Path]:
+    """root, and its subdirectories if recursive, leaving out skip"""
+    dirs = [root]
+    if recursive:
+        for dir_path, dir_names, _ in os.walk(root):
+            dir_names[:] = [name for name in dir_names if Path(dir_path, name).resolve() not in skip]
+            dirs.extend(Path(dir_path, name) for name in dir_names)
+    return dirs
+
+
+class PollWatcher:
+    """Watch directories by polling their mtime"""
+
+    def __init__(self, root: Path, recursive: bool = False, skip_dirs: Iterable[Path] = ()) -> None:
+        self.recursive = recursive
+        self._skip = {skip_dir.resolve() for skip_dir in skip_dirs}
+        # mtime and file names of each directory when last listed
+        self._dirs: dict[Path, tuple[int, set[str]]] = {}
+        for dir_path in _list_dirs(root, recursive, self._skip):
+            self._list(dir_path)
+
+    def _list(self, dir_path: Path) -> set[Path]:
+        """List a directory, return the files that weren't there before"""
+        try:
+            mtime_ns = dir_path.stat().st_mtime_ns
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            self._dirs.pop(dir_path, None)
+            return set()
+        _, known = self._dirs.get(dir_path, (0, set()))
+        names = set()
+        new_files = set()
+        for entry in entries:
+            if entry.is_file():
+                names.add(entry.name)
+                if entry.name not in known:
+                    new_files.add(Path(entry.path))
+            elif self.recursive and entry.is_dir(follow_symlinks=False):
+                sub_dir = Path(entry.path)
+                if sub_dir not in self._dirs and sub_dir.resolve() not in self._skip:
+                    # a new directory, and the files already in it
+                    new_files |= self._list(sub_dir)
+        self._dirs[dir_path] = (mtime_ns, names)
+        return new_files
+
+    def changed(self, timeout: float) -> set[Path]:
+        time.sleep(timeout)
+        new_files = set()
+        for dir_path, (mtime_ns, _) in list(self._dirs.items()):
+            try:
+                if dir_path.stat().st_mtime_ns == mtime_ns:
+                    continue
+            except OSError:
+                del self._dirs[dir_path]
+                continue
+            new_files |= self._list(dir_path)
+        return new_files
+
+    def close(self) -> None:
+        self._dirs.clear()
+
+
+def _libc_error(*args: str) -> OSError:
+    """OSError for the errno of the last libc call"""
+    import ctypes
+
+    err = ctypes.get_errno()
+    return OSError(err, os.strerror(err), *args)
+
+
+class InotifyWatcher:
+    """Watch directories with Linux inotify, through ctypes"""
+
+    def __init__(self, root: Path, recursive: bool = False, skip_dirs: Iterable[Path] = ()) -> None:
+        # only needed here, and slow to import
+        import ctypes
+        import ctypes.util
+
+        self.recursive = recursive
+        self._skip = {skip_dir.resolve() for skip_dir in skip_dirs}
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise _libc_error()
+        self._dirs: dict[int, Path] = {}
+        try:
+            for dir_path in _list_dirs(root, recursive, self._skip):
+                self._add(dir_path)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, dir_path: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), _WATCH_MASK)
+        if wd < 0:
+            raise _libc_error(str(dir_path))
+        self._dirs[wd] = dir_path
+
+    def _rescan(self) -> set[Path]:
+        """Every file in the watched directories, when events were lost"""
+        return {path for dir_path in self._dirs.values() for path in scan_files(dir_path)}
+
+    def _added_dir(self, dir_path: Path) -> set[Path]:
+        """Watch a new directory, return the files already in it"""
+        if dir_path.resolve() in self._skip:
+            return set()
+        new_files: set[Path] = set()
+        for sub_dir in _list_dirs(dir_path, True, self._skip):
+            try:
+                self._add(sub_dir)
+                new_files.update(scan_files(sub_dir))
+            except OSError:
+                continue
+        return new_files
+
+    def changed(self, timeout: float) -> set[Path]:
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return set()
+        new_files: set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0"))
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                new_files |= self._rescan()
+            elif wd in self._dirs and name:
+                path = self._dirs[wd] / name
+                if not mask & IN_ISDIR:
+                    new_files.add(path)
+                elif self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    new_files |= self._added_dir(path)
+        return new_files
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(root: Path, recursive: bool = False, skip_dirs: Iterable[Path] = ()) -> Watcher:
+    """inotify where it is available, otherwise a poll"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, recursive, skip_dirs)
+        except (OSError, AttributeError):
+            # no inotify in this libc, or out of watches or instances
+            pass
+    return PollWatcher(root, recursive, skip_dirs)
+
+
+def watch_batches(
+    source_dir: Path,
+    recursive: bool = False,
+    skip_dirs: Iterable[Path] = (),
+    file_filter: FileFilter | None = None,
+    target_dir: Path | None = None,
+    settle: float = SETTLE_TIME,
+    interval: float = POLL_INTERVAL,
+    stop: Callable[[], bool] = lambda: False,
+    watcher: Watcher | None = None,
+) -> Iterator[list[Path]]:
+    """Yield batches of files to rename as they arrive in a directory.
+
+    The files already there come first. A file joins a batch once its
+    size and mtime have stayed the same for `settle` seconds, and every
+    file that settles at the same time is in the same batch. Files that
+    don't pass the filter, or that already have a safe name where they
+    are renamed in place, are ignored.
+
+    Args:
+        source_dir: Directory to watch
+        recursive: If True, watch all subdirectories too
+        skip_dirs: Directories to leave out, e.g. an output directory
+        file_filter: Optional filter for the files to rename
+        target_dir: Directory the files are renamed into, if not in place
+        settle: Seconds a file must stop changing for
+        interval: Seconds between polls, and between checks of stop
+        stop: Called between waits, stops watching when it returns True
+        watcher: Source of changed paths, default from make_watcher()
+    """
+    skip_dirs = list(skip_dirs)
+    watcher = watcher if watcher is not None else make_watcher(source_dir, recursive, skip_dirs)
+
+    def wanted(path: Path) -> bool:
+        if file_filter is not None and not file_filter.match_name(path.name):
+            return False
+        return target_dir is not None or make_safe_path(path) != path
+
+    # size and mtime of each waiting file, and when they last changed
+    pending: dict[Path, tuple[tuple[int, int], float] | None] = dict.fromkeys(
+        filter(wanted, scan_files(source_dir, recursive=recursive, skip_dirs=skip_dirs))
+    )
+    try:
+        while not stop():
+            if pending and (batch := _settled(pending, settle, file_filter)):
+                yield batch
+            pending.update(dict.fromkeys(filter(wanted, watcher.changed(min(interval, settle) if pending else interval))))
+    finally:
+        watcher.close()
+
+
+def _settled(
+    pending: dict[Path, tuple[tuple[int, int], float] | None], settle: float, file_filter: FileFilter | None
+) -> list[Path]:
+    """Remove and return the waiting files that have stopped changing"""
+    now = time.monotonic()
+    batch = []
+    for path, state in list(pending.items()):
+        try:
+            stat_result = path.stat()
+        except OSError:
+            # gone, or renamed already
+            del pending[path]
+            continue
+        signature = (stat_result.st_size, stat_result.st_mtime_ns)
+        if state is None or state[0] != signature:
+            pending[path] = (signature, now)
+        elif now - state[1] >= settle:
+            del pending[path]
+            if file_filter is None or not file_filter.needs_stat or file_filter.match_stat(stat_result):
+                batch.append(path)
+    return sorted(batch)
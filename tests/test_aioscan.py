@@ -0,0 +1,123 @@
+"""Tests for the concurrent scanning backend."""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from xplat.aioscan import ListedEntry, LocalFileSystem, scan_entries_async, scan_entries_concurrent
+from xplat.list import FileFilter, scan_entries
+
+
+class LatencyFileSystem(LocalFileSystem):
+    """The local filesystem, with a delay on every call like a network mount"""
+
+    def __init__(self, latency: float = 0.005) -> None:
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+
+    def scandir(self, dir_path: str) -> list[ListedEntry]:
+        self._call()
+        return super().scandir(dir_path)
+
+    def stat(self, file_path: str) -> os.stat_result:
+        self._call()
+        return super().stat(file_path)
+
+
+def _make_tree(root: Path) -> None:
+    for sub in ["a", "a/deep", "b", "c", "skip"]:
+        (root / sub).mkdir()
+    for n, sub in enumerate(["", "a", "a/deep", "b", "c", "skip"]):
+        for i in range(8):
+            (root / sub / f"file {n}.{i}.{'txt' if i % 2 else 'jpg'}").write_text("x" * (n * 8 + i))
+
+
+def test_same_order_as_serial_scan():
+    """Test files come back in the same order, with stat results, as scan_entries()."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        _make_tree(root)
+        fs = LatencyFileSystem()
+
+        entries = list(scan_entries_concurrent(root, recursive=True, skip_dirs=[root / "skip"], stat=True, fs=fs))
+        assert entries == list(scan_entries(root, recursive=True, skip_dirs=[root / "skip"]))
+        assert len(entries) == 40
+        assert all(entry.stat_result is not None for entry in entries)
+        assert entries[0].stat_result.st_size == entries[0].path.stat().st_size
+
+
+def test_concurrency_is_bounded():
+    """Test calls overlap, but never more than the concurrency limit."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        _make_tree(root)
+        fs = LatencyFileSystem(latency=0.01)
+
+        start = time.perf_counter()
+        count = sum(1 for _ in scan_entries_concurrent(root, recursive=True, stat=True, concurrency=4, fs=fs))
+        elapsed = time.perf_counter() - start
+        assert count == 48
+        # 6 listings and 48 stats
+        assert fs.calls == 54
+        assert 1 < fs.max_in_flight <= 4
+        # one call at a time would take at least 0.54 s
+        assert elapsed < fs.calls * fs.latency
+
+
+def test_filters_and_stat_errors():
+    """Test the filters match scan_entries(), and only filter stats raise."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        _make_tree(root)
+        file_filter = FileFilter(exts=["txt"], min_size=20)
+
+        entries = list(scan_entries_concurrent(root, recursive=True, file_filter=file_filter, fs=LatencyFileSystem()))
+        assert entries == list(scan_entries(root, recursive=True, file_filter=file_filter))
+        assert {entry.path.suffix for entry in entries} == {".txt"}
+
+        class Vanishing(LatencyFileSystem):
+            def stat(self, file_path: str) -> os.stat_result:
+                raise FileNotFoundError(file_path)
+
+        entries = list(scan_entries_concurrent(root, stat=True, fs=Vanishing()))
+        assert len(entries) == 8
+        assert all(entry.stat_result is None for entry in entries)
+        with pytest.raises(FileNotFoundError):
+            list(scan_entries_concurrent(root, file_filter=file_filter, fs=Vanishing()))
+
+
+def test_async_early_exit():
+    """Test the async scan can be stopped part way, and scan_entries delegates to it."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        _make_tree(root)
+
+        async def first_three() -> list[Path]:
+            paths = []
+            async for entry in scan_entries_async(root, recursive=True, concurrency=2, fs=LatencyFileSystem()):
+                paths.append(entry.path)
+                if len(paths) == 3:
+                    break
+            return paths
+
+        assert asyncio.run(first_three()) == [entry.path for entry in scan_entries(root, recursive=True)][:3]
+        assert list(scan_entries(root, "txt", recursive=True, concurrency=8)) == list(
+            scan_entries(root, "txt", recursive=True)
+        )
@@ -4,6 +4,8 @@ at this level are effectively integration tests, but also
 are unit tests for the dependent modules.
 """
 
+import json
+import os
 import tempfile
 from pathlib import Path
 
@@ -11,6 +13,7 @@ import pytest
 from typer import Exit
 from typer.testing import CliRunner
 
+import xplat.list
 from xplat import constants
 from xplat.cli import app, print_files, print_selected_info, rename_list
 from xplat.list import validate_extension
@@ -52,16 +55,16 @@ def test_version():
     assert f"xplat version: {constants.VERSION}" in result.stdout
 
 
-def test_info():
+def test_info(monkeypatch, tmp_path):
     """
     Executes the `info` command of the `app` module
     using `_runner` and asserts that the exit code
     is `constants.NO_ERROR`.
     Also asserts that "System Information" is present
     in the `stdout` of the `result`.
-
-    This function does not take any parameters and does not return anything.
     """
+    # the report is cached here, not in the home directory
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
     result = _runner.invoke(app, "info")
     assert result.exit_code == constants.NO_ERROR
     assert "System Information" in result.stdout
@@ -123,6 +126,136 @@ def test_list():
     # assert check_dir(test_path, "Test") is False
 
 
+def test_list_streaming_formats():
+    """Test the non-interactive --json, --csv and --long list formats."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        (temp_dir / "one.txt").write_text("0123456789" * 2048)
+        (temp_dir / "two.pdf").write_text("pdf")
+        (temp_dir / "no_extension").write_text("")
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--json"])
+        assert result.exit_code == 0
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert sorted(record["name"] for record in records) == ["no_extension", "one.txt", "two.pdf"]
+        assert "size" not in records[0]
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--json", "--long", "--ext", "txt"])
+        assert result.exit_code == 0
+        (record,) = (json.loads(line) for line in result.stdout.splitlines())
+        assert record["size"] == 20480
+        assert "modified" in record
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--csv", "--long"])
+        assert result.exit_code == 0
+        lines = result.stdout.splitlines()
+        assert lines[0] == "name,path,size,created,modified,accessed"
+        assert len(lines) == 4
+
+        result = _runner.invoke(app, ["list", str(temp_dir / "one.txt"), "--long"])
+        assert result.exit_code == 0
+        assert "20.0 K" in result.stdout
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--json", "--csv"])
+        assert result.exit_code == constants.MISSING_COMMAND
+
+
+def test_list_pages(monkeypatch):
+    """Test the interactive list shows one page at a time, and caches file info."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        for index in range(45):
+            (temp_dir / f"page_{index:02d}.txt").write_text("x" * index)
+
+        result = _runner.invoke(app, ["list", str(temp_dir)], input="n\nn\nn\np\nq\n")
+        assert result.exit_code == 0
+        pages = result.stdout.split("Total files found = 45")
+        assert "1) page_00.txt" in pages[0]
+        assert "21) page_20.txt" not in pages[0]
+        assert "21) page_20.txt" in pages[1]
+        assert "41) page_40.txt" in pages[2]
+        # no page past the last one
+        assert "41) page_40.txt" in pages[3]
+        assert "21) page_20.txt" in pages[4]
+        assert "Showing 21-40" in pages[4]
+
+        calls = []
+        real_stat = os.stat
+
+        def counting_stat(*args, **kwargs):
+            calls.append(args[0])
+            return real_stat(*args, **kwargs)
+
+        monkeypatch.setattr(os, "stat", counting_stat)
+        result = _runner.invoke(app, ["list", str(temp_dir)], input="30\nc\n30\nc\nq\n")
+        assert result.exit_code == 0
+        assert result.stdout.count("Size:     29.0 B") == 2
+        # the file page of the selection is shown
+        assert "Showing 21-40" in result.stdout.split("Size:")[1]
+        assert sum(1 for path in calls if Path(path).name == "page_29.txt") <= 2
+
+
+def test_list_and_rename_filters():
+    """Test the filter options shared by list and rename."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        (temp_dir / "Big Scan.pdf").write_text("x" * 4096)
+        (temp_dir / "Small Scan.pdf").write_text("x")
+        (temp_dir / "Photo One.jpg").write_text("x" * 4096)
+        (temp_dir / "Notes").write_text("x" * 4096)
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--json", "--ext", "pdf,jpg", "--min-size", "1K"])
+        assert result.exit_code == 0
+        names = sorted(json.loads(line)["name"] for line in result.stdout.splitlines())
+        assert names == ["Big Scan.pdf", "Photo One.jpg"]
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--exclude", "*Scan*"], input="q\n")
+        assert result.exit_code == 0
+        assert "Total files found = 2" in result.stdout
+        assert "Notes" in result.stdout
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "-x", "pdf", "-x", "jpg"], input="q\n")
+        assert "Listing files with extension '.pdf', '.jpg':" in result.stdout
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--long", "--max-size", "lots"])
+        assert result.exit_code == constants.BAD_REQUEST
+
+        result = _runner.invoke(app, ["rename", "-s", str(temp_dir), "--include", "*Scan*", "--older", "1d"])
+        assert result.exit_code == 0
+        assert not (temp_dir / "big_scan.pdf").exists()
+
+        result = _runner.invoke(app, ["rename", "-s", str(temp_dir), "--include", "*Scan*", "--newer", "1d"])
+        assert result.exit_code == 0
+        assert sorted(path.name for path in temp_dir.iterdir()) == ["Notes", "Photo One.jpg", "big_scan.pdf", "small_scan.pdf"]
+
+        result = _runner.invoke(app, ["rename", "-s", str(temp_dir), "--newer", "yesterday"])
+        assert result.exit_code == 1
+
+
+def test_list_sort_and_top():
+    """Test --sort, --top and --reverse of the list command."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        for name, size in [("a.txt", 30), ("b.txt", 10), ("c.txt", 20)]:
+            (temp_dir / name).write_text("x" * size)
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--json", "--sort", "size", "--top", "2"])
+        assert result.exit_code == 0
+        assert [json.loads(line)["name"] for line in result.stdout.splitlines()] == ["a.txt", "c.txt"]
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--long", "--sort", "size", "--reverse"])
+        assert [line.split()[-1] for line in result.stdout.splitlines()] == ["b.txt", "c.txt", "a.txt"]
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--sort", "size"], input="q\n")
+        assert result.stdout.index("1) a.txt") < result.stdout.index("2) c.txt") < result.stdout.index("3) b.txt")
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--long", "--sort", "size", "--concurrency", "4"])
+        assert [line.split()[-1] for line in result.stdout.splitlines()] == ["a.txt", "c.txt", "b.txt"]
+
+        result = _runner.invoke(app, ["list", str(temp_dir), "--concurrency", "4", "--index", str(temp_dir / "i.db")])
+        assert result.exit_code == 2
+
+
 def test_print_files():
     # test for empty list
     test_empty = []
@@ -162,6 +295,33 @@ def test_rename_list():
         assert (output_dir / "filewithspecialchars.txt").exists()
 
 
+def test_rename_list_parallel(capsys):
+    """Test rename_list with worker threads keeps output order and counts"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        output_dir = temp_dir / "output"
+        output_dir.mkdir()
+        test_files = []
+        for count in range(10):
+            file_path = temp_dir / f"File Number {count}.txt"
+            file_path.write_text("test content")
+            test_files.append(file_path)
+        (output_dir / "file_number_3.txt").write_text("existing")
+
+        convert_count = rename_list(test_files, output_dir, jobs=4)
+        stdout = capsys.readouterr().out
+        assert convert_count == 9
+        positions = [stdout.index(f"Original: {file_path}") for file_path in test_files]
+        assert positions == sorted(positions)
+        assert stdout.count("Skipped") == 1
+        assert (output_dir / "file_number_3.txt").read_text() == "existing"
+
+        # the option is accepted by the command
+        result = _runner.invoke(app, ["rename", "-s", str(temp_dir), "-o", str(output_dir), "--jobs", "2"])
+        assert result.exit_code == 0
+        assert "Skipped" in result.stdout
+
+
 def test_rename_command():
     """Test the rename command with various options"""
     runner = CliRunner()
@@ -349,6 +509,15 @@ def test_version_from_metadata():
     assert constants.VERSION != "0.0.0-dev"
 
 
+def test_cli_version_attribute():
+    """Test the CLI still has VERSION, looked up only when used."""
+    from xplat import cli
+
+    assert cli.VERSION == constants.VERSION
+    with pytest.raises(AttributeError):
+        _ = cli.NOT_DEFINED
+
+
 def test_rename_nonexistent_source_dir():
     """Test that rename rejects a non-existent source directory."""
     runner = CliRunner()
@@ -409,6 +578,151 @@ def test_rename_with_extension_filter():
         assert not (output_dir / "skip_this.pdf").exists()
 
 
+def test_rename_recursive_streams(monkeypatch, tmp_path):
+    """Test rename -r renames each directory's files before scanning the rest of the tree."""
+    for name in ["a", "b", "c"]:
+        tmp_path.joinpath(name).mkdir()
+        tmp_path.joinpath(name, f"File {name.upper()}.txt").touch()
+    scan_entries = xplat.list.scan_entries
+    renamed_before = {}
+
+    def watched_scan(*args, **kwargs):
+        for entry in scan_entries(*args, **kwargs):
+            renamed_before[entry.path.name] = sorted(path.name for path in tmp_path.glob("*/file_*.txt"))
+            yield entry
+
+    # the rename command imports it when it runs
+    monkeypatch.setattr(xplat.list, "scan_entries", watched_scan)
+    result = _runner.invoke(app, ["rename", "-s", str(tmp_path), "-r", "--output", "quiet"])
+    assert result.exit_code == 0
+    assert len(renamed_before) == 3
+    # the last file scanned comes after the first directory is renamed
+    last = list(renamed_before.values())[-1]
+    assert len(last) >= 1
+    assert sorted(path.name for path in tmp_path.glob("*/*.txt")) == ["file_a.txt", "file_b.txt", "file_c.txt"]
+
+
+def test_rename_dry_run_reports_collisions():
+    """Test a dry run reports sources that map to the same new name."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        (temp_dir / "My File.txt").write_text("first")
+        (temp_dir / "my.file.txt").write_text("second")
+
+        result = runner.invoke(app, ["rename", "--source-dir", str(temp_dir), "--dry-run"])
+        assert result.exit_code == 0
+        assert "Found 1 name collisions" in result.stdout
+        assert "Found 1 files to rename" in result.stdout
+
+        result = runner.invoke(app, ["rename", "--source-dir", str(temp_dir), "--on-collision", "suffix"])
+        assert result.exit_code == 0
+        assert (temp_dir / "my_file.txt").exists()
+        assert (temp_dir / "my_file_1.txt").exists()
+
+
+def test_rename_journal_and_rollback():
+    """Test rename --journal records a run that --rollback undoes."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        source_dir = temp_dir / "source"
+        source_dir.mkdir()
+        journal = temp_dir / "rename.journal"
+        (source_dir / "Journal Me.txt").write_text("content")
+
+        result = runner.invoke(app, ["rename", "--source-dir", str(source_dir), "--journal", str(journal)])
+        assert result.exit_code == 0
+        assert (source_dir / "journal_me.txt").exists()
+
+        result = runner.invoke(app, ["rename", "--rollback", str(journal), "--dry-run"])
+        assert result.exit_code == 0
+        assert "Found 1 files to restore" in result.stdout
+        assert (source_dir / "journal_me.txt").exists()
+
+        result = runner.invoke(app, ["rename", "--rollback", str(journal)])
+        assert result.exit_code == 0
+        assert "Restored 1 files\n" in result.stdout
+        assert (source_dir / "Journal Me.txt").exists()
+
+        # a source directory is required without --rollback
+        result = runner.invoke(app, ["rename"])
+        assert result.exit_code == constants.MISSING_COMMAND
+
+
+def test_rollback_corrupt_journal(tmp_path):
+    """Test --rollback refuses a journal with a corrupt record, undoing nothing."""
+    journal = tmp_path / "rename.journal"
+    journal.write_text('{"from": "/a/Tw\n{"from": "/a/One.txt", "to": "/a/one.txt"}\n')
+    result = CliRunner().invoke(app, ["rename", "--rollback", str(journal)])
+    assert result.exit_code == constants.BAD_REQUEST
+    assert "is corrupt at line 1" in result.stdout
+
+
+def test_rename_copy_mode():
+    """Test rename --copy keeps the originals and --copy --move is rejected."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        output_dir = temp_dir / "output"
+        output_dir.mkdir()
+        (temp_dir / "Copy Me.txt").write_text("content")
+
+        result = runner.invoke(app, ["rename", "-s", str(temp_dir), "-o", str(output_dir), "--copy"])
+        assert result.exit_code == 0
+        assert (temp_dir / "Copy Me.txt").exists()
+        assert (output_dir / "copy_me.txt").read_text() == "content"
+
+        result = runner.invoke(app, ["rename", "-s", str(temp_dir), "--copy", "--move"])
+        assert result.exit_code == constants.MISSING_COMMAND
+
+
+def test_rename_output_formats():
+    """Test the quiet, summary and jsonl output formats of rename."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        (temp_dir / "First File.txt").write_text("first")
+        (temp_dir / "first.file.txt").write_text("second")
+        source = ["rename", "--source-dir", str(temp_dir), "--dry-run"]
+
+        result = runner.invoke(app, [*source, "--output", "summary"])
+        assert result.exit_code == 0
+        assert result.stdout == "Found 1 files to rename, skipped 1\n"
+
+        result = runner.invoke(app, [*source, "--output", "quiet"])
+        assert result.exit_code == 0
+        assert result.stdout == ""
+        assert "Skipped" in result.stderr
+
+        result = runner.invoke(app, [*source, "--output", "jsonl"])
+        assert result.exit_code == 0
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert sorted(record["status"] for record in records) == ["planned", "skipped"]
+        assert {record["target"] for record in records} == {str(temp_dir / "first_file.txt"), None}
+
+
+def test_rename_recursive():
+    """Test rename --recursive renames files in subdirectories in place."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        nested = temp_dir / "Sub Dir"
+        nested.mkdir()
+        (temp_dir / "Top File.txt").write_text("top")
+        (nested / "Nested File.txt").write_text("nested")
+
+        result = runner.invoke(app, ["rename", "--source-dir", str(temp_dir)])
+        assert result.exit_code == 0
+        assert (nested / "Nested File.txt").exists()
+
+        result = runner.invoke(app, ["rename", "--source-dir", str(temp_dir), "--recursive"])
+        assert result.exit_code == 0
+        assert (nested / "nested_file.txt").exists()
+        # directories keep their names
+        assert nested.is_dir()
+
+
 def test_rename_collision_skips_gracefully():
     """Test that rename skips files when target already exists."""
     runner = CliRunner()
@@ -0,0 +1,81 @@
+"""Tests for the duplicate file finder."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from xplat import constants
+from xplat.cli import app
+from xplat.dupes import DupeStats, find_duplicates
+from xplat.list import scan_entries
+
+_runner = CliRunner()
+
+
+def _make_files(root: Path) -> None:
+    head = b"h" * 16
+    tail = b"t" * 16
+    (root / "copy 1.bin").write_bytes(head + b"same middle" + tail)
+    (root / "copy 2.bin").write_bytes(head + b"same middle" + tail)
+    # same size, ends and partial hash, different middle
+    (root / "almost.bin").write_bytes(head + b"diff middle" + tail)
+    # same size, different start
+    (root / "other.bin").write_bytes(b"o" * 16 + b"same middle" + tail)
+    (root / "unique size.bin").write_bytes(b"u")
+    (root / "small 1.txt").write_text("abc")
+    (root / "small 2.txt").write_text("abc")
+    (root / "empty 1").touch()
+    (root / "empty 2").touch()
+    os.link(root / "copy 1.bin", root / "hard link.bin")
+
+
+def test_find_duplicates_in_stages():
+    """Test each stage rules out files, and only candidates are hashed in full."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        _make_files(root)
+
+        stats = DupeStats()
+        groups = find_duplicates(scan_entries(root), jobs=2, block=16, stats=stats)
+        found = [sorted(path.name for path in group.paths) for group in groups]
+        assert ["copy 1.bin", "copy 2.bin"] in found or ["copy 2.bin", "hard link.bin"] in found
+        assert ["small 1.txt", "small 2.txt"] in found
+        assert len(found) == 2
+        assert groups[0].size == 43
+        assert groups[0].wasted_bytes == 43
+
+        assert stats.files == 10
+        # one of the hard links, the other three 43 byte files, and the small files
+        assert stats.same_size == 6
+        # only the files whose ends match are read in full
+        assert stats.full_hashed == 3
+        assert stats.errors == []
+
+
+def test_dupes_command():
+    """Test the dupes command output."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "sub").mkdir()
+        (root / "a.txt").write_text("same")
+        (root / "sub" / "b.txt").write_text("same")
+        (root / "c.txt").write_text("diff")
+
+        result = _runner.invoke(app, ["dupes", str(root)])
+        assert result.exit_code == 0
+        assert "Found 0 groups of duplicates" in result.stdout
+
+        result = _runner.invoke(app, ["dupes", str(root), "--recursive"])
+        assert result.exit_code == 0
+        assert "2 files of 4.0 B" in result.stdout
+        assert "Found 1 groups of duplicates, 4.0 B could be freed" in result.stdout
+
+        result = _runner.invoke(app, ["dupes", str(root), "-r", "--json"])
+        (record,) = (json.loads(line) for line in result.stdout.splitlines())
+        assert sorted(Path(path).name for path in record["paths"]) == ["a.txt", "b.txt"]
+
+        result = _runner.invoke(app, ["dupes", str(root / "a.txt")])
+        assert result.exit_code == constants.NO_FILE
@@ -0,0 +1,52 @@
+"""Tests for file hashing."""
+
+import hashlib
+import tempfile
+from pathlib import Path
+
+from xplat import hashing
+from xplat.hashing import hash_file, hash_files, partial_hash
+
+
+def test_hash_file_and_partial_hash():
+    """Test full and partial hashes of empty, small and large files."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        empty = temp_dir / "empty"
+        empty.touch()
+        small = temp_dir / "small"
+        small.write_bytes(b"0123456789")
+        large = temp_dir / "large"
+        data = bytes(range(256)) * 64
+        large.write_bytes(data)
+
+        assert hash_file(empty) == hashlib.sha256(b"").hexdigest()
+        assert hash_file(large) == hashlib.sha256(data).hexdigest()
+        assert hash_file(large, "blake2b") == hashlib.blake2b(data).hexdigest()
+
+        # a partial hash covers the whole of a small file
+        assert partial_hash(small, block=5) == hash_file(small)
+        assert partial_hash(large, block=100) == hashlib.sha256(data[:100] + data[-100:]).hexdigest()
+
+
+def test_hash_files_mapped_and_read(monkeypatch):
+    """Test large files are mapped, small ones read, in order and in parallel."""
+    monkeypatch.setattr(hashing, "MMAP_THRESHOLD", 100)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        paths = []
+        for index in range(20):
+            file_path = temp_dir / f"file_{index:02d}"
+            file_path.write_bytes(b"x" * index * 10)
+            paths.append(file_path)
+        missing = temp_dir / "missing"
+        paths.insert(5, missing)
+
+        results = list(hash_files(paths, jobs=4))
+        assert [file_path for file_path, _, _ in results] == paths
+        _, error, size = results[5]
+        assert isinstance(error, FileNotFoundError)
+        assert size == 0
+        for file_path, digest, size in results[:5] + results[6:]:
+            assert digest == hashlib.sha256(file_path.read_bytes()).hexdigest()
+            assert size == file_path.stat().st_size
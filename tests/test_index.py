@@ -0,0 +1,132 @@
+"""Tests for the persistent directory index."""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from xplat.cli import app
+from xplat.index import DirectoryIndex
+from xplat.list import FileInfo, create_file_list, scan_entries
+
+_runner = CliRunner()
+
+
+def _age(path: Path) -> None:
+    """Set a directory's mtime well outside the racy window"""
+    old = time.time() - 60
+    os.utime(path, (old, old))
+
+
+def test_index_serves_unchanged_directories(monkeypatch):
+    """Test unchanged directories are served from the index, changed ones listed again."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        index_path = root / "index.db"
+        tree = root / "tree"
+        (tree / "sub").mkdir(parents=True)
+        (tree / "Top File.txt").write_text("top")
+        (tree / "sub" / "deep.txt").write_text("0123456789")
+        _age(tree / "sub")
+        _age(tree)
+
+        with DirectoryIndex(index_path) as index:
+            first = list(scan_entries(tree, recursive=True, index=index))
+            assert index.misses == 2
+
+        scandirs = []
+        real_scandir = os.scandir
+
+        def counting_scandir(*args, **kwargs):
+            scandirs.append(args[0])
+            return real_scandir(*args, **kwargs)
+
+        monkeypatch.setattr(os, "scandir", counting_scandir)
+        with DirectoryIndex(index_path) as index:
+            second = list(scan_entries(tree, recursive=True, index=index))
+            assert (index.hits, index.misses) == (2, 0)
+        assert scandirs == []
+        assert second == first
+        (deep,) = (entry for entry in second if entry.path.name == "deep.txt")
+        assert FileInfo.from_entry(deep).size_bytes == 10
+
+        # a new file changes the directory's mtime
+        (tree / "new.txt").write_text("new")
+        with DirectoryIndex(index_path) as index:
+            names = sorted(entry.path.name for entry in scan_entries(tree, recursive=True, index=index))
+            assert (index.hits, index.misses) == (1, 1)
+        assert names == ["Top File.txt", "deep.txt", "new.txt"]
+
+        with DirectoryIndex(index_path) as index:
+            assert [path.name for path in create_file_list(tree, "txt", index)] == ["Top File.txt", "new.txt"]
+
+
+def test_index_forgets_removed_directories():
+    """Test a removed subdirectory and its files leave the index."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        tree = root / "tree"
+        (tree / "gone").mkdir(parents=True)
+        (tree / "gone" / "file.txt").write_text("gone")
+        index_path = root / "index.db"
+        with DirectoryIndex(index_path) as index:
+            list(scan_entries(tree, recursive=True, index=index))
+
+        (tree / "gone" / "file.txt").unlink()
+        (tree / "gone").rmdir()
+        with DirectoryIndex(index_path) as index:
+            assert list(scan_entries(tree, recursive=True, index=index)) == []
+            assert index._conn.execute("SELECT count(*) FROM dirs").fetchone()[0] == 1
+
+
+def test_list_and_rename_with_index():
+    """Test the --index option of list and rename."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        index_path = root / "index.db"
+        source = root / "source"
+        source.mkdir()
+        (source / "My File.txt").write_text("data")
+
+        result = _runner.invoke(app, ["list", str(source), "--long", "--index", str(index_path)])
+        assert result.exit_code == 0
+        assert "My File.txt" in result.stdout
+        assert index_path.is_file()
+
+        result = _runner.invoke(app, ["rename", "-s", str(source), "--index", str(index_path)])
+        assert result.exit_code == 0
+        assert (source / "my_file.txt").is_file()
+
+        result = _runner.invoke(app, ["list", str(source), "--index", str(index_path)], input="q\n")
+        assert result.exit_code == 0
+        assert "my_file.txt" in result.stdout
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="other platforms require names to be valid Unicode")
+def test_index_non_utf8_names(tmp_path):
+    """Test names that aren't valid UTF-8 are stored and served from the index."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / os.fsdecode(b"bad\xffname.txt")).touch()
+    (source / os.fsdecode(b"sub\xfe")).mkdir()
+    _age(source)
+    index_path = tmp_path / "index.db"
+    for _ in range(2):
+        with DirectoryIndex(index_path) as index:
+            names = sorted(os.fsencode(entry.path.name) for entry in scan_entries(source, index=index))
+        assert names == [b"bad\xffname.txt"]
+    assert index.hits == 1
+
+    # a removed subdirectory is forgotten by its bytes path
+    (source / os.fsdecode(b"sub\xfe")).rmdir()
+    with DirectoryIndex(index_path) as index:
+        assert [entry.name for entry in index.listing(source)] == [os.fsdecode(b"bad\xffname.txt")]
+
+    result = _runner.invoke(app, ["list", str(source), "--json", "--index", str(index_path)])
+    assert result.exit_code == 0
+    assert os.fsdecode(b"bad\xffname.txt") in json.loads(result.stdout)["name"]
@@ -0,0 +1,95 @@
+"""Tests for the cached platform report."""
+
+import json
+import platform
+from dataclasses import asdict
+
+from typer.testing import CliRunner
+
+from xplat import info
+from xplat.cli import app
+from xplat.info import PlatformReport, ReportFormat, platform_report, render_report
+
+_runner = CliRunner()
+
+
+def test_report_is_cached(monkeypatch, tmp_path):
+    """Test the report is built once, then read from the cache until it is stale."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    builds = []
+    build = info.build_platform_report
+
+    def counted_build() -> PlatformReport:
+        builds.append(1)
+        return build()
+
+    monkeypatch.setattr(info, "build_platform_report", counted_build)
+    report = platform_report()
+    assert len(builds) == 1
+    assert list(tmp_path.joinpath("xplat").glob("platform-*.json"))
+    assert platform_report() == report
+    assert len(builds) == 1
+
+    platform_report(refresh=True)
+    assert len(builds) == 2
+    # a new interpreter build or kernel
+    monkeypatch.setattr(info, "_cache_key", lambda: ["changed"])
+    platform_report()
+    assert len(builds) == 3
+
+
+def test_unusable_cache(monkeypatch, tmp_path):
+    """Test a corrupt or unwritable cache is ignored."""
+    cache_file = tmp_path / "not a directory"
+    cache_file.write_text("")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_file))
+    assert platform_report().sections
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    report = platform_report()
+    next(tmp_path.joinpath("xplat").glob("platform-*.json")).write_text("{not json")
+    assert platform_report() == report
+
+
+def test_render_formats():
+    """Test the same report renders as text, JSON and key=value lines."""
+    report = PlatformReport("Test-1.0", [info.ReportSection("Python", [("Python Version", "3.12.1"), ("Python Branch", "")])])
+    text = render_report(report)
+    assert "-- Python Information" in text
+    assert "Python Branch:                 (not found)" in text
+    assert json.loads(render_report(report, ReportFormat.JSON)) == {
+        "platform": "Test-1.0",
+        "python": {"python_version": "3.12.1", "python_branch": ""},
+    }
+    assert render_report(report, ReportFormat.KEY_VALUE).splitlines() == [
+        "platform=Test-1.0",
+        "python.python_version=3.12.1",
+        "python.python_branch=",
+    ]
+
+
+def test_system_rows_keep_empty_values(monkeypatch):
+    """Test empty System values are printed as they are, as before the report was cached."""
+    monkeypatch.setattr(platform, "uname", lambda: platform.uname_result("Linux", "", "6.1", "#1", "x86_64"))
+    report = info.build_platform_report()
+    system = next(section for section in report.sections if section.title == "System")
+    text = render_report(report)
+    assert info.add_row("Node", "") in text
+    assert info.add_row("Node", info.NOT_FOUND) not in text
+    assert ("Node", "") in system.rows
+    assert PlatformReport.from_dict(asdict(report)) == report
+
+
+def test_info_command_formats(monkeypatch, tmp_path):
+    """Test info --json and --kv."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    result = _runner.invoke(app, ["info", "--json"])
+    assert result.exit_code == 0
+    assert "python_version" in json.loads(result.stdout)["python"]
+
+    result = _runner.invoke(app, ["info", "--kv"])
+    assert result.exit_code == 0
+    assert any(line.startswith("system.system=") for line in result.stdout.splitlines())
+
+    result = _runner.invoke(app, ["info", "--json", "--kv"])
+    assert result.exit_code == 2
@@ -0,0 +1,170 @@
+"""Tests for the rename journal and rollback."""
+
+import errno
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from xplat.journal import RenameJournal, read_journal, rollback
+from xplat.options import TransferMode
+from xplat.rename import rename_files
+
+
+def test_journal_records_and_rolls_back():
+    """Test renames are journaled in order and undone most recent first."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        journal_path = temp_dir / "rename.journal"
+        orig_paths = []
+        for name in ["First File.txt", "Second File.txt"]:
+            orig_path = temp_dir / name
+            orig_path.write_text(name)
+            orig_paths.append(orig_path)
+
+        with RenameJournal(journal_path, sync_every=1) as journal:
+            results = list(rename_files(orig_paths, journal=journal))
+
+        entries = read_journal(journal_path)
+        assert [(orig_path, new_path) for orig_path, new_path, _, _ in entries] == results
+        assert all(complete for *_, complete in entries)
+
+        restored = list(rollback(journal_path))
+        assert [orig_path for _, orig_path, _ in restored] == list(reversed(orig_paths))
+        assert all(error is None for _, _, error in restored)
+        assert (temp_dir / "First File.txt").read_text() == "First File.txt"
+        assert not (temp_dir / "first_file.txt").exists()
+
+
+def test_journal_ignores_truncated_record():
+    """Test a record cut short by a crash is ignored."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        journal_path = Path(temp_dir) / "rename.journal"
+        with RenameJournal(journal_path) as journal:
+            journal.record(Path("/a/One.txt"), Path("/a/one.txt"))
+        with journal_path.open("a", encoding="utf-8") as journal_file:
+            journal_file.write('{"from": "/a/Tw')
+
+        assert read_journal(journal_path) == [(Path("/a/One.txt"), Path("/a/one.txt"), TransferMode.RENAME, True)]
+
+
+def test_journal_rejects_corrupt_record(tmp_path):
+    """Test a corrupt record before the last line is an error, not skipped."""
+    journal_path = tmp_path / "rename.journal"
+    with RenameJournal(journal_path) as journal:
+        journal.record(Path("/a/One.txt"), Path("/a/one.txt"))
+    with journal_path.open("a", encoding="utf-8") as journal_file:
+        journal_file.write('{"from": "/a/Tw\n')
+    with RenameJournal(journal_path) as journal:
+        journal.record(Path("/a/Three.txt"), Path("/a/three.txt"))
+
+    with pytest.raises(ValueError, match="corrupt at line 2"):
+        read_journal(journal_path)
+
+
+def test_journal_reused_across_runs(tmp_path):
+    """Test a file renamed back and forth by several runs is undone every time, in order."""
+    journal_path = tmp_path / "rename.journal"
+    first, second = tmp_path / "a.txt", tmp_path / "b.txt"
+    first.write_text("content")
+    for orig_path, new_path in [(first, second), (second, first), (first, second)]:
+        # a new run appends to the same journal
+        with RenameJournal(journal_path) as journal:
+            journal.begin(orig_path, new_path)
+            orig_path.rename(new_path)
+            journal.complete(orig_path, new_path)
+
+    assert [(orig_path.name, complete) for orig_path, _, _, complete in read_journal(journal_path)] == [
+        ("a.txt", True),
+        ("b.txt", True),
+        ("a.txt", True),
+    ]
+    restored = list(rollback(journal_path))
+    assert [(new_path.name, orig_path.name, error) for new_path, orig_path, error in restored] == [
+        ("b.txt", "a.txt", None),
+        ("a.txt", "b.txt", None),
+        ("b.txt", "a.txt", None),
+    ]
+    assert first.read_text() == "content"
+    assert not second.exists()
+
+
+def test_rollback_skips_missing_and_existing():
+    """Test rollback reports renames it can't undo and leaves files alone."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        journal_path = temp_dir / "rename.journal"
+        with RenameJournal(journal_path) as journal:
+            journal.record(temp_dir / "Gone.txt", temp_dir / "gone.txt")
+            journal.record(temp_dir / "Back.txt", temp_dir / "back.txt")
+        (temp_dir / "Back.txt").write_text("original")
+        (temp_dir / "back.txt").write_text("renamed")
+
+        results = list(rollback(journal_path))
+        assert isinstance(results[0][2], FileExistsError)
+        assert isinstance(results[1][2], FileNotFoundError)
+        assert (temp_dir / "back.txt").read_text() == "renamed"
+
+
+def test_rollback_removes_copies():
+    """Test rolling back a copy removes the copy and keeps the original."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        journal_path = temp_dir / "rename.journal"
+        orig_path = temp_dir / "Copy Me.txt"
+        orig_path.write_text("content")
+
+        with RenameJournal(journal_path) as journal:
+            ((_, new_path),) = rename_files([orig_path], journal=journal, mode=TransferMode.COPY)
+
+        assert new_path.exists()
+        assert all(error is None for _, _, error in rollback(journal_path))
+        assert not new_path.exists()
+        assert orig_path.read_text() == "content"
+
+
+def test_rollback_pending_renames(tmp_path):
+    """Test renames begun but never completed are undone only if they were made."""
+    journal_path = tmp_path / "rename.journal"
+    made = [tmp_path / "Made.txt", tmp_path / "made.txt"]
+    not_made = [tmp_path / "Not Made.txt", tmp_path / "not_made.txt"]
+    moved = [tmp_path / "Moved.txt", tmp_path / "moved.txt"]
+    for orig_path, _ in [made, not_made, moved]:
+        orig_path.write_text("content")
+    with RenameJournal(journal_path) as journal:
+        journal.begin(*made)
+        made[0].rename(made[1])
+        journal.begin(*not_made)
+        # killed while copying, before the original was removed
+        journal.begin(*moved, TransferMode.MOVE)
+        moved[1].write_text("cont")
+
+    assert [complete for *_, complete in read_journal(journal_path)] == [False, False, False]
+    restored = list(rollback(journal_path))
+    assert [(new_path, error) for new_path, _, error in restored] == [(moved[1], None), (made[1], None)]
+    assert made[0].exists()
+    assert not made[1].exists()
+    assert not_made[0].exists()
+    assert moved[0].read_text() == "content"
+    assert not moved[1].exists()
+
+
+def test_unwritable_completion(tmp_path, monkeypatch):
+    """Test a rename is reported done, and can be undone, if its completion can't be journaled."""
+    journal_path = tmp_path / "rename.journal"
+    orig_path = tmp_path / "Full Disk.txt"
+    orig_path.touch()
+    with RenameJournal(journal_path) as journal:
+        write = journal._write
+
+        def write_pending(record):
+            if not record.get("pending"):
+                raise OSError(errno.ENOSPC, "No space left on device")
+            write(record)
+
+        monkeypatch.setattr(journal, "_write", write_pending)
+        ((_, new_path),) = rename_files([orig_path], journal=journal)
+    assert new_path == tmp_path / "full_disk.txt"
+    assert journal.unconfirmed == 1
+    assert [error for _, _, error in rollback(journal_path)] == [None]
+    assert orig_path.exists()
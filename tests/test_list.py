@@ -1,9 +1,28 @@
 """Tests for xplat.list module utility functions."""
 
+import os
 import tempfile
+from datetime import datetime
 from pathlib import Path
 
-from xplat.list import check_dir, check_file, format_bytes
+import pytest
+
+import xplat.list
+from xplat.list import (
+    FileFilter,
+    FileInfo,
+    SortKey,
+    check_dir,
+    check_file,
+    create_file_list,
+    format_bytes,
+    format_timestamp,
+    parse_size,
+    parse_time,
+    scan_entries,
+    scan_files,
+    sort_entries,
+)
 
 
 def test_format_bytes_yottabytes():
@@ -59,3 +78,186 @@ def test_check_file_valid():
         exists, msg = check_file(Path(tmp.name))
         assert exists is True
         assert "is a valid file" in msg
+
+
+def test_scan_files_recursive():
+    """Test scan_files walks subdirectories, filters and skips directories."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "sub" / "deeper").mkdir(parents=True)
+        (root / "output").mkdir()
+        (root / "top.txt").write_text("top")
+        (root / "top.pdf").write_text("top")
+        (root / "sub" / "middle.txt").write_text("middle")
+        (root / "sub" / "deeper" / "bottom.txt").write_text("bottom")
+        (root / "output" / "done.txt").write_text("done")
+
+        assert {p.name for p in scan_files(root)} == {"top.txt", "top.pdf"}
+        assert {p.name for p in scan_files(root, "txt", recursive=True)} == {
+            "top.txt",
+            "middle.txt",
+            "bottom.txt",
+            "done.txt",
+        }
+        skipped = list(scan_files(root, "txt", recursive=True, skip_dirs=[root / "output"]))
+        assert root / "output" / "done.txt" not in skipped
+        # files of a directory come before those of its subdirectories
+        assert skipped.index(root / "top.txt") < skipped.index(root / "sub" / "middle.txt")
+        assert skipped.index(root / "sub" / "middle.txt") < skipped.index(root / "sub" / "deeper" / "bottom.txt")
+
+
+def test_file_info_stats_once(monkeypatch):
+    """Test FileInfo stats once, or not at all, and formats on access."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = Path(temp_dir) / "info.txt"
+        file_path.write_text("0123456789" * 205)
+        stat_result = file_path.stat()
+
+        calls = []
+        real_stat = os.stat
+
+        def counting_stat(*args, **kwargs):
+            calls.append(args[0])
+            return real_stat(*args, **kwargs)
+
+        monkeypatch.setattr(os, "stat", counting_stat)
+        file_info = FileInfo(file_path)
+        assert len(calls) == 1
+        assert FileInfo(file_path, stat_result) == file_info
+        assert len(calls) == 1
+
+        assert file_info.size_bytes == 2050
+        assert file_info.size == "2.0 K"
+        assert file_info.modified == format_timestamp(stat_result.st_mtime)
+        assert not hasattr(file_info, "__dict__")
+
+        with os.scandir(temp_dir) as it:
+            infos = FileInfo.from_paths(it)
+        assert infos == [file_info]
+
+
+def test_file_filter_names_before_stat(monkeypatch):
+    """Test name filters run first, and only files that pass them are stat'ed."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "big.pdf").write_text("x" * 4096)
+        (root / "small.pdf").write_text("x")
+        (root / "draft.pdf").write_text("x" * 4096)
+        (root / "photo.JPG").write_text("x" * 4096)
+        (root / "README").write_text("x" * 4096)
+        (root / ".pdf").write_text("x" * 4096)
+
+        assert [path.name for path in create_file_list(root)] == [
+            ".pdf",
+            "README",
+            "big.pdf",
+            "draft.pdf",
+            "photo.JPG",
+            "small.pdf",
+        ]
+
+        stats = []
+        real_stat = os.DirEntry.stat
+
+        class CountingEntry:
+            def __init__(self, entry):
+                self._entry = entry
+                self.name = entry.name
+                self.path = entry.path
+
+            def __getattr__(self, name):
+                return getattr(self._entry, name)
+
+            def stat(self, **kwargs):
+                stats.append(self.name)
+                return real_stat(self._entry, **kwargs)
+
+        real_scandir = os.scandir
+
+        class CountingScandir:
+            def __init__(self, path):
+                self._it = real_scandir(path)
+
+            def __enter__(self):
+                return (CountingEntry(entry) for entry in self._it)
+
+            def __exit__(self, *args):
+                self._it.close()
+
+        monkeypatch.setattr(os, "scandir", CountingScandir)
+        file_filter = FileFilter(["pdf", "JPG"], exclude=["draft*"], min_size=parse_size("1K"))
+        assert sorted(path.name for path in scan_files(root, file_filter=file_filter)) == ["big.pdf", "photo.JPG"]
+        assert sorted(stats) == ["big.pdf", "photo.JPG", "small.pdf"]
+
+        stats.clear()
+        assert sorted(path.name for path in scan_files(root, file_filter=FileFilter(include=["*o*"]))) == ["photo.JPG"]
+        assert stats == []
+
+
+@pytest.mark.parametrize("fold_case", [False, True])
+def test_filter_case(monkeypatch, fold_case):
+    """Test names match regardless of case only where the platform's paths do, like Path.glob."""
+    monkeypatch.setattr(xplat.list, "FOLD_CASE", fold_case)
+    file_filter = FileFilter(["jpg"], include=["photo*"], exclude=["*DRAFT*"])
+    assert file_filter.match_name("photo.jpg")
+    assert file_filter.match_name("Photo.JPG") is fold_case
+    assert file_filter.match_name("photo draft.jpg") is not fold_case
+    assert FileFilter(["JPG"]).match_name("photo.jpg") is fold_case
+
+
+def test_parse_size_and_time():
+    """Test size and time arguments of the filter options."""
+    assert parse_size("512") == 512
+    assert parse_size("10K") == 10240
+    assert parse_size("1.5mb") == 1572864
+    with pytest.raises(ValueError, match="Invalid size"):
+        parse_size("ten")
+    assert parse_time("7d", now=1_000_000) == 1_000_000 - 7 * 86400
+    assert parse_time("2024-01-31") == datetime(2024, 1, 31).timestamp()
+    with pytest.raises(ValueError, match="Invalid time"):
+        parse_time("last week")
+
+    file_filter = FileFilter(newer=100.0, older=200.0, max_size=10)
+    assert file_filter.needs_stat
+    assert file_filter.match_stat(os.stat_result((0,) * 6 + (10, 150, 150, 150)))
+    assert not file_filter.match_stat(os.stat_result((0,) * 6 + (10, 200, 200, 200)))
+    assert not file_filter.match_stat(os.stat_result((0,) * 6 + (11, 150, 150, 150)))
+
+
+def test_sort_entries_spills_and_merges():
+    """Test sorted runs spilled to disk merge into the same order as an in-memory sort."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        for index in range(50):
+            file_path = root / f"file {index * 7 % 50:02d}.txt"
+            file_path.write_text("x" * (index * 13 % 17))
+            os.utime(file_path, (1_000_000 + index % 9, 1_000_000 + index % 9))
+        entries = list(scan_entries(root))
+
+        by_name = sorted(entry.path for entry in entries)
+        assert [entry.path for entry in sort_entries(entries, run_size=7)] == by_name
+        assert [entry.path for entry in sort_entries(entries, reverse=True, run_size=7)] == by_name[::-1]
+
+        by_size = sorted(entries, key=lambda entry: (-entry.path.stat().st_size, str(entry.path)))
+        spilled = list(sort_entries(entries, SortKey.SIZE, run_size=7))
+        assert [entry.path for entry in spilled] == [entry.path for entry in by_size]
+        assert FileInfo.from_entry(spilled[0]).size_bytes == 16
+        assert [entry.path for entry in sort_entries(entries, SortKey.SIZE)] == [entry.path for entry in by_size]
+
+        by_age = sorted(entries, key=lambda entry: (entry.path.stat().st_mtime, str(entry.path)))
+        oldest = list(sort_entries(entries, SortKey.MTIME, reverse=True, run_size=7))
+        assert [entry.path for entry in oldest] == [entry.path for entry in by_age]
+
+        top = list(sort_entries(entries, SortKey.SIZE, top=5))
+        assert [entry.path for entry in top] == [entry.path for entry in by_size[:5]]
+        assert [entry.path for entry in sort_entries(entries, reverse=True, top=3)] == by_name[:-4:-1]
+
+
+def test_sort_entries_removed_file(tmp_path):
+    """Test a file removed between the scan and a sort by size is left out, not an error."""
+    for name, size in [("big.txt", 9), ("gone.txt", 5), ("small.txt", 1)]:
+        tmp_path.joinpath(name).write_text("x" * size)
+    entries = list(scan_entries(tmp_path))
+    tmp_path.joinpath("gone.txt").unlink()
+    assert [entry.path.name for entry in sort_entries(entries, SortKey.SIZE)] == ["big.txt", "small.txt"]
+    assert sorted(entry.path.name for entry in sort_entries(entries, SortKey.MTIME, top=5)) == ["big.txt", "small.txt"]
@@ -0,0 +1,91 @@
+"""Tests for checksum manifests."""
+
+import hashlib
+import tempfile
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from xplat import constants
+from xplat.cli import app
+from xplat.manifest import ManifestStats, check_manifest, format_line, parse_line, write_manifest
+
+_runner = CliRunner()
+DIGEST = hashlib.sha256(b"data").hexdigest()
+
+
+def test_manifest_lines():
+    """Test lines are written and read like sha256sum, escaping odd names."""
+    assert format_line(DIGEST, "dir/file.txt") == f"{DIGEST}  dir/file.txt\n"
+    assert parse_line(f"{DIGEST}  dir/file.txt\n") == (DIGEST, "dir/file.txt")
+    assert parse_line(f"{DIGEST.upper()} *binary.bin\r\n") == (DIGEST, "binary.bin")
+    for name in ["back\\slash", "line\nbreak", "return\r", "both\\n"]:
+        line = format_line(DIGEST, name)
+        assert line.startswith("\\")
+        assert line.count("\n") == 1
+        assert parse_line(line) == (DIGEST, name)
+    with pytest.raises(ValueError, match="Improperly formatted"):
+        parse_line("not a checksum line")
+
+
+def test_write_and_check_manifest():
+    """Test a manifest is checked in parallel, reporting failed and missing files."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "sub").mkdir()
+        paths = [root / f"file_{index}.txt" for index in range(10)] + [root / "sub" / "deep.txt"]
+        for file_path in paths:
+            file_path.write_text(file_path.name)
+
+        manifest_path = root / "SHA256SUMS"
+        stats = ManifestStats()
+        with manifest_path.open("w") as manifest:
+            written = list(write_manifest(paths, root, manifest, jobs=3, stats=stats))
+        assert [file_path for file_path, _ in written] == paths
+        assert (stats.files, stats.size_bytes) == (11, sum(len(path.name) for path in paths))
+        assert manifest_path.read_text().splitlines()[-1].endswith("  sub/deep.txt")
+
+        (root / "file_3.txt").write_text("changed")
+        (root / "file_7.txt").unlink()
+        with manifest_path.open("a") as manifest:
+            manifest.write("garbage\n")
+
+        stats = ManifestStats()
+        results = dict(check_manifest(manifest_path, jobs=3, stats=stats))
+        assert results["file_3.txt"] is False
+        assert isinstance(results["file_7.txt"], FileNotFoundError)
+        assert results["sub/deep.txt"] is True
+        assert (stats.files, stats.failed, stats.unreadable, stats.bad_lines) == (11, 1, 1, 1)
+
+
+def test_checksum_command():
+    """Test the checksum command writes and verifies a manifest."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "a.txt").write_text("a")
+        (root / "b.pdf").write_text("b")
+        manifest_path = root / "SHA256SUMS"
+
+        result = _runner.invoke(app, ["checksum", str(root), "--ext", "txt"])
+        assert result.exit_code == 0
+        assert result.stdout.splitlines() == [f"{hashlib.sha256(b'a').hexdigest()}  a.txt"]
+
+        result = _runner.invoke(app, ["checksum", str(root), "--output", str(manifest_path)])
+        assert result.exit_code == 0
+        assert "MB/s" in result.stderr
+        # the manifest leaves itself out
+        assert [line.split()[1] for line in manifest_path.read_text().splitlines()] == ["a.txt", "b.pdf"]
+
+        result = _runner.invoke(app, ["checksum", "--check", str(manifest_path), "--jobs", "2"])
+        assert result.exit_code == 0
+        assert "a.txt: OK" in result.stdout
+
+        (root / "b.pdf").write_text("changed")
+        result = _runner.invoke(app, ["checksum", "--check", str(manifest_path)])
+        assert result.exit_code == 1
+        assert "b.pdf: FAILED" in result.stdout
+        assert "1 computed checksums did NOT match" in result.stderr
+
+        result = _runner.invoke(app, ["checksum", "--check", str(root / "missing")])
+        assert result.exit_code == constants.NO_FILE
@@ -0,0 +1,123 @@
+"""Tests for run metrics."""
+
+import json
+import time
+
+from typer.testing import CliRunner
+
+from xplat.cli import app
+from xplat.metrics import Phase, RunMetrics, render_prometheus, skip_reason, write_metrics
+from xplat.options import TransferMode
+from xplat.rename import rename_file
+
+_runner = CliRunner()
+
+
+def _slow(items, seconds):
+    for item in items:
+        time.sleep(seconds)
+        yield item
+
+
+def test_nested_phases():
+    """Test a phase's time leaves out the phases timed inside it."""
+    metrics = RunMetrics("rename")
+    with metrics.phase(Phase.OUTPUT):
+        files = metrics.scanned(_slow(range(3), 0.01))
+        assert list(metrics.timed(_slow(files, 0.02), Phase.EXECUTION)) == [0, 1, 2]
+    metrics.finish()
+    seconds = metrics.phase_seconds
+    assert metrics.files_scanned == 3
+    assert seconds[Phase.DISCOVERY] >= 0.03
+    # the scan's sleeps aren't counted again
+    assert 0.06 <= seconds[Phase.EXECUTION] < 0.06 + seconds[Phase.DISCOVERY]
+    assert seconds[Phase.OUTPUT] < seconds[Phase.DISCOVERY]
+    assert seconds[Phase.PLANNING] == 0
+    assert sum(seconds.values()) <= metrics.run_seconds
+
+
+def test_counters(tmp_path):
+    """Test rename_file counts renames and bytes copied, and skips are counted by reason."""
+    metrics = RunMetrics("rename")
+    source = tmp_path / "My File.TXT"
+    source.write_text("hello")
+    assert rename_file(source, dry_run=True, metrics=metrics) == tmp_path / "my_file.txt"
+    assert metrics.files_renamed == 0
+    rename_file(source, tmp_path, mode=TransferMode.COPY, metrics=metrics)
+    other = tmp_path / "Other File.txt"
+    other.touch()
+    rename_file(other, metrics=metrics)
+    assert metrics.files_renamed == 2
+    assert metrics.bytes_moved == 5
+
+    metrics.skip(FileExistsError("taken"))
+    metrics.skip(FileExistsError("taken"))
+    metrics.skip(OSError("Refusing to operate on symlink"))
+    assert metrics.skipped == {"exists": 2, "error": 1}
+    assert skip_reason(PermissionError()) == "permission"
+
+
+def test_write_metrics(tmp_path):
+    """Test metrics are written as JSON, or Prometheus text for a .prom file."""
+    metrics = RunMetrics("rename", files_scanned=4, files_renamed=3, skipped={"exists": 1})
+    metrics.finish()
+    write_metrics(metrics, tmp_path / "rename.json")
+    record = json.loads(tmp_path.joinpath("rename.json").read_text())
+    assert record["files_scanned"] == 4
+    assert record["files_skipped"] == 1
+    assert set(record["phase_seconds"]) == {"discovery", "planning", "execution", "output"}
+
+    write_metrics(metrics, tmp_path / "rename.prom")
+    text = tmp_path.joinpath("rename.prom").read_text()
+    assert text == render_prometheus(metrics)
+    assert "# TYPE xplat_files_renamed gauge" in text
+    assert 'xplat_files_skipped{command="rename",reason="exists"} 1' in text
+    assert 'xplat_phase_seconds{command="rename",phase="discovery"}' in text
+    # nothing left behind by the atomic write
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["rename.json", "rename.prom"]
+
+
+def test_rename_metrics(tmp_path):
+    """Test the rename command writes the counts of its run."""
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in ["My File.txt", "Other File.txt", "my_file.txt", "safe.txt"]:
+        source.joinpath(name).touch()
+    metrics_path = tmp_path / "rename.json"
+    result = _runner.invoke(app, ["rename", "-s", str(source), "--output", "summary", "--metrics", str(metrics_path)])
+    assert result.exit_code == 0
+    record = json.loads(metrics_path.read_text())
+    assert record["command"] == "rename"
+    assert record["files_scanned"] == 4
+    assert record["files_planned"] == 1
+    assert record["files_renamed"] == 1
+    # a name that's taken, and two that are already safe
+    assert record["skipped"] == {"exists": 3}
+    assert record["run_seconds"] > 0
+
+
+def test_list_and_info_metrics(tmp_path, monkeypatch):
+    """Test the list and info commands write metrics, without changing their output."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    for index in range(3):
+        tmp_path.joinpath(f"file {index}.txt").touch()
+    metrics_path = tmp_path / "list.prom"
+    result = _runner.invoke(app, ["list", str(tmp_path), "--json", "--sort", "size", "--metrics", str(metrics_path)])
+    assert result.exit_code == 0
+    assert len(result.stdout.splitlines()) == 3
+    assert 'xplat_files_scanned{command="list"} 3' in metrics_path.read_text()
+
+    metrics_path = tmp_path / "info.json"
+    result = _runner.invoke(app, ["info", "--json", "--metrics", str(metrics_path)])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout)["platform"]
+    assert json.loads(metrics_path.read_text())["phase_seconds"]["discovery"] > 0
+
+
+def test_unwritable_metrics(tmp_path):
+    """Test a metrics file that can't be written doesn't fail the run."""
+    tmp_path.joinpath("file.txt").touch()
+    metrics_path = tmp_path / "missing" / "list.json"
+    result = _runner.invoke(app, ["list", str(tmp_path), "--json", "--metrics", str(metrics_path)])
+    assert result.exit_code == 0
+    assert "Can't write metrics" in result.stderr
@@ -0,0 +1,120 @@
+"""Tests for the host and filesystem probe."""
+
+import json
+
+from typer.testing import CliRunner
+
+from xplat import constants
+from xplat.cli import app
+from xplat.probe import (
+    MAX_JOBS,
+    HostLimits,
+    Latency,
+    ProbeResult,
+    cgroup_cpu_quota,
+    cgroup_dirs,
+    cgroup_memory_limit,
+    host_limits,
+    measure_latency,
+)
+
+_runner = CliRunner()
+
+
+def test_cgroup_limits(tmp_path):
+    """Test cgroup v2 and v1 CPU quotas and memory limits are read."""
+    assert cgroup_cpu_quota(tmp_path) is None
+    assert cgroup_memory_limit(tmp_path) is None
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    (tmp_path / "memory.max").write_text("max\n")
+    assert cgroup_cpu_quota(tmp_path) is None
+    assert cgroup_memory_limit(tmp_path) is None
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    (tmp_path / "memory.max").write_text("536870912\n")
+    assert cgroup_cpu_quota(tmp_path) == 1.5
+    assert cgroup_memory_limit(tmp_path) == 512 * 1024 * 1024
+
+    v1 = tmp_path / "v1"
+    (v1 / "cpu").mkdir(parents=True)
+    (v1 / "memory").mkdir()
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (v1 / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    (v1 / "memory" / "memory.limit_in_bytes").write_text("9223372036854771712\n")
+    assert cgroup_cpu_quota(v1) is None
+    assert cgroup_memory_limit(v1) is None
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    assert cgroup_cpu_quota(v1) == 2.0
+
+
+def test_cgroup_v2_own_directory(tmp_path):
+    """Test the limits are read from this process's cgroup and its ancestors, and bad values ignored."""
+    proc_cgroup = tmp_path / "cgroup"
+    proc_cgroup.write_text("1:cpu:/\n0::/user.slice/app.scope\n")
+    root = tmp_path / "sys"
+    leaf = root / "user.slice" / "app.scope"
+    leaf.mkdir(parents=True)
+    (root / "cpu.max").write_text("400000 100000\n")
+    (root / "user.slice" / "cpu.max").write_text("50000 100000\n")
+    (leaf / "cpu.max").write_text("max 100000\n")
+    (root / "user.slice" / "memory.max").write_text("max\n")
+    (leaf / "memory.max").write_text("1073741824\n")
+    assert cgroup_dirs(root, proc_cgroup) == [leaf, root / "user.slice", root]
+    assert cgroup_cpu_quota(root, proc_cgroup) == 0.5
+    assert cgroup_memory_limit(root, proc_cgroup) == 1 << 30
+
+    (root / "user.slice" / "cpu.max").write_text("lots 100000\n")
+    (leaf / "memory.max").write_text("unknown\n")
+    assert cgroup_cpu_quota(root, proc_cgroup) == 4.0
+    assert cgroup_memory_limit(root, proc_cgroup) is None
+    # a cgroup that isn't under the mount, the root is used
+    proc_cgroup.write_text("0::/../other\n")
+    assert cgroup_dirs(root, proc_cgroup) == [root]
+
+
+def test_usable_cpus(tmp_path):
+    """Test the quota caps the usable CPUs, rounded up."""
+    assert HostLimits(8, 4).usable_cpus == 4
+    assert HostLimits(8, 4, quota_cpus=1.5).usable_cpus == 2
+    assert HostLimits(8, 4, quota_cpus=0.2).usable_cpus == 1
+    host = host_limits(tmp_path)
+    assert 1 <= host.usable_cpus <= host.cpu_count
+
+
+def test_recommendations():
+    """Test slower calls get more workers, within the limits."""
+    local = {call: Latency(5e-6, 8e-6) for call in ["create", "stat", "rename", "unlink"]}
+    result = ProbeResult(HostLimits(4, 4), local)
+    assert (result.rename_jobs, result.rename_batch, result.list_concurrency) == (1, 1, 1)
+
+    network = {call: Latency(500e-6, 2e-3) for call in ["create", "stat", "unlink"]}
+    network["rename"] = Latency(5e-3, 9e-3)
+    result = ProbeResult(HostLimits(4, 4, open_files=1024), network)
+    assert result.rename_jobs == MAX_JOBS
+    assert result.rename_batch > MAX_JOBS
+    assert result.list_concurrency == 25
+    # each job may hold two files open
+    result.host.open_files = 64
+    assert result.rename_jobs == 8
+
+
+def test_measure_latency(tmp_path):
+    """Test every call is timed, and the scratch directory is removed."""
+    latency = measure_latency(tmp_path, files=10)
+    assert set(latency) == {"create", "stat", "rename", "unlink"}
+    assert all(0 < stats.median <= stats.p95 for stats in latency.values())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_info_probe(monkeypatch, tmp_path):
+    """Test info --probe adds host, filesystem and recommendation sections."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    result = _runner.invoke(app, ["info", "--probe", str(tmp_path), "--json"])
+    assert result.exit_code == 0
+    record = json.loads(result.stdout)
+    assert int(record["host"]["usable_cpus"]) >= 1
+    assert float(record["filesystem"]["rename_median_us"]) > 0
+    assert int(record["recommended"]["rename_jobs"]) >= 1
+
+    result = _runner.invoke(app, ["info", "--probe", str(tmp_path / "missing")])
+    assert result.exit_code == constants.NO_FILE
@@ -0,0 +1,87 @@
+"""Tests for the --profile and --trace-malloc options."""
+
+import json
+import pstats
+import tracemalloc
+
+from typer.testing import CliRunner
+
+from xplat.cli import app
+from xplat.profiling import ProfileSession
+
+_runner = CliRunner()
+
+
+def test_profile_any_command(tmp_path):
+    """Test a command is profiled and traced, without changing its output."""
+    source = tmp_path / "source"
+    source.mkdir()
+    for index in range(5):
+        source.joinpath(f"file {index}.txt").write_text("x" * index)
+    profile_path = tmp_path / "list.prof"
+    trace_path = tmp_path / "list.snapshot"
+    result = _runner.invoke(
+        app,
+        [
+            "--profile",
+            str(profile_path),
+            "--trace-malloc",
+            str(trace_path),
+            "--profile-top",
+            "3",
+            "list",
+            str(source),
+            "--json",
+        ],
+    )
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(records) == 5
+    # the saved results load with the standard tools
+    assert pstats.Stats(str(profile_path)).total_calls > 0  # type: ignore[attr-defined]
+    assert tracemalloc.Snapshot.load(str(trace_path)).traces
+    assert "Hot functions" in result.stderr
+    assert "Allocations still held" in result.stderr
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_only():
+    """Test profiling without tracing memory reports only functions."""
+    session = ProfileSession(None, None, 5)
+    session.start()
+    report = session.stop()
+    assert report.hot_functions == []
+    assert report.peak_bytes is None
+
+
+def test_no_profile_by_default(tmp_path):
+    """Test nothing is profiled or traced unless asked for."""
+    tmp_path.joinpath("file.txt").touch()
+    result = _runner.invoke(app, ["list", str(tmp_path), "--json"])
+    assert result.exit_code == 0
+    assert result.stderr == ""
+    assert not tracemalloc.is_tracing()
+
+
+def test_unwritable_profile(tmp_path):
+    """Test results that can't be saved are reported and fail the run, after the command's output."""
+    tmp_path.joinpath("file.txt").touch()
+    missing = tmp_path / "missing"
+    result = _runner.invoke(
+        app,
+        [
+            "--profile",
+            str(missing / "list.prof"),
+            "--trace-malloc",
+            str(missing / "list.snapshot"),
+            "list",
+            str(tmp_path),
+            "--json",
+        ],
+    )
+    assert result.exit_code == 1
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+    assert json.loads(result.stdout.splitlines()[0])["name"] == "file.txt"
+    assert result.stdout.count("Can't save profile results") == 2
+    assert "Hot functions" in result.stderr
+    assert not tracemalloc.is_tracing()
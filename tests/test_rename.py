@@ -1,10 +1,12 @@
 """Tests for the rename module functionality."""
 
+import os
 from pathlib import Path
 
 import pytest
 
 from xplat import rename
+from xplat.list import scan_entries
 
 
 # Setup test directories
@@ -130,3 +132,134 @@ def test_rename_file_success(test_dirs, test_files):
     assert moved_path.exists()
     assert moved_path.name == "move_this_file.txt"
     assert moved_path.parent == target_dir
+
+
+def test_safe_stem_matches_reference():
+    """Test the compiled fast path matches the reference transformation."""
+    names = [
+        "Hello World.test",
+        "  Leading and trailing  ",
+        "Mixed_Under-Score.and Space",
+        "Ünïcödé Fïlé № 2",
+        "İstanbul ﬁle",
+        "tabs\tand\nnewlines",
+        "__..__",
+        "",
+    ]
+    for delim in ["_", "-", " ", "x", "\\", "X", ".", "--"]:
+        for name in names:
+            assert rename.safe_stem(name, delim) == rename._safe_stem_slow(name, delim)
+
+
+def test_safe_stems():
+    """Test bulk stem transformation keeps order and matches safe_stem."""
+    names = ["IMG 0001", "scan.001", "IMG 0001", "Too__Many___Delims"]
+    assert rename.safe_stems(names) == ["img_0001", "scan_001", "img_0001", "too_many_delims"]
+    assert rename.safe_stems(iter(names), delim="-") == [rename.safe_stem(name, "-") for name in names]
+
+
+def test_make_safe_paths(test_dirs):
+    """Test bulk safe path creation matches make_safe_path."""
+    test_path, target_dir = test_dirs
+    orig_paths = [test_path / "Test File.TXT", test_path / "Another.One.jpg"]
+
+    assert rename.make_safe_paths(orig_paths) == [rename.make_safe_path(p) for p in orig_paths]
+    assert rename.make_safe_paths(orig_paths, target_dir) == [rename.make_safe_path(p, target_dir) for p in orig_paths]
+
+
+def test_rename_files_parallel_keeps_order(test_dirs):
+    """Test threaded renames yield in input order and the first of a collision wins."""
+    test_path, target_dir = test_dirs
+    names = ["My File.txt", "B File.txt", "my.file.txt", "C File.txt"]
+    orig_paths = []
+    for name in names:
+        orig_path = test_path / name
+        orig_path.write_text(name)
+        orig_paths.append(orig_path)
+
+    results = list(rename.rename_files(orig_paths, target_dir, jobs=4))
+
+    assert [orig_path for orig_path, _ in results] == orig_paths
+    assert results[0][1] == target_dir / "my_file.txt"
+    assert isinstance(results[2][1], FileExistsError)
+    assert (target_dir / "my_file.txt").read_text() == "My File.txt"
+    assert (target_dir / "c_file.txt").exists()
+
+
+def test_plan_renames_collisions(test_dirs):
+    """Test the planner finds clashes between sources and with existing files."""
+    test_path, target_dir = test_dirs
+    names = ["My File.txt", "my.file.txt", "Other File.txt", "safe.txt"]
+    orig_paths = [test_path / name for name in names]
+    for orig_path in orig_paths:
+        orig_path.touch()
+    (target_dir / "other_file.txt").touch()
+
+    plan = rename.plan_renames(orig_paths, target_dir)
+    first, second, third, fourth = plan.renames
+    assert first.new_path == target_dir / "my_file.txt"
+    assert first.skip_reason is None
+    assert second.collides_with == orig_paths[0]
+    assert second.skip_reason is not None
+    assert third.collides_with == target_dir / "other_file.txt"
+    assert fourth.collides_with is None
+    assert plan.collisions == [second, third]
+
+    # in place, a file that already has a safe name is skipped
+    in_place = rename.plan_renames([orig_paths[3]])
+    assert "already safe" in in_place.renames[0].skip_reason
+
+    plan = rename.plan_renames(orig_paths, target_dir, rename.CollisionStrategy.SUFFIX)
+    assert [planned.new_path.name for planned in plan.renames] == [
+        "my_file.txt",
+        "my_file_1.txt",
+        "other_file_1.txt",
+        "safe.txt",
+    ]
+    results = dict(rename.execute_plan(plan))
+    assert results[orig_paths[1]] == target_dir / "my_file_1.txt"
+    assert (target_dir / "other_file_1.txt").exists()
+
+
+def test_plan_batches(tmp_path):
+    """Test plans are made per source directory, with names claimed in a target directory kept."""
+    for name in ["a", "b"]:
+        tmp_path.joinpath(name).mkdir()
+        tmp_path.joinpath(name, "My File.txt").touch()
+    target_dir = tmp_path / "target"
+    target_dir.mkdir()
+    entries = scan_entries(tmp_path, recursive=True, skip_dirs=[target_dir])
+    plans = list(rename.plan_batches(entries, target_dir))
+    assert [len(plan.renames) for plan in plans] == [1, 1]
+    assert plans[0].collisions == []
+    assert plans[1].renames[0].collides_with == target_dir / "my_file.txt"
+
+    in_place = list(rename.plan_batches(scan_entries(tmp_path, recursive=True, skip_dirs=[target_dir])))
+    assert [plan.collisions for plan in in_place] == [[], []]
+
+
+def test_rename_scanned_entries_stat_once(test_dirs, monkeypatch):
+    """Test scanned entries are renamed with one stat per file."""
+    test_path, target_dir = test_dirs
+    for count in range(5):
+        (test_path / f"Scanned File {count}.txt").touch()
+    entries = list(scan_entries(test_path))
+
+    calls = {"stat": 0, "lstat": 0}
+    real_stat, real_lstat = os.stat, os.lstat
+
+    def counting_stat(*args, **kwargs):
+        calls["stat"] += 1
+        return real_stat(*args, **kwargs)
+
+    def counting_lstat(*args, **kwargs):
+        calls["lstat"] += 1
+        return real_lstat(*args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", counting_stat)
+    monkeypatch.setattr(os, "lstat", counting_lstat)
+    results = list(rename.rename_files(entries, target_dir))
+
+    assert all(isinstance(new_path, Path) for _, new_path in results)
+    # one exists() check per file, one is_dir() for the batch
+    assert calls == {"stat": len(entries) + 1, "lstat": 0}
@@ -0,0 +1,100 @@
+"""Tests for CLI startup time."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# microseconds xplat may add to the import of typer, from -X importtime,
+# about twice the 14-23 ms it takes with bytecode compiled
+STARTUP_BUDGET_US = 40_000
+# the only modules importing the CLI may load beyond typer's
+STARTUP_MODULES = {
+    "_csv",
+    "_json",
+    "csv",
+    "json",
+    "json.decoder",
+    "json.encoder",
+    "json.scanner",
+    "xplat",
+    "xplat.cli",
+    "xplat.constants",
+    "xplat.options",
+}
+# modules only some subcommands need, which must not load at startup
+LAZY_MODULES = [
+    "asyncio",
+    "cProfile",
+    "concurrent.futures",
+    "ctypes",
+    "hashlib",
+    "importlib.metadata",
+    "mmap",
+    "multiprocessing",
+    "sqlite3",
+    "tempfile",
+    "tracemalloc",
+    "xplat.dupes",
+    "xplat.index",
+    "xplat.info",
+    "xplat.journal",
+    "xplat.list",
+    "xplat.manifest",
+    "xplat.metrics",
+    "xplat.probe",
+    "xplat.profiling",
+    "xplat.rename",
+    "xplat.transfer",
+    "xplat.usage",
+    "xplat.watch",
+]
+# wall time varies too much on shared CI runners, so the budget is only checked when asked for
+TIMING_TESTS = "XPLAT_TIMING_TESTS"
+
+
+def _run(code: str, *args: str) -> subprocess.CompletedProcess:
+    # bytecode is written, so later runs don't pay for compiling
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    return subprocess.run([sys.executable, *args, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+
+def _import_times(stderr: str) -> dict[str, int]:
+    """Cumulative microseconds of each module in -X importtime output"""
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def _loaded_by_cli() -> set[str]:
+    """Modules importing the CLI loads beyond typer's"""
+    result = _run("import sys, typer; before = set(sys.modules); import xplat.cli; print(*sorted(set(sys.modules) - before))")
+    return set(result.stdout.split())
+
+
+def test_subcommand_modules_are_lazy():
+    """Test importing the CLI doesn't load what only some subcommands use."""
+    loaded = _loaded_by_cli()
+    assert "xplat.cli" in loaded
+    assert [module for module in LAZY_MODULES if module in loaded] == []
+
+
+def test_startup_modules():
+    """Test importing the CLI loads nothing beyond the modules it needs to define the commands."""
+    assert sorted(_loaded_by_cli() - STARTUP_MODULES) == []
+
+
+@pytest.mark.skipif(not os.environ.get(TIMING_TESTS), reason=f"set {TIMING_TESTS}=1 to check the startup time")
+def test_startup_budget():
+    """Test xplat adds no more than its budget to the import of typer."""
+    _run("import xplat.cli")
+    overheads = []
+    for _ in range(3):
+        times = _import_times(_run("import typer; import xplat.cli", "-X", "importtime").stderr)
+        overheads.append(times["xplat.cli"])
+    assert min(overheads) < STARTUP_BUDGET_US
@@ -0,0 +1,86 @@
+"""Tests for copying and moving files across filesystems."""
+
+import errno
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from xplat import transfer
+
+
+@pytest.fixture
+def source_file():
+    """Create a file with known content, mode and timestamps."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        src = Path(temp_dir) / "Source File.bin"
+        src.write_bytes(os.urandom(3 * transfer.BUFFER_SIZE + 17))
+        src.chmod(0o640)
+        os.utime(src, (1_000_000_000, 1_100_000_000))
+        yield src
+
+
+def test_copy_file(source_file):
+    """Test copy_file copies data and metadata and never overwrites."""
+    dst = source_file.with_name("copy.bin")
+    copied = transfer.copy_file(source_file, dst)
+
+    assert copied == source_file.stat().st_size
+    assert dst.read_bytes() == source_file.read_bytes()
+    assert dst.stat().st_mtime == source_file.stat().st_mtime
+    assert dst.stat().st_mode == source_file.stat().st_mode
+
+    with pytest.raises(FileExistsError):
+        transfer.copy_file(source_file, dst)
+
+
+def test_copy_file_buffered_fallback(source_file, monkeypatch):
+    """Test the chunked copy is used when zero-copy isn't supported."""
+    monkeypatch.setattr(transfer, "_zero_copy", lambda src_fd, dst_fd: None)
+    dst = source_file.with_name("copy.bin")
+
+    assert transfer.copy_file(source_file, dst) == source_file.stat().st_size
+    assert dst.read_bytes() == source_file.read_bytes()
+
+
+def test_copy_file_short_zero_copy(source_file, monkeypatch):
+    """Test a zero-copy that reports too few bytes is redone by reading the file."""
+    monkeypatch.setattr(transfer, "_zero_copy", lambda src_fd, dst_fd: 0)
+    dst = source_file.with_name("copy.bin")
+
+    assert transfer.copy_file(source_file, dst) == source_file.stat().st_size
+    assert dst.read_bytes() == source_file.read_bytes()
+
+
+def test_move_file_short_copy(source_file, monkeypatch):
+    """Test a copy that stops short fails the move, keeping the original."""
+    content = source_file.read_bytes()
+
+    def cross_device(self, target):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(Path, "rename", cross_device)
+    monkeypatch.setattr(transfer, "_zero_copy", lambda src_fd, dst_fd: None)
+    monkeypatch.setattr(transfer, "_buffered_copy", lambda src_fd, dst_fd: os.write(dst_fd, b"partial"))
+    dst = source_file.with_name("moved.bin")
+
+    with pytest.raises(OSError, match="Copied 7 of"):
+        transfer.move_file(source_file, dst)
+    assert source_file.read_bytes() == content
+    assert not dst.exists()
+
+
+def test_move_file_across_filesystems(source_file, monkeypatch):
+    """Test move_file copies and removes the original on EXDEV."""
+    content = source_file.read_bytes()
+
+    def cross_device(self, target):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(Path, "rename", cross_device)
+    dst = source_file.with_name("moved.bin")
+
+    assert transfer.move_file(source_file, dst) == len(content)
+    assert not source_file.exists()
+    assert dst.read_bytes() == content
@@ -0,0 +1,98 @@
+"""Tests for the disk usage summary."""
+
+import json
+import tempfile
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from xplat import constants
+from xplat.cli import app
+from xplat.usage import ROOT_SHARD, disk_usage, name_suffix, total_usage
+
+_runner = CliRunner()
+
+
+def _make_tree(root: Path) -> None:
+    (root / "photos" / "2024").mkdir(parents=True)
+    (root / "docs").mkdir()
+    (root / "empty").mkdir()
+    (root / "photos" / "a.jpg").write_text("x" * 100)
+    (root / "photos" / "2024" / "b.jpg").write_text("x" * 200)
+    (root / "photos" / "2024" / "c.png").write_text("x" * 50)
+    (root / "docs" / "notes").write_text("x" * 10)
+    (root / "top.txt").write_text("x" * 5)
+    # symlinks are neither followed nor counted
+    (root / "docs" / "link.jpg").symlink_to(root / "photos" / "a.jpg")
+    (root / "photos_link").symlink_to(root / "photos")
+
+
+def test_disk_usage_shards_merge():
+    """Test per-subdirectory totals are the same from one process or a pool."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        _make_tree(root)
+
+        report = disk_usage(root, jobs=1)
+        assert list(report) == [ROOT_SHARD, "docs", "empty", "photos"]
+        assert (report["photos"].files, report["photos"].size_bytes) == (3, 350)
+        assert report["photos"].extensions == {"jpg": 2, "png": 1}
+        assert report["docs"].extensions == {"": 1}
+        assert report["empty"].files == 0
+        assert report[ROOT_SHARD].size_bytes == 5
+
+        total = total_usage(report)
+        assert (total.files, total.size_bytes) == (5, 365)
+        assert disk_usage(root, jobs=2) == report
+
+
+def test_name_suffix():
+    """Test extensions are found the way Path.suffix finds them."""
+    for name in ["a.txt", "archive.tar.gz", "README", ".bashrc", "trailing.", "..txt"]:
+        assert name_suffix(name) == Path(name).suffix.lstrip(".")
+
+
+def test_du_command():
+    """Test the du table and JSON output."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        _make_tree(root)
+
+        result = _runner.invoke(app, ["du", str(root), "--jobs", "1"])
+        assert result.exit_code == 0
+        lines = result.stdout.splitlines()
+        assert lines[1].startswith("photos")
+        assert "350.0 B" in lines[1]
+        assert "jpg 2, png 1" in lines[1]
+        assert lines[-1].startswith("Total")
+
+        result = _runner.invoke(app, ["du", str(root), "--json"])
+        assert result.exit_code == 0
+        report = json.loads(result.stdout)
+        assert report["total"]["files"] == 5
+        assert "name" not in report["total"]
+        assert {record["name"]: record["bytes"] for record in report["directories"]}["photos"] == 350
+
+        # a subdirectory named Total is a row like any other
+        root.joinpath("Total").mkdir()
+        root.joinpath("Total", "big.bin").write_bytes(b"x" * 1000)
+        result = _runner.invoke(app, ["du", str(root), "--jobs", "1"])
+        lines = result.stdout.splitlines()
+        assert lines[1].startswith("Total")
+        assert lines[2].startswith("photos")
+        assert [index for index, line in enumerate(lines) if line.startswith("---")] == [len(lines) - 2]
+
+        result = _runner.invoke(app, ["du", str(root / "top.txt")])
+        assert result.exit_code == constants.NO_FILE
+
+
+def test_du_unreadable(tmp_path, monkeypatch):
+    """Test a directory that can't be read is reported, not a traceback."""
+
+    def unreadable(path):
+        raise PermissionError(13, "Permission denied", str(path))
+
+    monkeypatch.setattr("os.scandir", unreadable)
+    result = _runner.invoke(app, ["du", str(tmp_path)])
+    assert result.exit_code == constants.NO_FILE
+    assert f"Can't read {tmp_path}: Permission denied" in result.stdout
@@ -0,0 +1,124 @@
+"""Tests for watching a directory for new files."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from xplat.cli import app
+from xplat.list import FileFilter
+from xplat.watch import InotifyWatcher, PollWatcher, watch_batches
+
+_runner = CliRunner()
+
+
+class _FakeWatcher:
+    """Reports the files queued for each wait, without waiting"""
+
+    def __init__(self, *changes: set[Path]) -> None:
+        self.changes = list(changes)
+        self.closed = False
+
+    def changed(self, timeout: float) -> set[Path]:
+        return self.changes.pop(0) if self.changes else set()
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _bump_mtime(path: Path) -> None:
+    """Make a directory's mtime differ from when it was last listed"""
+    stat_result = path.stat()
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+
+
+def test_poll_watcher():
+    """Test the poll reports new files, in new subdirectories too."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "old.txt").touch()
+        watcher = PollWatcher(root, recursive=True)
+        assert watcher.changed(0) == set()
+
+        (root / "New File.txt").touch()
+        (root / "sub").mkdir()
+        (root / "sub" / "Inner.txt").touch()
+        _bump_mtime(root)
+        assert watcher.changed(0) == {root / "New File.txt", root / "sub" / "Inner.txt"}
+        # unchanged directories aren't listed again
+        assert watcher.changed(0) == set()
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher():
+    """Test inotify reports written files and new subdirectories."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        watcher = InotifyWatcher(root, recursive=True)
+        try:
+            (root / "New File.txt").write_text("data")
+            assert root / "New File.txt" in watcher.changed(1)
+            (root / "sub").mkdir()
+            assert watcher.changed(1) == set()
+            (root / "sub" / "Inner.txt").write_text("data")
+            assert root / "sub" / "Inner.txt" in watcher.changed(1)
+        finally:
+            watcher.close()
+
+
+def test_watch_batches():
+    """Test existing files come first, and safe or filtered names are ignored."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "Old File.txt").write_text("old")
+        (root / "safe.txt").write_text("safe")
+        (root / "Skip Me.log").write_text("log")
+        arrived = root / "New File.txt"
+        watcher = _FakeWatcher(set(), {arrived, root / "safe.txt", root / "Skip Me.log"})
+        waits = iter(range(4))
+
+        batches = watch_batches(
+            root,
+            file_filter=FileFilter(exts=["txt"]),
+            settle=0,
+            stop=lambda: next(waits, None) is None,
+            watcher=watcher,
+        )
+        first = next(batches)
+        arrived.write_text("new")
+        assert first == [root / "Old File.txt"]
+        assert list(batches) == [[arrived]]
+        assert watcher.closed
+
+
+def test_watch_batches_wait_to_settle():
+    """Test a file isn't handed on while it is still growing."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        growing = root / "Big Upload.bin"
+        growing.write_text("x")
+        polls = 0
+
+        def grow() -> bool:
+            nonlocal polls
+            polls += 1
+            if polls <= 3:
+                with growing.open("a") as file:
+                    file.write("x")
+            return polls > 6
+
+        batches = list(watch_batches(root, settle=0, stop=grow, watcher=_FakeWatcher()))
+        assert batches == [[growing]]
+        # seen on the last growing poll, unchanged on the next
+        assert growing.stat().st_size == 4
+
+
+def test_rename_watch_interactive():
+    """Test --watch can't be combined with --interactive."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        result = _runner.invoke(app, ["rename", temp_dir, "--watch", "--interactive"])
+        assert result.exit_code == 2